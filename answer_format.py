@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Stored form of an assessment's answers and results for the EOTSS Hosting Recommendation System.
+
+A record's assessment_data holds the answers as enum codes (each question's option index
+in scoring.ANSWER_OPTIONS) and the results as computed by the scoring rules:
+
+    {
+        "format": 2,
+        "answers": {"fault_tolerance": 2, "latency": 0, ..., "no_hardware_deps": 1},
+        "recommendation": "aws",
+        "scores": {"aws": 14, "on_prem_cloud": 3, "physical": 0},
+        "explanations": ["Low budget sensitivity favors AWS's cost efficiency.", ...],
+        "app_age": "modern"
+    }
+
+The text and HTML shown on pages and in emails are derived from it when rendering (see
+results_text in app.py), so nothing is stored twice, and answers can be queried directly
+(e.g. json_extract(record, '$.assessment_data.answers.security') in the SQLite backend).
+
+Records saved before this format kept the text posted by the results page ("Prompt: Value"
+lines, plus a results_data copy with HTML); parse_legacy converts them, and
+`python manage.py migrate-answers` rewrites the stored records.
+"""
+
+from scoring import ANSWER_KEYS, ANSWER_OPTIONS
+
+FORMAT_VERSION = 2
+
+_OPTION_CODES = {key: {option: code for code, option in enumerate(options)} for key, options in ANSWER_OPTIONS}
+
+# The legacy answers text has this line between the questions and the cloud readiness questions
+LEGACY_APP_AGE_PREFIX = 'Application Age (determined):'
+
+
+def encode_answers(answers):
+    """
+    Return the enum code of each answer, keyed by ANSWER_KEYS.
+    Raises:
+        ValueError: If an answer is missing or not one of its question's options.
+    """
+    try:
+        return {key: _OPTION_CODES[key][answers[key]] for key in ANSWER_KEYS}
+    except KeyError as e:
+        raise ValueError(f"Missing or invalid answer: {e}")
+
+
+def decode_answers(codes):
+    """
+    Return the answers (option strings) for their enum codes.
+    """
+    options = dict(ANSWER_OPTIONS)
+    return {key: options[key][codes[key]] for key in ANSWER_KEYS}
+
+
+def is_structured(assessment_data):
+    """
+    Return True if assessment_data is in this module's format (rather than legacy text).
+    """
+    return (assessment_data or {}).get('format') == FORMAT_VERSION
+
+
+def structured_assessment_data(answers, recommendation, scores, explanations, app_age):
+    """
+    Build assessment_data from answers and their results (as returned by scoring.recommend).
+    """
+    return {
+        "format": FORMAT_VERSION,
+        "answers": encode_answers(answers),
+        "recommendation": recommendation,
+        "scores": dict(scores),
+        "explanations": list(explanations),
+        "app_age": app_age,
+    }
+
+
+def _lines(text):
+    return [line.strip() for line in (text or '').split('\n') if line.strip()]
+
+
+def parse_legacy(assessment_data):
+    """
+    Convert legacy text assessment_data to the structured format, keeping the results
+    that were shown at the time (they may differ from what today's rules would give).
+    The answer lines are read in question order, as the results page wrote them.
+    Raises:
+        ValueError: If the text cannot be read back into a valid answer set.
+    """
+    answers = {}
+    app_age = None
+    answer_lines = []
+    for line in _lines(assessment_data.get('answers')):
+        if line.startswith(LEGACY_APP_AGE_PREFIX):
+            app_age = line[len(LEGACY_APP_AGE_PREFIX):].strip().lower()
+        else:
+            answer_lines.append(line)
+    if len(answer_lines) != len(ANSWER_KEYS):
+        raise ValueError(f"Expected {len(ANSWER_KEYS)} answers, found {len(answer_lines)}")
+    for key, line in zip(ANSWER_KEYS, answer_lines):
+        answers[key] = line.rsplit(' ', 1)[-1].lower()
+
+    scores = {}
+    for line in _lines(assessment_data.get('scores')):
+        label, separator, value = line.rpartition(':')
+        if not separator or not value.strip().lstrip('-').isdigit():
+            raise ValueError(f"Unreadable score line: {line!r}")
+        scores[label.strip().lower().replace(' ', '_')] = int(value)
+
+    recommendation = (assessment_data.get('recommendation') or '').strip().lower().replace(' ', '_')
+    if not recommendation:
+        raise ValueError("No recommendation")
+    return structured_assessment_data(answers, recommendation, scores, _lines(assessment_data.get('explanations')),
+                                      app_age)
+
+
+def migrate_store(store, dry_run=False):
+    """
+    Convert every legacy record in a store to the structured format, then compact the
+    store so the rewritten records replace the old ones on disk.
+    Args:
+        store (storage.AssessmentStore): The store to migrate.
+        dry_run (bool): Only parse the records, changing nothing.
+    Returns:
+        tuple: (number of records migrated, list of (assessment ID, ticket ID, error) for the
+        records left as they were)
+    """
+    migrated = 0
+    skipped = []
+    for record in store.iter_matching():
+        assessment_data = record.get('assessment_data') or {}
+        if is_structured(assessment_data):
+            continue
+        try:
+            structured = parse_legacy(assessment_data)
+        except ValueError as e:
+            skipped.append((record['id'], record.get('ticket_id'), e))
+            continue
+        if not dry_run:
+            store.update(record['id'], {"assessment_data": structured})
+        migrated += 1
+    if migrated and not dry_run:
+        store.compact()
+    return migrated, skipped
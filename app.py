@@ -1,13 +1,31 @@
-from flask import Flask, render_template, request, flash, redirect, url_for
+from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, session, make_response, Response, send_from_directory, g, stream_with_context
 from flask_mail import Mail, Message
+from markupsafe import escape
+import base64
 import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import hashlib
+import math
 import os
 import random
 import string
 import logging
+import mimetypes
+import time
 from config import config
+import answer_format
+import assets
+from storage import open_store, page_cursor, RecordCache, SORT_KEYS, SORT_ORDERS, TimedStore
+from outbox import Outbox
+from smtp_pool import SMTPPool
+from lru import LRUCache
+import scoring
+import batch_scoring
+import export
+import metrics
+from profiling import ProfilingMiddleware
+from search import SearchIndex
 
 # Get configuration based on environment
 config_name = os.environ.get('FLASK_ENV', 'development')
@@ -22,11 +40,114 @@ logging.basicConfig(
 
 mail = Mail(app)
 
+# Profiles slow or explicitly requested requests into PROFILE_DIR (see profiling.py)
+profiler = ProfilingMiddleware(
+    app.wsgi_app,
+    app.config['PROFILE_DIR'],
+    enabled=app.config['PROFILE_REQUESTS'],
+    token=app.config['PROFILE_TOKEN'],
+    threshold_ms=app.config['PROFILE_THRESHOLD_MS'],
+    max_files=app.config['PROFILE_MAX_FILES'],
+    sample_interval=app.config['PROFILE_SAMPLE_INTERVAL'],
+)
+app.wsgi_app = profiler
+
 # Create data directory if it doesn't exist
 DATA_DIR = app.config['DATA_DIR']
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
+# Shared scoring rules, hot-reloaded from SCORING_RULES_PATH
+scoring.configure(app.config['SCORING_RULES_PATH'], app.config['SCORING_RULES_RELOAD_INTERVAL'])
+
+# Prometheus metrics served at /metrics, summed over the gunicorn workers (see metrics.py)
+registry = metrics.Registry(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+request_duration = registry.histogram('eotss_http_request_duration_seconds', 'Time spent handling a request', ('endpoint', 'method'))
+requests_total = registry.counter('eotss_http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+submissions_total = registry.counter('eotss_assessments_submitted_total', 'Assessments submitted to EOTSS')
+reviews_total = registry.counter('eotss_reviews_total', 'Review decisions recorded', ('decision',))
+notifications_total = registry.counter('eotss_notifications_queued_total', 'Emails queued in the outbox', ('kind',))
+deliveries_total = registry.counter('eotss_email_delivery_status_total', 'Email delivery status changes recorded by the outbox', ('kind', 'status'))
+smtp_batch_duration = registry.histogram('eotss_smtp_batch_duration_seconds', 'Time to send one outbox batch over a pooled SMTP session')
+smtp_messages_total = registry.counter('eotss_smtp_messages_total', 'Emails handed to the SMTP server', ('result',))
+storage_duration = registry.histogram('eotss_storage_operation_duration_seconds', 'Time spent in storage calls', ('operation',))
+storage_records_total = registry.counter('eotss_storage_records_read_total', 'Records read by storage calls', ('operation',))
+scoring_total = registry.counter('eotss_scoring_calls_total', 'Answer sets scored', ('source',))
+result_cache_total = registry.counter('eotss_result_cache_lookups_total', 'Results page cache lookups', ('result',))
+record_cache_total = registry.counter('eotss_record_cache_total', 'Parsed record cache hits, misses and evictions', ('result',))
+
+def observe_storage(operation, seconds, records):
+    storage_duration.observe(seconds, operation=operation)
+    if records is not None:
+        storage_records_total.inc(records, operation=operation)
+
+# Parsed records reused across requests while their stored version is unchanged, so a
+# record written by another worker is re-read
+record_cache = None
+if app.config['RECORD_CACHE_MAX_ENTRIES'] > 0:
+    record_cache = RecordCache(app.config['RECORD_CACHE_MAX_ENTRIES'], app.config['RECORD_CACHE_MAX_BYTES'],
+                               lambda result, count: record_cache_total.inc(count, result=result))
+
+# Assessment storage backend (JSON files or SQLite, see STORAGE_BACKEND), timed for /metrics
+store = TimedStore(open_store(app.config, record_cache=record_cache), observe_storage)
+
+registry.gauge('eotss_assessments', 'Assessments per dashboard counter', lambda: {(name,): value for name, value in store.counters().items()}, ('counter',))
+
+# Full-text search index (see search.py), kept up to date on submit and review
+search_index = SearchIndex(app.config['SEARCH_INDEX_PATH'])
+if search_index.is_empty() and store.count():
+    print("Search index is empty; run `python manage.py reindex` to index the existing assessments.")
+
+# Built stylesheet (see assets.py). Normally built by `python manage.py build-assets` at
+# deploy time; built here if missing, and on every start in debug mode.
+ASSET_MANIFEST = assets.load_manifest()
+if ASSET_MANIFEST is None or app.debug:
+    ASSET_MANIFEST = assets.build()
+
+@app.template_global()
+def asset_url(name):
+    """
+    Return the URL of a built asset by its logical name, e.g. asset_url('app.css').
+    """
+    return url_for('dist_asset', filename=ASSET_MANIFEST[name])
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    """
+    Serve a built asset. Their names carry a content hash, so they are cached as immutable
+    for a year; the precompressed .gz copy is sent to clients that accept gzip.
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    gzipped = request.accept_encodings['gzip'] > 0 and os.path.isfile(os.path.join(assets.DIST_DIR, filename + '.gz'))
+    response = send_from_directory(assets.DIST_DIR, filename + '.gz' if gzipped else filename, mimetype=mimetype, max_age=365 * 24 * 3600)
+    if gzipped:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# Fingerprint of the templates and built assets, part of every page ETag so a deploy invalidates cached pages
+def template_fingerprint():
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(os.path.join(app.root_path, app.template_folder))):
+        stat = os.stat(os.path.join(app.root_path, app.template_folder, name))
+        digest.update(f"{name}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    digest.update(json.dumps(ASSET_MANIFEST, sort_keys=True).encode())
+    return digest.hexdigest()
+
+TEMPLATE_FINGERPRINT = template_fingerprint()
+
+# Dashboard listing options
+DASHBOARD_STATUSES = ('pending', 'approved', 'overridden')
+DASHBOARD_PAGE_SIZES = (25, 50, 100)
+
+# Search matches counted (and reachable by paging) at most
+SEARCH_MAX_RESULTS = 1000
+
+# Filtered dashboard matches counted at most; pages past it are still reached by the Next links
+DASHBOARD_MAX_COUNT = 10000
+
 # QUESTIONS: Main assessment questions for application requirements.
 # Each question is a dict with a key, prompt, valid options, and a help string for user guidance.
 QUESTIONS = [
@@ -49,6 +170,16 @@ CLOUD_READINESS_QUESTIONS = [
     {"key": "no_hardware_deps", "prompt": "Does the app require physical hardware or specialized networking?", "options": ["yes", "no"], "help": "Yes = needs special cards/devices, No = runs on standard hardware"},
 ]
 
+# Rendered results pages, keyed on (rules version, answer code); see render_result
+result_cache = LRUCache(max_entries=app.config['RESULT_CACHE_MAX_ENTRIES'], max_bytes=app.config['RESULT_CACHE_MAX_BYTES'])
+
+# The blank assessment form never changes, so it is rendered once at startup
+# (in debug mode it is rendered per request so template edits show up)
+FORM_HTML = None
+if not app.debug:
+    with app.test_request_context('/'):
+        FORM_HTML = render_template('form.html', questions=QUESTIONS, cloud_questions=CLOUD_READINESS_QUESTIONS, error=None, answers={})
+
 def generate_ticket_id():
     """
     Generate a unique 8-character ticket ID.
@@ -59,145 +190,148 @@ def generate_ticket_id():
     digits = ''.join(random.choices(string.digits, k=5))
     return f"{letters}{digits}"
 
-def save_assessment(agency_info, assessment_data):
+def allocate_ticket_ids(count):
     """
-    Save assessment data to a JSON file with unique ID and ticket ID.
-    Returns the assessment ID.
+    Generate count ticket IDs that are unique among themselves and not already in use.
     """
-    assessment_id = str(uuid.uuid4())
-    ticket_id = generate_ticket_id()
-    assessment_file = os.path.join(DATA_DIR, f"{ticket_id}_{assessment_id}.json")
-    
-    assessment_record = {
-        "id": assessment_id,
+    ticket_ids = []
+    seen = set()
+    while len(ticket_ids) < count:
+        ticket_id = generate_ticket_id()
+        if ticket_id in seen or store.record_version_by_ticket(ticket_id) is not None:
+            continue
+        seen.add(ticket_id)
+        ticket_ids.append(ticket_id)
+    return ticket_ids
+
+def new_assessment_record(agency_info, assessment_data, ticket_id, submitted_at=None, rules_version=None):
+    """
+    Build a pending assessment record with a new assessment ID.
+    """
+    return {
+        "id": str(uuid.uuid4()),
         "ticket_id": ticket_id,
         "status": "pending",
-        "submitted_at": datetime.now().isoformat(),
+        "submitted_at": (submitted_at or datetime.now()).isoformat(),
+        "scoring_rules_version": rules_version or scoring.rules_version(),
         "agency_info": agency_info,
         "assessment_data": assessment_data
     }
+
+def results_text(recommendation, scores, explanations, answers):
+    """
+    Format results as text, one item per line (as the results page shows them).
+    Args:
+        answers (dict): The answers, including the derived app_age.
+    Returns:
+        tuple: (recommendation, scores, explanations, answers) as strings
+    """
+    answer_lines = [f"{q['prompt']} {answers[q['key']].capitalize()}" for q in QUESTIONS]
+    answer_lines.append(f"{answer_format.LEGACY_APP_AGE_PREFIX} {(answers['app_age'] or 'unknown').capitalize()}")
+    answer_lines += [f"{q['prompt']} {answers[q['key']].capitalize()}" for q in CLOUD_READINESS_QUESTIONS]
+    return (
+        recommendation.upper(),
+        '\n'.join(f"{option.replace('_', ' ').title()}: {score}" for option, score in scores.items()),
+        '\n'.join(explanations),
+        '\n'.join(answer_lines),
+    )
+
+@app.template_global()
+def results_view(assessment_data):
+    """
+    Derive the displayed results of a stored assessment_data (see answer_format.py).
+    Records saved before answers were structured are shown as their stored text.
+    Returns:
+        dict: recommendation, and scores, explanations and answers as text (one item per
+        line, keys '*_text') and HTML (keys '*_html')
+    """
+    if answer_format.is_structured(assessment_data):
+        answers = answer_format.decode_answers(assessment_data['answers'])
+        answers['app_age'] = assessment_data.get('app_age')
+        recommendation, scores, explanations, answers_text = results_text(
+            assessment_data['recommendation'], assessment_data['scores'], assessment_data['explanations'], answers)
+    else:
+        recommendation = (assessment_data.get('recommendation') or '').upper()
+        scores = assessment_data.get('scores') or ''
+        explanations = assessment_data.get('explanations') or ''
+        answers_text = assessment_data.get('answers') or ''
+    return {
+        'recommendation': recommendation,
+        'scores_text': scores,
+        'explanations_text': explanations,
+        'answers_text': answers_text,
+        'scores_html': scores.replace('\n', '<br>'),
+        'explanations_html': explanations.replace('\n', '<br>'),
+        'answers_html': answers_text.replace('\n', '<br>'),
+    }
+
+def save_assessment(agency_info, assessment_data):
+    """
+    Save assessment data with unique ID and ticket ID.
+    Returns the assessment ID.
+    """
+    assessment_record = new_assessment_record(agency_info, assessment_data, generate_ticket_id())
+    assessment_id = assessment_record['id']
+    ticket_id = assessment_record['ticket_id']
     
-    with open(assessment_file, 'w') as f:
-        json.dump(assessment_record, f, indent=2)
+    store.save(assessment_record)
+    submissions_total.inc()
+    try:
+        search_index.add(assessment_record)
+    except Exception as e:
+        print(f"Error indexing assessment for search: {e}")
     
     return assessment_id, ticket_id
 
 def load_assessment(assessment_id):
     """
-    Load assessment data from JSON file.
+    Load assessment data from storage.
     Returns None if not found.
     """
-    # Search for files that contain the assessment_id
-    if os.path.exists(DATA_DIR):
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.json') and assessment_id in filename:
-                assessment_file = os.path.join(DATA_DIR, filename)
-                with open(assessment_file, 'r') as f:
-                    return json.load(f)
-    return None
+    return store.get(assessment_id)
 
-def update_assessment_status(assessment_id, status, review_notes="", override_reason=""):
+def update_assessment_status(assessment_id, status, review_notes="", override_reason="", edited=False):
     """
     Update assessment status and add review notes.
+    Recorded as a 'reviewed' event, or 'edited' when a previous decision is changed;
+    both are kept in the assessment's review_history.
     """
-    # Search for files that contain the assessment_id
-    if os.path.exists(DATA_DIR):
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.json') and assessment_id in filename:
-                assessment_file = os.path.join(DATA_DIR, filename)
-                with open(assessment_file, 'r') as f:
-                    assessment = json.load(f)
-                
-                assessment["status"] = status
-                assessment["reviewed_at"] = datetime.now().isoformat()
-                assessment["review_notes"] = review_notes
-                assessment["notification_sent"] = False  # Track if notification email has been sent
-                if override_reason:
-                    assessment["override_reason"] = override_reason
-                
-                with open(assessment_file, 'w') as f:
-                    json.dump(assessment, f, indent=2)
-                
-                return True
-    return False
+    changes = {
+        "status": status,
+        "reviewed_at": datetime.now().isoformat(),
+        "review_notes": review_notes,
+        # Cleared when an edit turns an override into an approval
+        "override_reason": override_reason,
+        "notification_sent": False,  # Track if notification email has been sent
+    }
+    
+    updated = store.append_event(assessment_id, 'edited' if edited else 'reviewed', changes)
+    if updated:
+        reviews_total.inc(decision=status)
+        try:
+            if not search_index.update_notes(assessment_id, review_notes):
+                search_index.add(store.get(assessment_id))
+        except Exception as e:
+            print(f"Error indexing review notes for search: {e}")
+    return updated
 
 def score_answers(answers):
     """
     Calculate the hosting recommendation based on user answers.
+    Uses the shared rules' precomputed table (see scoring.py), so this is a single lookup.
     Args:
         answers (dict): Dictionary of answers to all questions.
     Returns:
         tuple: (recommendation (str), scores (dict), explanations (list of str))
     """
-    # Calculate cloud readiness score with reversed logic for hardware dependencies
-    cloud_ready_score = 0
-    for q in CLOUD_READINESS_QUESTIONS:
-        if q["key"] == "no_hardware_deps":
-            # For hardware question: "no" means cloud-ready (no hardware requirements)
-            if answers.get(q["key"]) == "no":
-                cloud_ready_score += 1
-        else:
-            # For other questions: "yes" means cloud-ready
-            if answers.get(q["key"]) == "yes":
-                cloud_ready_score += 1
-    app_age = "modern" if cloud_ready_score >= 2 else "legacy"
+    recommendation, scores, explanations, app_age = scoring.recommend(answers)
+    scoring_total.inc(source='form')
     answers["app_age"] = app_age
-    scores = {"aws": 0, "on_prem_cloud": 0, "physical": 0}
-    if answers["fault_tolerance"] == "high": scores["aws"] += 2
-    elif answers["fault_tolerance"] == "moderate": scores["on_prem_cloud"] += 1
-    if answers["latency"] == "high": scores["physical"] += 2
-    elif answers["latency"] == "moderate": scores["on_prem_cloud"] += 1
-    if answers["data_volume"] == "high": scores["on_prem_cloud"] += 2
-    elif answers["data_volume"] == "moderate": scores["aws"] += 1
-    else: scores["aws"] += 2
-    if answers["security"] == "high": scores["physical"] += 2
-    elif answers["security"] == "moderate": scores["on_prem_cloud"] += 2
-    else: scores["aws"] += 1
-    if answers["app_age"] == "modern": scores["aws"] += 2
-    else: scores["physical"] += 2
-    if answers["migration"] == "low": scores["aws"] += 2
-    elif answers["migration"] == "moderate": scores["on_prem_cloud"] += 1
-    else: scores["physical"] += 2
-    if answers["ops_expertise"] == "aws": scores["aws"] += 2
-    elif answers["ops_expertise"] == "vmware": scores["on_prem_cloud"] += 2
-    else: scores["physical"] += 1
-    if answers["budget"] == "low": scores["aws"] += 2
-    elif answers["budget"] == "moderate": scores["on_prem_cloud"] += 1
-    if answers["compliance"] == "yes": scores["on_prem_cloud"] += 2; scores["aws"] += 1
-    else: scores["aws"] += 1
-    if answers["scalability"] == "yes": scores["aws"] += 2; scores["on_prem_cloud"] += 1
-    else: scores["physical"] += 1
-    recommendation = max(scores, key=scores.get)
-    explanations = []
-    if recommendation == "aws":
-        if answers["fault_tolerance"] == "high": explanations.append("High fault tolerance needs are best met by AWS.")
-        if answers["budget"] == "low": explanations.append("Low budget sensitivity favors AWS's cost efficiency.")
-        if answers["app_age"] == "modern": explanations.append("Modern, cloud-ready applications are ideal for AWS.")
-        if answers["migration"] == "low": explanations.append("Low migration complexity makes AWS adoption easier.")
-        if answers["ops_expertise"] == "aws": explanations.append("Your team has AWS expertise.")
-        if answers["scalability"] == "yes": explanations.append("AWS is well-suited for scalable workloads.")
-        if answers["compliance"] == "no": explanations.append("No strict compliance requirements allow for public cloud hosting.")
-    elif recommendation == "on_prem_cloud":
-        if answers["fault_tolerance"] == "moderate": explanations.append("Moderate fault tolerance can be handled by on-prem cloud.")
-        if answers["latency"] == "moderate": explanations.append("Moderate latency sensitivity is suitable for on-prem cloud.")
-        if answers["data_volume"] == "high": explanations.append("High data volume is often better managed on-premises.")
-        if answers["security"] == "moderate": explanations.append("Moderate security needs are met by on-prem cloud.")
-        if answers["migration"] == "moderate": explanations.append("Moderate migration complexity fits on-prem cloud.")
-        if answers["ops_expertise"] == "vmware": explanations.append("Your team has VMware/on-prem expertise.")
-        if answers["compliance"] == "yes": explanations.append("Compliance requirements are often easier to meet on-premises.")
-        if answers["scalability"] == "yes": explanations.append("On-prem cloud can support some scalability needs.")
-    elif recommendation == "physical":
-        if answers["latency"] == "high": explanations.append("High latency sensitivity is best served by physical infrastructure.")
-        if answers["security"] == "high": explanations.append("High security needs are best met by physical hosting.")
-        if answers["app_age"] == "legacy": explanations.append("Legacy applications are often better suited to physical servers.")
-        if answers["migration"] == "high": explanations.append("High migration complexity favors staying on physical infrastructure.")
-        if answers["ops_expertise"] == "minimal": explanations.append("Minimal cloud/on-prem expertise may require physical hosting.")
-        if answers["scalability"] == "no": explanations.append("Physical infrastructure is suitable for stable, non-scaling workloads.")
     return recommendation, scores, explanations
 
 def send_eotss_notification(agency_info, results_data, assessment_id, ticket_id):
     """
-    Send notification email to EOTSS with assessment results and review link.
+    Queue notification email to EOTSS with assessment results and review link.
     """
     try:
         # Generate review link
@@ -268,15 +402,82 @@ EOTSS Hosting Recommendation System
 </html>
             """
         )
-        mail.send(msg)
+        queue_email('eotss_notification', assessment_id, msg)
+        return True
+    except Exception as e:
+        print(f"Error queueing email: {e}")
+        return False
+
+# Outbox kind of the one EOTSS email sent for a bulk submission; its assessment_id is the batch ID
+BULK_NOTIFICATION_KIND = 'eotss_bulk_notification'
+
+def send_bulk_eotss_notification(batch_id, records):
+    """
+    Queue one email to EOTSS listing every assessment of a bulk submission, with review links.
+    """
+    try:
+        agencies = sorted({record['agency_info']['agency_name'] for record in records})
+        agency_label = agencies[0] if len(agencies) == 1 else f"{len(agencies)} agencies"
+        date = datetime.now().strftime('%B %d, %Y')
+        
+        lines = []
+        rows = []
+        for record in records:
+            agency_info = record['agency_info']
+            review_url = f"http://localhost:5000/review/{record['id']}"
+            recommendation = record['assessment_data']['recommendation'].upper()
+            lines.append(f"- #{record['ticket_id']}: {agency_info['agency_name']} / {agency_info['department']} "
+                         f"({agency_info['contact_name']}, {agency_info['contact_email']}) - {recommendation}\n  Review: {review_url}")
+            rows.append(
+                f"<tr><td>#{record['ticket_id']}</td><td>{escape(agency_info['agency_name'])}</td>"
+                f"<td>{escape(agency_info['department'])}</td>"
+                f"<td>{escape(agency_info['contact_name'])} ({escape(agency_info['contact_email'])})</td>"
+                f"<td>{recommendation}</td><td><a href=\"{review_url}\">Review</a></td></tr>"
+            )
+        
+        msg = Message(
+            subject=f"EOTSS Hosting Assessments - {agency_label} - {len(records)} submitted - {date}",
+            recipients=[app.config['EOTSS_EMAIL']],
+            body=f"""
+Dear EOTSS Team,
+
+{len(records)} hosting assessments were submitted together ({agency_label}).
+
+BATCH ID: {batch_id}
+
+ASSESSMENTS:
+""" + '\n'.join(lines) + """
+
+REVIEW REQUIRED:
+Please review these assessments and provide approval or feedback.
+
+Best regards,
+EOTSS Hosting Recommendation System
+            """,
+            html=f"""
+<html>
+<body>
+<h2>EOTSS Hosting Assessments Submitted</h2>
+<p><strong>{len(records)}</strong> assessments were submitted together ({escape(agency_label)}).</p>
+<p><strong>Batch ID:</strong> {batch_id}</p>
+<table border="1" cellpadding="6" cellspacing="0">
+<tr><th>Ticket ID</th><th>Agency</th><th>Department</th><th>Contact</th><th>Recommendation</th><th></th></tr>
+""" + '\n'.join(rows) + """
+</table>
+<p>Please review these assessments and provide approval or feedback.</p>
+</body>
+</html>
+            """
+        )
+        queue_email(BULK_NOTIFICATION_KIND, batch_id, msg)
         return True
     except Exception as e:
-        print(f"Error sending email: {e}")
+        print(f"Error queueing bulk notification email: {e}")
         return False
 
-def send_agency_confirmation(agency_email, results_data, ticket_id):
+def send_agency_confirmation(agency_email, results_data, assessment_id, ticket_id):
     """
-    Send confirmation email to the agency.
+    Queue confirmation email to the agency.
     """
     try:
         msg = Message(
@@ -301,15 +502,15 @@ Best regards,
 EOTSS Hosting Recommendation System
             """
         )
-        mail.send(msg)
+        queue_email('agency_confirmation', assessment_id, msg)
         return True
     except Exception as e:
-        print(f"Error sending confirmation email: {e}")
+        print(f"Error queueing confirmation email: {e}")
         return False
 
-def send_review_notification(agency_email, agency_name, status, ticket_id, review_notes="", override_reason=""):
+def send_review_notification(assessment_id, agency_email, agency_name, status, ticket_id, review_notes="", override_reason=""):
     """
-    Send notification to agency about review decision.
+    Queue notification to agency about review decision.
     """
     try:
         if status == "approved":
@@ -352,12 +553,159 @@ Best regards,
 EOTSS Hosting Recommendation System
             """
         )
-        mail.send(msg)
+        queue_email('review_notification', assessment_id, msg)
         return True
     except Exception as e:
-        print(f"Error sending review notification: {e}")
+        print(f"Error queueing review notification: {e}")
         return False
 
+def queue_email(kind, assessment_id, msg):
+    """
+    Put a message in the outbox and mark it as queued on the assessment.
+    The status is recorded first so the delivery thread's update always comes after it.
+    If the message cannot be queued it is marked as failed instead, so it can be sent again.
+    """
+    entry = {"kind": kind, "assessment_id": assessment_id, "attempts": 0}
+    record_delivery_status(entry, 'queued')
+    try:
+        outbox.enqueue(kind, assessment_id, {
+            "subject": msg.subject,
+            "recipients": msg.recipients,
+            "body": msg.body,
+            "html": msg.html,
+            "sender": msg.sender,
+        })
+    except Exception as e:
+        record_delivery_status(entry, 'failed', f"{type(e).__name__}: {e}")
+        raise
+    notifications_total.inc(kind=kind)
+
+def deliver_emails(entries):
+    """
+    Send a batch of outbox entries over one pooled SMTP session (called by the outbox's delivery thread).
+    Returns:
+        list: None for each email sent, or the exception that stopped it.
+    """
+    with app.app_context():
+        messages = [
+            Message(
+                subject=entry["message"]["subject"],
+                recipients=entry["message"]["recipients"],
+                body=entry["message"]["body"],
+                html=entry["message"].get("html"),
+                sender=entry["message"].get("sender"),
+            )
+            for entry in entries
+        ]
+        with smtp_batch_duration.time():
+            results = smtp_pool.send_batch(messages)
+        for result in results:
+            smtp_messages_total.inc(result='sent' if result is None else 'failed')
+        return results
+
+def record_delivery_status(entry, status, error=None):
+    """
+    Record an email's delivery status on its assessment, as '<kind>_delivery'.
+    A delivered review notification also marks the assessment as notified.
+    """
+    deliveries_total.inc(kind=entry["kind"], status=status)
+    now = datetime.now().isoformat()
+    changes = {
+        f"{entry['kind']}_delivery": {
+            "status": status,
+            "attempts": entry["attempts"],
+            "updated_at": now,
+            "error": error,
+        }
+    }
+    if entry["kind"] == BULK_NOTIFICATION_KIND:
+        # Belongs to a batch of assessments rather than one; only counted
+        return False
+    if entry["kind"] == 'review_notification' and status == 'sent':
+        changes["notification_sent"] = True
+        changes["notification_sent_at"] = now
+    return store.append_event(entry["assessment_id"], 'notified', changes)
+
+def delivery_in_progress(assessment, kind):
+    """
+    Return True if an email of this kind is queued or awaiting a retry for the assessment.
+    """
+    return (assessment.get(f"{kind}_delivery") or {}).get("status") in ('queued', 'retrying')
+
+# Warm SMTP connections reused across outbox batches
+smtp_pool = SMTPPool(mail, size=app.config['MAIL_POOL_SIZE'], idle_timeout=app.config['MAIL_POOL_IDLE_TIMEOUT'])
+
+# Email outbox: messages are queued in OUTBOX_DIR and delivered in batches by a background thread
+outbox = Outbox(
+    app.config['OUTBOX_DIR'],
+    deliver=deliver_emails,
+    on_status=record_delivery_status,
+    max_attempts=app.config['OUTBOX_MAX_ATTEMPTS'],
+    retry_base=app.config['OUTBOX_RETRY_BASE'],
+    poll_interval=app.config['OUTBOX_POLL_INTERVAL'],
+    batch_size=app.config['OUTBOX_BATCH_SIZE'],
+)
+
+@app.before_request
+def start_request_timer():
+    """
+    Note when the request started, and make sure this worker writes its metrics snapshots.
+    """
+    g.request_started = time.perf_counter()
+    registry.ensure_started()
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Count the request and observe its duration, by endpoint (not URL, to bound the label values).
+    """
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        request_duration.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Expose the metrics of all workers in the Prometheus text format.
+    """
+    return Response(registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/debug/profiles')
+def list_profiles():
+    """
+    List the kept request profiles, slowest first, with links to their pstats and collapsed-stack files.
+    Requires the X-Profile header with PROFILE_TOKEN; without it the page does not exist.
+    """
+    if not profiler.authorized(request.headers.get('X-Profile')):
+        return 'Not Found', 404
+    profiles = profiler.profiles()
+    for summary in profiles:
+        summary['files'] = {
+            kind: url_for('download_profile', filename=f"{summary['name']}.{kind}", _external=True)
+            for kind in ('pstats', 'collapsed')
+        }
+    return jsonify({"count": len(profiles), "profiles": profiles})
+
+@app.route('/debug/profiles/<filename>')
+def download_profile(filename):
+    """
+    Download one profile file (requires the X-Profile header, see list_profiles).
+    """
+    if not profiler.authorized(request.headers.get('X-Profile')) or not filename.endswith(('.pstats', '.collapsed')):
+        return 'Not Found', 404
+    return send_from_directory(profiler.directory, filename, as_attachment=True)
+
+@app.before_request
+def start_outbox_worker():
+    """
+    Make sure this worker process delivers queued email (gunicorn forks after import).
+    """
+    if app.config['OUTBOX_WORKER']:
+        outbox.ensure_started()
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     """
@@ -371,10 +719,47 @@ def index():
         missing = [q['prompt'] for q in QUESTIONS + CLOUD_READINESS_QUESTIONS if not answers[q['key']]]
         if missing:
             return render_template('form.html', questions=QUESTIONS, cloud_questions=CLOUD_READINESS_QUESTIONS, error=f"Please answer: {', '.join(missing)}", answers=answers)
-        recommendation, scores, explanations = score_answers(answers)
-        return render_template('result.html', recommendation=recommendation, scores=scores, explanations=explanations, answers=answers, questions=QUESTIONS, cloud_questions=CLOUD_READINESS_QUESTIONS)
+        return render_result(answers)
+    if FORM_HTML is not None and not flashes_pending():
+        return FORM_HTML
     return render_template('form.html', questions=QUESTIONS, cloud_questions=CLOUD_READINESS_QUESTIONS, error=None, answers={})
 
+def flashes_pending():
+    """
+    Return True if the session holds flash messages the next rendered page would show.
+    Cached pages were rendered without any, so they cannot be served in that case.
+    """
+    return bool(session.get('_flashes'))
+
+def render_result(answers):
+    """
+    Render the results page for a complete answer set.
+    The page depends only on the answers and the scoring rules, so it is cached per
+    rules version and answer code (the answer set's row in the scoring table).
+    Args:
+        answers (dict): Dictionary of answers to all questions.
+    Returns:
+        str: Rendered HTML for the results page.
+    """
+    compiled = scoring.ENGINE.current()
+    try:
+        key = (compiled.version, compiled.table.encode(answers))
+    except KeyError:
+        # Answers outside the option lists are scored and rendered, but not cached
+        key = None
+    if key is not None and not flashes_pending():
+        html = result_cache.get(key)
+        result_cache_total.inc(result='miss' if html is None else 'hit')
+        if html is None:
+            html = render_result_page(answers)
+            result_cache.put(key, html)
+        return html
+    return render_result_page(answers)
+
+def render_result_page(answers):
+    recommendation, scores, explanations = score_answers(answers)
+    return render_template('result.html', recommendation=recommendation, scores=scores, explanations=explanations, answers=answers, questions=QUESTIONS, cloud_questions=CLOUD_READINESS_QUESTIONS)
+
 @app.route('/submit_to_eotss', methods=['POST'])
 def submit_to_eotss():
     """
@@ -388,47 +773,32 @@ def submit_to_eotss():
         'department': request.form.get('department', '')
     }
     
-    # Get the assessment results from the form
-    recommendation = request.form.get('recommendation', '')
-    scores = request.form.get('scores', '')
-    explanations = request.form.get('explanations', '')
-    answers = request.form.get('answers', '')
+    # Get the answers from the form; the results are computed again here rather than trusted
+    answers = {key: request.form.get(key, '') for key in scoring.ANSWER_KEYS}
     
     # Validate required fields
     if not all([agency_info['agency_name'], agency_info['contact_name'], agency_info['contact_email'], agency_info['department']]):
         flash('Please fill in all required fields.', 'error')
         return redirect(url_for('index'))
+    if batch_scoring.invalid_answers(answers):
+        flash('The assessment answers were incomplete. Please complete the assessment again.', 'error')
+        return redirect(url_for('index'))
     
-    # Prepare results data
-    results_data = {
-        'recommendation': recommendation,
-        'scores_text': scores,
-        'explanations_text': explanations,
-        'answers_text': answers,
-        'scores_html': scores.replace('\n', '<br>'),
-        'explanations_html': explanations.replace('\n', '<br>'),
-        'answers_html': answers.replace('\n', '<br>'),
-        'date': datetime.now().strftime('%B %d, %Y'),
-        'contact_name': agency_info['contact_name']
-    }
+    recommendation, scores, explanations, app_age = scoring.recommend(answers)
+    scoring_total.inc(source='submit')
+    assessment_data = answer_format.structured_assessment_data(answers, recommendation, scores, explanations, app_age)
+    results_data = dict(results_view(assessment_data), date=datetime.now().strftime('%B %d, %Y'),
+                        contact_name=agency_info['contact_name'])
     
     # Save assessment to file
-    assessment_data = {
-        'recommendation': recommendation,
-        'scores': scores,
-        'explanations': explanations,
-        'answers': answers,
-        'results_data': results_data
-    }
-    
     assessment_id, ticket_id = save_assessment(agency_info, assessment_data)
     
-    # Send emails
+    # Queue emails (delivered in the background, see outbox.py)
     eotss_sent = send_eotss_notification(agency_info, results_data, assessment_id, ticket_id)
-    confirmation_sent = send_agency_confirmation(agency_info['contact_email'], results_data, ticket_id)
+    confirmation_sent = send_agency_confirmation(agency_info['contact_email'], results_data, assessment_id, ticket_id)
     
     if eotss_sent and confirmation_sent:
-        flash('Assessment submitted successfully! EOTSS has been notified and you will receive a confirmation email shortly.', 'success')
+        flash('Assessment submitted successfully! EOTSS will be notified and you will receive a confirmation email shortly.', 'success')
     elif eotss_sent:
         flash('Assessment submitted to EOTSS, but there was an issue sending your confirmation email. Please contact EOTSS directly.', 'warning')
     else:
@@ -441,74 +811,453 @@ def view_assessment(ticket_id):
     """
     Display assessment results by ticket ID.
     """
-    # Find assessment by ticket ID
-    assessment = None
-    if os.path.exists(DATA_DIR):
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.json') and ticket_id in filename:
-                assessment_file = os.path.join(DATA_DIR, filename)
-                with open(assessment_file, 'r') as f:
-                    assessment = json.load(f)
-                break
-    
-    if not assessment:
+    version = store.record_version_by_ticket(ticket_id)
+    if version is None:
         flash('Assessment not found.', 'error')
         return redirect(url_for('dashboard'))
     
-    return render_template('view_assessment.html', assessment=assessment)
+    def render():
+        # Find assessment by ticket ID
+        assessment = store.get_by_ticket(ticket_id)
+        if not assessment:
+            flash('Assessment not found.', 'error')
+            return redirect(url_for('dashboard'))
+        return render_template('view_assessment.html', assessment=assessment)
+    
+    return conditional_page(version, render)
+
+def conditional_page(version, render):
+    """
+    Serve a page with ETag and Last-Modified validators, answering 304 Not Modified
+    when the client (or nginx) already has the current version.
+    Args:
+        version (tuple): (tag, last modified epoch seconds) of the data shown, from the store.
+            Pages changed within the current second are served without Last-Modified.
+            It must be taken before the data is read, so the page is never older than its tag.
+        render (callable): Produces the full response; only called when the page has changed.
+    Returns:
+        Response: The rendered page or an empty 304.
+    """
+    if flashes_pending():
+        # Pending flash messages are shown on the page, so it must be rendered now
+        response = make_response(render())
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    tag, modified_at = version
+    etag = hashlib.sha1(f"{TEMPLATE_FINGERPRINT}:{tag}".encode()).hexdigest()
+    last_modified = datetime.fromtimestamp(int(modified_at), timezone.utc)
+    # Last-Modified has whole-second resolution, so a second write within the same second
+    # would carry the same date; the date only identifies the page once that second is over
+    dated = int(modified_at) < int(time.time())
+    if request.if_none_match:
+        # Weak comparison, since nginx marks ETags weak when it gzips a response
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = dated and request.if_modified_since is not None and last_modified <= request.if_modified_since
+    response = Response(status=304) if not_modified else make_response(render())
+    if response.status_code in (200, 304):
+        response.set_etag(etag)
+        if dated:
+            response.last_modified = last_modified
+        response.cache_control.no_cache = True
+    return response
+
+def parse_date_arg(name):
+    """
+    Parse a YYYY-MM-DD query parameter.
+    Returns a date, or None if the parameter is missing or malformed.
+    """
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def encode_cursor(cursor):
+    """
+    Encode a page_cursor for a pagination link.
+    """
+    return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def parse_cursor_arg(name, sort):
+    """
+    Parse a cursor query parameter written by encode_cursor for the given sort.
+    Returns the cursor tuple, or None if the parameter is missing or malformed.
+    """
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+    except ValueError:
+        return None
+    if (not isinstance(cursor, list) or len(cursor) != len(SORT_ORDERS[sort]) + 1
+            or not all(value is None or isinstance(value, str) for value in cursor)):
+        return None
+    return tuple(cursor)
 
 @app.route('/dashboard')
 def dashboard():
     """
-    Display a dashboard of all assessments for EOTSS management.
+    Display a paginated, filterable dashboard of assessments for EOTSS management.
+    Query parameters: page, limit, status, agency, date_from, date_to (YYYY-MM-DD), sort and order,
+    and after or before: the cursor of the record the page follows or precedes (set by the
+    Previous and Next links, so paging seeks to it rather than skipping page * limit records).
     """
-    assessments = []
+    limit = request.args.get('limit', DASHBOARD_PAGE_SIZES[0], type=int)
+    if limit not in DASHBOARD_PAGE_SIZES:
+        limit = DASHBOARD_PAGE_SIZES[0]
+    page = max(request.args.get('page', 1, type=int), 1)
+    status = request.args.get('status', '')
+    if status not in DASHBOARD_STATUSES:
+        status = ''
+    agency = request.args.get('agency', '').strip()
+    date_from = parse_date_arg('date_from')
+    date_to = parse_date_arg('date_to')
+    sort = request.args.get('sort', 'submitted_at')
+    if sort not in SORT_KEYS:
+        sort = 'submitted_at'
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    after = parse_cursor_arg('after', sort)
+    before = parse_cursor_arg('before', sort) if after is None else None
     
-    if os.path.exists(DATA_DIR):
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.json'):
-                assessment_file = os.path.join(DATA_DIR, filename)
-                try:
-                    with open(assessment_file, 'r') as f:
-                        assessment = json.load(f)
-                        assessments.append(assessment)
-                except:
-                    continue
+    version = store.generation()
     
-    # Sort by submission date (newest first)
-    assessments.sort(key=lambda x: x['submitted_at'], reverse=True)
+    def render():
+        # One record more than the page shows whether there is another page in that direction
+        assessments, total = store.query(
+            status=status or None,
+            agency=agency or None,
+            date_from=date_from.isoformat() if date_from else None,
+            # date_to is inclusive, so stop at the start of the following day
+            date_until=(date_to + timedelta(days=1)).isoformat() if date_to else None,
+            sort=sort,
+            descending=(order == 'desc'),
+            after=after,
+            before=before,
+            offset=(page - 1) * limit,
+            limit=limit + 1,
+            max_count=DASHBOARD_MAX_COUNT,
+        )
+        current_page = page
+        if before is not None:
+            has_previous = len(assessments) > limit
+            assessments = assessments[-limit:]
+            has_next = True
+            if not has_previous:
+                current_page = 1
+        else:
+            has_previous = after is not None or page > 1
+            has_next = len(assessments) > limit
+            assessments = assessments[:limit]
+        
+        # Current (non-empty) filters, used to refill the form and build pagination links
+        filters = {
+            'limit': limit,
+            'status': status,
+            'agency': agency,
+            'date_from': date_from.isoformat() if date_from else '',
+            'date_to': date_to.isoformat() if date_to else '',
+            'sort': sort,
+            'order': order,
+        }
+        filters = {k: v for k, v in filters.items() if v}
+        
+        previous_args = next_args = None
+        if has_previous and assessments:
+            previous_args = {'page': max(current_page - 1, 1), 'before': encode_cursor(page_cursor(assessments[0], sort))}
+        if has_next and assessments:
+            next_args = {'page': current_page + 1, 'after': encode_cursor(page_cursor(assessments[-1], sort))}
+        
+        return render_template(
+            'dashboard.html',
+            assessments=assessments,
+            stats=store.counters(),
+            total=total,
+            more=total > DASHBOARD_MAX_COUNT,
+            page=current_page,
+            pages=max(math.ceil(min(total, DASHBOARD_MAX_COUNT) / limit), 1),
+            previous_args=previous_args,
+            next_args=next_args,
+            filters=filters,
+            statuses=DASHBOARD_STATUSES,
+            page_sizes=DASHBOARD_PAGE_SIZES,
+        )
     
-    return render_template('dashboard.html', assessments=assessments)
+    return conditional_page(version, render)
+
+def run_search(query, page, limit):
+    """
+    Search the assessments and load the page of matching records.
+    Returns:
+        tuple: (records, number of matches (SEARCH_MAX_RESULTS + 1 when there are more))
+    """
+    offset = min((page - 1) * limit, SEARCH_MAX_RESULTS)
+    ids, total = search_index.search(query, offset=offset, limit=min(limit, SEARCH_MAX_RESULTS - offset),
+                                     max_results=SEARCH_MAX_RESULTS)
+    # An ID the store no longer has (the index outlived a restore) is skipped
+    records = [record for record in (store.get(assessment_id) for assessment_id in ids) if record]
+    return records, total
+
+@app.route('/search')
+def search():
+    """
+    Full-text search of agency, department, contact, review notes and recommendation text,
+    shown in the dashboard's table, newest first.
+    Query parameters: q, page and limit.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return redirect(url_for('dashboard'))
+    limit = request.args.get('limit', DASHBOARD_PAGE_SIZES[0], type=int)
+    if limit not in DASHBOARD_PAGE_SIZES:
+        limit = DASHBOARD_PAGE_SIZES[0]
+    page = max(request.args.get('page', 1, type=int), 1)
+    
+    assessments, total = run_search(query, page, limit)
+    pages = max(math.ceil(min(total, SEARCH_MAX_RESULTS) / limit), 1)
+    return render_template(
+        'dashboard.html',
+        assessments=assessments,
+        stats=store.counters(),
+        total=total,
+        more=total > SEARCH_MAX_RESULTS,
+        page=page,
+        pages=pages,
+        previous_args={'page': page - 1} if page > 1 else None,
+        next_args={'page': page + 1} if page < pages else None,
+        filters={'limit': limit},
+        query=query,
+        statuses=DASHBOARD_STATUSES,
+        page_sizes=DASHBOARD_PAGE_SIZES,
+    )
+
+@app.route('/api/search')
+def api_search():
+    """
+    Full-text search as JSON.
+    Query parameters: q, page and limit (up to 100).
+    Returns:
+        JSON: query, total (SEARCH_MAX_RESULTS + 1 meaning more), page and the matching records.
+    """
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', DASHBOARD_PAGE_SIZES[0], type=int), 1), DASHBOARD_PAGE_SIZES[-1])
+    page = max(request.args.get('page', 1, type=int), 1)
+    records, total = run_search(query, page, limit)
+    return jsonify({"query": query, "total": total, "page": page, "results": records})
+
+@app.route('/export.<export_format>')
+def export_assessments(export_format):
+    """
+    Stream every assessment matching the filters as a download, oldest first.
+    Query parameters: status, agency, date_from, date_to (YYYY-MM-DD), as on the dashboard.
+    Records are read and written one at a time (see export.py), so the export's size does not
+    affect the worker's memory use.
+    """
+    if export_format not in export.FORMATS:
+        return jsonify({"error": f"Export format must be one of: {', '.join(export.FORMATS)}"}), 404
+    status = request.args.get('status', '')
+    if status and status not in DASHBOARD_STATUSES:
+        return jsonify({"error": f"Unknown status: {status}"}), 400
+    date_from = parse_date_arg('date_from')
+    date_to = parse_date_arg('date_to')
+    
+    records = store.iter_matching(
+        status=status or None,
+        agency=request.args.get('agency', '').strip() or None,
+        date_from=date_from.isoformat() if date_from else None,
+        # date_to is inclusive, so stop at the start of the following day
+        date_until=(date_to + timedelta(days=1)).isoformat() if date_to else None,
+    )
+    filename = f"assessments-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(export.export_chunks(export_format, records)),
+        mimetype=export.MIMETYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let nginx pass chunks on as they come instead of buffering the whole export
+            'X-Accel-Buffering': 'no',
+            'Cache-Control': 'no-store',
+        },
+    )
+
+@app.route('/api/dashboard/counters')
+def dashboard_counters():
+    """
+    Return the dashboard summary counters as JSON.
+    """
+    return jsonify(store.counters())
+
+@app.route('/api/score/batch', methods=['POST'])
+def score_batch():
+    """
+    Score many applications in one request.
+    The body is a JSON array or NDJSON (one object per line) of answer sets keyed like the form fields.
+    Returns:
+        JSON: rules_version, count and one result per answer set, in input order. Answer sets with
+        missing answers get an 'error' entry instead of a recommendation.
+    """
+    try:
+        items = batch_scoring.parse_answer_sets(request.get_data(as_text=True))
+    except ValueError as e:
+        return jsonify({"error": f"Body must be a JSON array or NDJSON of answer sets: {e}"}), 400
+    max_items = app.config['BATCH_SCORE_MAX_ITEMS']
+    if len(items) > max_items:
+        return jsonify({"error": f"At most {max_items} answer sets can be scored per request"}), 413
+
+    results = [None] * len(items)
+    valid_rows = []
+    for i, item in enumerate(items):
+        missing = batch_scoring.missing_answers(item)
+        if missing:
+            results[i] = {"index": i, "error": f"Missing answers: {', '.join(missing)}"}
+        else:
+            valid_rows.append(i)
+    scorer = batch_scoring.current_scorer()
+    scored = scorer.score([items[i] for i in valid_rows])
+    scoring_total.inc(len(valid_rows), source='batch')
+    for i, (recommendation, scores, explanations, app_age) in zip(valid_rows, scored):
+        results[i] = {
+            "index": i,
+            "recommendation": recommendation,
+            "scores": scores,
+            "explanations": explanations,
+            "app_age": app_age,
+        }
+    return jsonify({"rules_version": scorer.version, "count": len(results), "results": results})
+
+AGENCY_FIELDS = ('agency_name', 'department', 'contact_name', 'contact_email')
+
+def bulk_row_error(item):
+    """
+    Return why a bulk submission row cannot be accepted, or None if it can.
+    """
+    if not isinstance(item, dict) or not isinstance(item.get('agency_info'), dict):
+        return "Each row needs an agency_info object and an answers object"
+    agency_info = item['agency_info']
+    missing = [field for field in AGENCY_FIELDS
+               if not isinstance(agency_info.get(field), str) or not agency_info[field].strip()]
+    if missing:
+        return f"Missing agency_info fields: {', '.join(missing)}"
+    answers = item.get('answers')
+    missing = batch_scoring.missing_answers(answers)
+    if missing:
+        return f"Missing answers: {', '.join(missing)}"
+    invalid = batch_scoring.invalid_answers(answers)
+    if invalid:
+        return f"Invalid answers: {', '.join(invalid)}"
+    return None
+
+@app.route('/api/assessments/bulk', methods=['POST'])
+def bulk_submit():
+    """
+    Submit many assessments in one request, e.g. an agency's whole application portfolio.
+    The body is NDJSON (one object per line) or a JSON array of objects with agency_info
+    (agency_name, department, contact_name, contact_email) and answers (keyed like the form fields).
+    Every valid row is scored, given a ticket ID and saved in one storage batch, and EOTSS
+    gets a single email listing them all.
+    Returns:
+        JSON: batch_id, rules_version, accepted and rejected counts, and one result per row in
+        input order: the assessment's id, ticket_id and recommendation, or an 'error'.
+    """
+    try:
+        items = batch_scoring.parse_answer_sets(request.get_data(as_text=True))
+    except ValueError as e:
+        return jsonify({"error": f"Body must be NDJSON or a JSON array of assessments: {e}"}), 400
+    max_rows = app.config['BULK_SUBMIT_MAX_ROWS']
+    if len(items) > max_rows:
+        return jsonify({"error": f"At most {max_rows} assessments can be submitted per request"}), 413
+    
+    results = [None] * len(items)
+    valid_rows = []
+    for i, item in enumerate(items):
+        error = bulk_row_error(item)
+        if error:
+            results[i] = {"index": i, "error": error}
+        else:
+            valid_rows.append(i)
+    
+    scorer = batch_scoring.current_scorer()
+    scored = scorer.score([items[i]['answers'] for i in valid_rows])
+    scoring_total.inc(len(valid_rows), source='bulk')
+    batch_id = uuid.uuid4().hex
+    now = datetime.now()
+    records = []
+    for i, ticket_id, (recommendation, scores, explanations, app_age) in zip(
+            valid_rows, allocate_ticket_ids(len(valid_rows)), scored):
+        agency_info = {field: items[i]['agency_info'][field].strip() for field in AGENCY_FIELDS}
+        assessment_data = answer_format.structured_assessment_data(
+            items[i]['answers'], recommendation, scores, explanations, app_age)
+        record = new_assessment_record(agency_info, assessment_data, ticket_id, now, scorer.version)
+        record['bulk_batch_id'] = batch_id
+        records.append(record)
+        results[i] = {"index": i, "id": record['id'], "ticket_id": ticket_id, "recommendation": recommendation}
+    
+    notification_queued = False
+    if records:
+        store.save_many(records)
+        submissions_total.inc(len(records))
+        try:
+            search_index.add_many(records)
+        except Exception as e:
+            print(f"Error indexing assessments for search: {e}")
+        notification_queued = send_bulk_eotss_notification(batch_id, records)
+    
+    return jsonify({
+        "batch_id": batch_id if records else None,
+        "rules_version": scorer.version,
+        "accepted": len(records),
+        "rejected": len(items) - len(records),
+        "notification_queued": notification_queued,
+        "results": results,
+    })
 
 @app.route('/review/<assessment_id>')
 def review_assessment(assessment_id):
     """
     Display the review form for EOTSS to approve/reject an assessment.
     """
-    assessment = load_assessment(assessment_id)
-    if not assessment:
+    version = store.record_version(assessment_id)
+    if version is None:
         flash('Assessment not found.', 'error')
         return redirect(url_for('index'))
     
-    if assessment['status'] != 'pending':
-        flash('This assessment has already been reviewed.', 'info')
-        return redirect(url_for('index'))
+    def render():
+        assessment = load_assessment(assessment_id)
+        if not assessment:
+            flash('Assessment not found.', 'error')
+            return redirect(url_for('index'))
+        
+        if assessment['status'] != 'pending':
+            flash('This assessment has already been reviewed.', 'info')
+            return redirect(url_for('index'))
+        
+        return render_template('review.html', assessment=assessment)
     
-    return render_template('review.html', assessment=assessment)
+    return conditional_page(version, render)
 
 @app.route('/process_review/<assessment_id>', methods=['POST'])
 def process_review(assessment_id):
     """
-    Handle the review decision (approve/reject) from EOTSS.
+    Handle the review decision (approve/reject) from EOTSS, or an edit of the decision
+    (from edit_review) made before the agency has been notified.
     """
     assessment = load_assessment(assessment_id)
     if not assessment:
         flash('Assessment not found.', 'error')
         return redirect(url_for('index'))
     
-    if assessment['status'] != 'pending':
-        flash('This assessment has already been reviewed.', 'info')
-        return redirect(url_for('index'))
+    edited = assessment['status'] != 'pending'
+    if edited:
+        if assessment.get('notification_sent', False):
+            flash('Cannot edit review after notification has been sent.', 'warning')
+            return redirect(url_for('dashboard'))
+        if delivery_in_progress(assessment, 'review_notification'):
+            flash('Cannot edit review while its notification is being sent.', 'warning')
+            return redirect(url_for('dashboard'))
+    form_url = url_for('edit_review' if edited else 'review_assessment', assessment_id=assessment_id)
     
     # Get review decision
     decision = request.form.get('decision')
@@ -517,21 +1266,25 @@ def process_review(assessment_id):
     
     if decision not in ['approved', 'overridden']:
         flash('Invalid decision.', 'error')
-        return redirect(url_for('review_assessment', assessment_id=assessment_id))
+        return redirect(form_url)
     
     # Validate override requirements
     if decision == 'overridden':
         if not override_reason:
             flash('Please select an alternative recommendation.', 'error')
-            return redirect(url_for('review_assessment', assessment_id=assessment_id))
+            return redirect(form_url)
         if not review_notes.strip():
             flash('Please provide review notes when overriding the system recommendation.', 'error')
-            return redirect(url_for('review_assessment', assessment_id=assessment_id))
+            return redirect(form_url)
+    else:
+        override_reason = ''
     
     # Update assessment status (without sending email)
-    success = update_assessment_status(assessment_id, decision, review_notes, override_reason)
+    success = update_assessment_status(assessment_id, decision, review_notes, override_reason, edited=edited)
     
-    if success:
+    if success and edited:
+        flash(f'Review updated: assessment {decision}. The earlier decision is kept in its history.', 'success')
+    elif success:
         flash(f'Assessment {decision}. You can now send the notification to the agency from the dashboard.', 'success')
     else:
         flash('Error updating assessment status.', 'error')
@@ -556,43 +1309,64 @@ def send_notification(assessment_id):
         flash('Notification has already been sent for this assessment.', 'info')
         return redirect(url_for('dashboard'))
     
-    # Send notification to agency
-    agency_email = assessment['agency_info']['contact_email']
-    agency_name = assessment['agency_info']['agency_name']
-    ticket_id = assessment['ticket_id']
-    review_notes = assessment.get('review_notes', '')
-    override_reason = assessment.get('override_reason', '')
-    
-    notification_sent = send_review_notification(agency_email, agency_name, assessment['status'], ticket_id, review_notes, override_reason)
+    if delivery_in_progress(assessment, 'review_notification'):
+        flash('Notification is already queued for delivery.', 'info')
+        return redirect(url_for('dashboard'))
     
-    if notification_sent:
-        # Mark notification as sent
-        mark_notification_sent(assessment_id)
-        flash(f'Notification sent successfully to {agency_name}.', 'success')
+    if queue_review_notification(assessment):
+        # notification_sent is set once the outbox has delivered it
+        flash(f"Notification to {assessment['agency_info']['agency_name']} queued for delivery.", 'success')
     else:
-        flash('Failed to send notification email.', 'error')
+        flash('Failed to queue notification email.', 'error')
     
     return redirect(url_for('dashboard'))
 
-def mark_notification_sent(assessment_id):
-    """
-    Mark that notification email has been sent for an assessment.
-    """
-    if os.path.exists(DATA_DIR):
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.json') and assessment_id in filename:
-                assessment_file = os.path.join(DATA_DIR, filename)
-                with open(assessment_file, 'r') as f:
-                    assessment = json.load(f)
-                
-                assessment["notification_sent"] = True
-                assessment["notification_sent_at"] = datetime.now().isoformat()
-                
-                with open(assessment_file, 'w') as f:
-                    json.dump(assessment, f, indent=2)
-                
-                return True
-    return False
+def queue_review_notification(assessment):
+    """
+    Queue the review decision email for a reviewed assessment.
+    Returns:
+        bool: True if it was queued.
+    """
+    return send_review_notification(
+        assessment['id'],
+        assessment['agency_info']['contact_email'],
+        assessment['agency_info']['agency_name'],
+        assessment['status'],
+        assessment['ticket_id'],
+        assessment.get('review_notes', ''),
+        assessment.get('override_reason', ''),
+    )
+
+@app.route('/send_ready_notifications', methods=['POST'])
+def send_ready_notifications():
+    """
+    Queue notifications for every reviewed assessment whose agency has not been notified yet.
+    The outbox then delivers them in batches over pooled SMTP connections.
+    """
+    ready = []
+    for status in ('approved', 'overridden'):
+        _, total = store.query(status=status, notification_sent=False, limit=0)
+        records, _ = store.query(status=status, notification_sent=False, sort='submitted_at', descending=False, limit=total)
+        ready.extend(records)
+    
+    queued = failed = in_progress = 0
+    for assessment in ready:
+        if delivery_in_progress(assessment, 'review_notification'):
+            in_progress += 1
+        elif queue_review_notification(assessment):
+            queued += 1
+        else:
+            failed += 1
+    
+    if queued:
+        flash(f"Queued {queued} notification{'s' if queued != 1 else ''} for delivery.", 'success')
+    elif not failed:
+        flash('There are no reviewed assessments waiting for a notification.', 'info')
+    if in_progress:
+        flash(f"{in_progress} notification{'s were' if in_progress != 1 else ' was'} already queued.", 'info')
+    if failed:
+        flash(f"Failed to queue {failed} notification{'s' if failed != 1 else ''}.", 'error')
+    return redirect(url_for('dashboard'))
 
 @app.route('/edit_review/<assessment_id>')
 def edit_review(assessment_id):
@@ -612,6 +1386,10 @@ def edit_review(assessment_id):
         flash('Cannot edit review after notification has been sent.', 'warning')
         return redirect(url_for('dashboard'))
     
+    if delivery_in_progress(assessment, 'review_notification'):
+        flash('Cannot edit review while its notification is being sent.', 'warning')
+        return redirect(url_for('dashboard'))
+    
     return render_template('review.html', assessment=assessment, edit_mode=True)
 
 if __name__ == '__main__':
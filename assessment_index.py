@@ -0,0 +1,762 @@
+"""
+On-disk index of stored assessments for the EOTSS Hosting Recommendation System.
+
+Maps both the assessment ``id`` and the ``ticket_id`` to the JSON file holding the
+record, so lookups no longer need to scan DATA_DIR, and keeps the few fields the
+dashboard filters and sorts on. The index is an append-only
+JSON-lines log that is rebuilt from the directory at startup and appended to on
+every save. Each gunicorn worker keeps the index in memory and replays whatever
+other workers have appended since it last looked.
+
+Record files live in two levels of shard directories named after the ticket ID's hash
+('3f/a2/{ticket_id}_{id}.json', see shard_filename), so no directory grows past a few
+hundred entries. Files in the older flat layout, directly in DATA_DIR, are still found.
+
+Changes to a stored record (reviews, edits, delivery status) are appended as events
+to a journal next to its file, '{ticket_id}_{id}.events.jsonl', instead of rewriting
+the record; the record is its last snapshot with the journal's events replayed over it.
+
+Listings are served from the entries' IDs kept sorted, one list per SORT_ORDERS order,
+so a page is found by bisection rather than by copying and sorting every entry
+(see AssessmentIndex.select).
+
+A batch of new records (save_many) is committed by the one index append that lists them
+all; until then a '.{uuid}.batch-pending' marker names its files, so a rebuild after the
+writer died part way removes them instead of indexing half a batch (see pending_batch).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines have no flock
+    fcntl = None
+
+INDEX_FILENAME = '.assessment_index.jsonl'
+LOCK_FILENAME = '.assessment_index.lock'
+JOURNAL_SUFFIX = '.events.jsonl'
+BATCH_MARKER_SUFFIX = '.batch-pending'
+
+# Names of the two levels of shard directories; anything else in DATA_DIR (the outbox, ...) is not walked
+SHARD_DIR_PATTERN = re.compile(r'[0-9a-f]{2}')
+
+# Orders a listing can be sorted in, with the summary fields each compares (then the
+# assessment ID, so every entry has its own place). Agency names compare case-insensitively.
+SORT_ORDERS = {
+    'submitted_at': ('submitted_at',),
+    'ticket_id': ('ticket_id',),
+    'agency_name': ('agency_name', 'submitted_at'),
+    'status': ('status', 'submitted_at'),
+}
+
+# Changed entries moved in the sorted orders one by one; more are merged in one pass
+ORDER_PATCH_LIMIT = 8
+
+# Kinds of change journaled for a record; its first snapshot is the submission itself
+EVENT_TYPES = ('reviewed', 'edited', 'notified', 'updated')
+
+# Events that also add an entry to the record's review_history, with these fields
+REVIEW_EVENTS = ('reviewed', 'edited')
+REVIEW_FIELDS = ('status', 'reviewed_at', 'review_notes', 'override_reason')
+
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Hold an exclusive advisory lock on lock_path, shared by all worker processes.
+    A no-op where flock is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def pending_batch(data_dir, files):
+    """
+    Mark a batch of new record files as uncommitted while they are written and indexed.
+    The marker lists the files and stays locked by this process until the block ends;
+    AssessmentIndex.rebuild removes the files of a marker nobody holds whose records did
+    not all reach the index, and leaves alone those of a batch still in progress.
+    Args:
+        data_dir (str): The data directory.
+        files (list): (assessment ID, path relative to data_dir) of each new record.
+    """
+    name = f".{uuid.uuid4().hex}"
+    tmp_path = os.path.join(data_dir, f"{name}.tmp")
+    marker_path = os.path.join(data_dir, name + BATCH_MARKER_SUFFIX)
+    with open(tmp_path, 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(json.dumps(files))
+        f.flush()
+        # Renamed into place only once complete and locked, so a rebuild never sees it otherwise
+        os.replace(tmp_path, marker_path)
+        yield
+        # After an error the marker stays, for the next rebuild to settle against the index
+        os.remove(marker_path)
+
+
+def parse_assessment_filename(filename):
+    """
+    Split a stored assessment filename into its identifiers.
+    Args:
+        filename (str): A name like 'ABC12345_<uuid>.json' (or '<uuid>.json' for older records).
+    Returns:
+        tuple: (ticket_id or None, assessment_id), or None if this is not an assessment file.
+    """
+    if not filename.endswith('.json') or filename.startswith('.'):
+        return None
+    stem = filename[:-len('.json')]
+    if '_' in stem:
+        ticket_id, assessment_id = stem.split('_', 1)
+        return ticket_id, assessment_id
+    return None, stem
+
+
+def shard_filename(ticket_id, assessment_id):
+    """
+    Return the path, relative to the data directory, of a record file in the sharded layout.
+    Args:
+        ticket_id (str): The record's ticket ID (None for older records, sharded by ID instead).
+        assessment_id (str): The record's assessment ID.
+    Returns:
+        str: 'ab/cd/{ticket_id}_{id}.json', where 'abcd' starts the SHA-1 of the ticket ID.
+    """
+    digest = hashlib.sha1((ticket_id or assessment_id).encode()).hexdigest()
+    filename = f"{ticket_id}_{assessment_id}.json" if ticket_id else f"{assessment_id}.json"
+    return f"{digest[:2]}/{digest[2:4]}/{filename}"
+
+
+def _is_shard_dir(dir_entry):
+    return SHARD_DIR_PATTERN.fullmatch(dir_entry.name) is not None and dir_entry.is_dir()
+
+
+def iter_data_files(data_dir):
+    """
+    Yield (path relative to data_dir, os.DirEntry) for every file directly in data_dir
+    (the flat layout) or in its shard directories.
+    """
+    with os.scandir(data_dir) as it:
+        top = list(it)
+    for dir_entry in top:
+        if not _is_shard_dir(dir_entry):
+            yield dir_entry.name, dir_entry
+            continue
+        with os.scandir(dir_entry.path) as it:
+            shards = [shard for shard in it if _is_shard_dir(shard)]
+        for shard in shards:
+            with os.scandir(shard.path) as it:
+                for file_entry in it:
+                    yield f"{dir_entry.name}/{shard.name}/{file_entry.name}", file_entry
+
+
+def journal_filename(filename):
+    """
+    Return the name of the event journal kept next to a record file ('X.json' -> 'X.events.jsonl').
+    """
+    return filename[:-len('.json')] + JOURNAL_SUFFIX
+
+
+def read_journal(path):
+    """
+    Return the events in a record's journal, oldest first ([] if it has none).
+    A last line still being written by another worker is left out.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    return [json.loads(line) for line in data.split(b'\n')[:-1] if line.strip()]
+
+
+def apply_event(record, event):
+    """
+    Apply one journal event ({'type', 'at', 'changes'}) to a record, in place.
+    """
+    changes = event['changes']
+    record.update(changes)
+    if event['type'] in REVIEW_EVENTS:
+        entry = {"event": event['type'], "at": event['at']}
+        entry.update((field, changes[field]) for field in REVIEW_FIELDS if field in changes)
+        record.setdefault('review_history', []).append(entry)
+    return record
+
+
+def apply_events(record, events):
+    """
+    Replay journal events over a record snapshot. Events up to the snapshot's
+    'compacted_through' event ID are already part of it and are skipped.
+    Returns:
+        dict: The record, updated in place.
+    """
+    compacted = record.get('compacted_through')
+    if compacted is not None:
+        for i, event in enumerate(events):
+            if event.get('id') == compacted:
+                events = events[i + 1:]
+                break
+    for event in events:
+        apply_event(record, event)
+    return record
+
+
+def sort_key(values, sort):
+    """
+    Return the key of an entry (or of a keyset cursor's values) in a SORT_ORDERS order.
+    Args:
+        values (dict or tuple): An index entry, or the order's field values followed by an ID.
+        sort (str): One of SORT_ORDERS.
+    Returns:
+        tuple: The order's field values, then the assessment ID.
+    """
+    if isinstance(values, dict):
+        values = [values.get(field) for field in SORT_ORDERS[sort]] + [values['id']]
+    key = [value or '' for value in values]
+    if sort == 'agency_name':
+        key[0] = key[0].lower()
+    return tuple(key)
+
+
+def _value_range(prefix, low=None, high=None):
+    """
+    Return the (lower, upper) keys bounding the keys that start with prefix and whose next
+    value is >= low and < high (each bound optional), for bisecting a sorted order.
+    """
+    lower = prefix + (low,) if low is not None else prefix
+    if high is not None:
+        upper = prefix + (high,)
+    elif prefix:
+        # '\0' sorts before every other character, so this is just past every key with this prefix
+        upper = prefix[:-1] + (prefix[-1] + '\0',)
+    else:
+        upper = None
+    return lower, upper
+
+
+def _prefix_end(text):
+    """
+    Return the smallest string greater than every string that starts with text.
+    """
+    return text[:-1] + chr(ord(text[-1]) + 1)
+
+
+def summarize_record(record):
+    """
+    Extract the fields the index keeps for filtering and sorting a record.
+    Returns:
+        dict: status, submitted_at, agency_name and notification_sent.
+    """
+    return {
+        "status": record.get("status", "pending"),
+        "submitted_at": record.get("submitted_at", ""),
+        "agency_name": record.get("agency_info", {}).get("agency_name", ""),
+        "notification_sent": bool(record.get("notification_sent", False)),
+    }
+
+
+# Dashboard counters: 'total' plus exactly one workflow bucket per assessment
+COUNTER_NAMES = ('total', 'pending', 'reviewed_awaiting', 'approved_notified', 'overridden_notified')
+
+
+def counter_bucket(summary):
+    """
+    Return the dashboard counter bucket for a record summary (see summarize_record),
+    or None if it falls in none of them.
+    """
+    if summary.get('status', 'pending') == 'pending':
+        return 'pending'
+    if not summary.get('notification_sent'):
+        return 'reviewed_awaiting'
+    if summary['status'] == 'approved':
+        return 'approved_notified'
+    if summary['status'] == 'overridden':
+        return 'overridden_notified'
+    return None
+
+
+class AssessmentIndex:
+    """
+    Persistent index of the assessment files in a data directory.
+    Maps id and ticket_id to the filename, and keeps a small summary of each record
+    (see summarize_record) so listings can be filtered and sorted without opening files.
+    Dashboard counters are adjusted as each entry is applied, so reading them is O(1).
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.index_path = os.path.join(data_dir, INDEX_FILENAME)
+        self.lock_path = os.path.join(data_dir, LOCK_FILENAME)
+        self._reset()
+        self._offset = 0
+        self._inode = None
+        self._mutex = threading.RLock()
+
+    @contextmanager
+    def _locked(self):
+        """Serialize index writes across threads and worker processes."""
+        with self._mutex, file_lock(self.lock_path):
+            yield
+
+    def _reset(self):
+        self._entries = {}
+        self._by_ticket = {}
+        self._counters = dict.fromkeys(COUNTER_NAMES, 0)
+        # IDs of the entries sorted by sort_key, per SORT_ORDERS order, built by the first
+        # listing. Entries changed since are moved on the next one (see _sorted); until then
+        # each is still placed by its keys from before the change, kept here.
+        self._orders = None
+        self._moved = {}
+
+    def _count(self, entry, delta):
+        if 'file' not in entry:
+            return
+        self._counters['total'] += delta
+        bucket = counter_bucket(entry)
+        if bucket:
+            self._counters[bucket] += delta
+
+    def _apply(self, entry):
+        current = self._entries.get(entry['id'])
+        if current is None:
+            current = self._entries[entry['id']] = {}
+        if self._orders is not None and entry['id'] not in self._moved:
+            self._moved[entry['id']] = ({sort: sort_key(current, sort) for sort in SORT_ORDERS}
+                                        if 'file' in current else None)
+        self._count(current, -1)
+        # Most entries share a handful of statuses and agencies; one copy of each will do
+        for field in ('status', 'agency_name'):
+            if isinstance(entry.get(field), str):
+                entry[field] = sys.intern(entry[field])
+        current.update(entry)
+        self._count(current, +1)
+        if current.get('ticket_id'):
+            self._by_ticket[current['ticket_id']] = entry['id']
+
+    def _key(self, sort):
+        """
+        Return a function giving the sort_key of an entry's ID in an order, as it is placed there.
+        """
+        entries = self._entries
+        moved = self._moved
+
+        def key(assessment_id):
+            if assessment_id in moved:
+                return moved[assessment_id][sort]
+            return sort_key(entries[assessment_id], sort)
+
+        return key
+
+    def _sorted(self):
+        """
+        Return the sorted orders, bringing them up to date first. Call with the mutex held.
+        """
+        entries = self._entries
+        if self._orders is None:
+            ids = [assessment_id for assessment_id, entry in entries.items() if 'file' in entry]
+            self._moved = {}
+            self._orders = {}
+            for sort, fields in SORT_ORDERS.items():
+                ties = fields[1] if len(fields) > 1 else None
+                if ties not in self._orders or SORT_ORDERS[ties] != fields[1:]:
+                    self._orders[sort] = sorted(ids, key=self._key(sort))
+                    continue
+                # An order that breaks ties by another is that one, stably sorted on its first field
+                field = fields[0]
+                if sort == 'agency_name':
+                    self._orders[sort] = sorted(self._orders[ties], key=lambda i: (entries[i].get(field) or '').lower())
+                else:
+                    self._orders[sort] = sorted(self._orders[ties], key=lambda i: entries[i].get(field) or '')
+            return self._orders
+        if not self._moved:
+            return self._orders
+        moved = self._moved
+        placed = [assessment_id for assessment_id, keys in moved.items() if keys is not None]
+        current = sorted(assessment_id for assessment_id in moved if 'file' in entries[assessment_id])
+        for sort in SORT_ORDERS:
+            ids = self._orders[sort]
+            key = self._key(sort)
+            if len(placed) > ORDER_PATCH_LIMIT:
+                ids = [assessment_id for assessment_id in ids if assessment_id not in moved]
+            else:
+                for assessment_id in placed:
+                    position = bisect_left(ids, moved[assessment_id][sort], key=key)
+                    if position < len(ids) and ids[position] == assessment_id:
+                        del ids[position]
+            self._orders[sort] = ids
+        self._moved = {}
+        for sort in SORT_ORDERS:
+            ids = self._orders[sort]
+            key = self._key(sort)
+            if len(current) <= ORDER_PATCH_LIMIT:
+                for assessment_id in current:
+                    insort(ids, assessment_id, key=key)
+                continue
+            # Merge the moved entries in by slicing at their places, copying the rest once
+            added = sorted(current, key=key)
+            merged = []
+            start = 0
+            for assessment_id in added:
+                position = bisect_left(ids, key(assessment_id), start, key=key)
+                merged += ids[start:position]
+                merged.append(assessment_id)
+                start = position
+            merged += ids[start:]
+            self._orders[sort] = merged
+        return self._orders
+
+    def _read_log(self):
+        entries = {}
+        try:
+            with open(self.index_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n') or not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    entries.setdefault(entry['id'], {}).update(entry)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return entries
+
+    def _append(self, entry):
+        with self._locked():
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._apply(entry)
+
+    def rebuild(self):
+        """
+        Rebuild the index from the files currently in the data directory.
+        Summaries already in the previous index are reused for files that are still
+        present, so only records the index has never seen are opened and parsed.
+        """
+        with self._locked():
+            previous = self._read_log()
+            in_progress = self._settle_batches(previous)
+            entries = []
+            for filename, dir_entry in iter_data_files(self.data_dir):
+                parsed = parse_assessment_filename(dir_entry.name)
+                if not parsed or filename in in_progress or not dir_entry.is_file():
+                    continue
+                ticket_id, assessment_id = parsed
+                entry = previous.get(assessment_id)
+                if not entry or entry.get('file') != filename or 'status' not in entry:
+                    try:
+                        with open(dir_entry.path, 'r') as f:
+                            record = json.load(f)
+                        journal = read_journal(os.path.join(self.data_dir, journal_filename(filename)))
+                    except (OSError, ValueError):
+                        continue
+                    apply_events(record, journal)
+                    entry = {"id": assessment_id, "ticket_id": ticket_id, "file": filename}
+                    entry.update(summarize_record(record))
+                entries.append(entry)
+
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self.index_path)
+
+            self._reset()
+            for entry in entries:
+                self._apply(entry)
+            stat = os.stat(self.index_path)
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+
+    def _settle_batches(self, previous):
+        """
+        Resolve the batch markers in the data directory (see pending_batch). Call with the lock held.
+        A batch whose records are all in the index log was committed and only its marker is
+        removed; one whose writer is gone without committing has its files removed as well.
+        Returns:
+            set: Files of batches still being written, which the writer will index itself.
+        """
+        in_progress = set()
+        with os.scandir(self.data_dir) as it:
+            markers = [dir_entry.path for dir_entry in it if dir_entry.name.endswith(BATCH_MARKER_SUFFIX)]
+        for marker_path in markers:
+            try:
+                marker = open(marker_path, 'r')
+            except FileNotFoundError:
+                continue  # committed meanwhile
+            with marker:
+                files = json.load(marker)
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(marker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        in_progress.update(filename for _, filename in files)
+                        continue
+                if not all((previous.get(assessment_id) or {}).get('file') == filename
+                           for assessment_id, filename in files):
+                    for _, filename in files:
+                        try:
+                            os.remove(os.path.join(self.data_dir, filename))
+                        except FileNotFoundError:
+                            pass
+                os.remove(marker_path)
+        return in_progress
+
+    def add(self, assessment_id, ticket_id, filename, summary):
+        """
+        Record where a newly saved assessment lives (its path relative to the data
+        directory), along with its summary fields.
+        """
+        entry = {"id": assessment_id, "ticket_id": ticket_id, "file": filename}
+        entry.update(summary)
+        self._append(entry)
+
+    def add_many(self, entries):
+        """
+        Record many newly saved assessments at once, as (assessment_id, ticket_id, filename,
+        summary) tuples. They are appended in one write, so other workers see all or none.
+        """
+        lines = []
+        for assessment_id, ticket_id, filename, summary in entries:
+            entry = {"id": assessment_id, "ticket_id": ticket_id, "file": filename}
+            entry.update(summary)
+            lines.append(entry)
+        if not lines:
+            return
+        with self._locked():
+            with open(self.index_path, 'a') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in lines))
+            for entry in lines:
+                self._apply(entry)
+
+    def update(self, assessment_id, summary):
+        """
+        Record new summary fields (e.g. a status change) for an existing assessment.
+        """
+        entry = {"id": assessment_id}
+        entry.update(summary)
+        self._append(entry)
+
+    def refresh(self):
+        """
+        Replay entries appended by other workers since the last read.
+        If the log was replaced by a rebuild, it is reloaded from the start.
+        """
+        with self._mutex:
+            try:
+                stat = os.stat(self.index_path)
+            except FileNotFoundError:
+                return
+            if stat.st_ino != self._inode:
+                self._reset()
+                self._offset = 0
+                self._inode = stat.st_ino
+            if stat.st_size <= self._offset:
+                return
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # partially written line; pick it up next time
+                    self._offset += len(line)
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+    def _path(self, assessment_id):
+        entry = self._entries.get(assessment_id)
+        if entry is None or 'file' not in entry:
+            return None
+        return os.path.join(self.data_dir, entry['file'])
+
+    def path_for_id(self, assessment_id):
+        """
+        Return the path of the record with the given assessment ID, or None.
+        """
+        if assessment_id not in self._entries:
+            self.refresh()
+        return self._path(assessment_id)
+
+    def path_for_ticket(self, ticket_id):
+        """
+        Return the path of the record with the given ticket ID, or None.
+        """
+        if ticket_id not in self._by_ticket:
+            self.refresh()
+        return self._path(self._by_ticket.get(ticket_id))
+
+    def entries(self):
+        """
+        Return a snapshot of every index entry (id, ticket_id, file and summary fields),
+        including changes made by other workers.
+        """
+        self.refresh()
+        with self._mutex:
+            return [dict(entry) for entry in self._entries.values() if 'file' in entry]
+
+    def select(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None,
+               sort='submitted_at', descending=True, after=None, before=None, offset=0, limit=25, max_count=None):
+        """
+        Return one page of the entries matching the filters, as AssessmentStore.query does.
+        The page is found in the sorted orders: a filter on the fields an order starts with
+        is a range of it found by bisection. A listing is read from the range of its own
+        order when that covers every filter (counting it costs nothing); otherwise the
+        smallest range that narrows it down is walked, or sorted first if it is in another
+        order. Either way only that range is touched, never every entry, and a range that
+        covers every filter gives the count without walking it.
+        Args:
+            after (tuple): Keyset cursor (see sort_key) of the entry just before the page.
+            before (tuple): Keyset cursor of the entry just after the page.
+            max_count (int): Count at most this many matches of a filtered listing; None counts them all.
+        Returns:
+            tuple: (entries on the page (copies), number of matching entries (at most
+            max_count + 1, meaning "more than max_count", for a filtered listing when max_count is given))
+        """
+        agency = agency.lower() if agency else None
+        cursor = after if after is not None else before
+        cursor = sort_key(cursor, sort) if cursor is not None else None
+
+        def matches(entry):
+            return ((status is None or entry['status'] == status)
+                    and (agency is None or (entry['agency_name'] or '').lower().startswith(agency))
+                    and (date_from is None or entry['submitted_at'] >= date_from)
+                    and (date_until is None or entry['submitted_at'] < date_until)
+                    and (notification_sent is None or entry['notification_sent'] == notification_sent))
+
+        dated = date_from is not None or date_until is not None
+        # (order, key prefix shared by the range, lower and upper keys, filters covered, in the listing's order)
+        ranges = []
+        if status is not None:
+            ranges.append(('status', (status,)) + _value_range((status,), date_from, date_until)
+                          + ({'status', 'date'}, sort == 'submitted_at'))
+            if sort == 'status':
+                ranges.append(('status', ()) + _value_range((status,)) + ({'status'}, True))
+        if agency:
+            ranges.append(('agency_name', ()) + _value_range((), agency, _prefix_end(agency))
+                          + ({'agency'}, sort == 'agency_name'))
+        if dated or sort == 'submitted_at':
+            ranges.append(('submitted_at', ()) + _value_range((), date_from, date_until)
+                          + ({'date'}, sort == 'submitted_at'))
+        ranges.append((sort, ()) + _value_range(()) + (set(), True))
+        filters = {name for name, value in (('status', status), ('agency', agency), ('date', dated or None),
+                                            ('notification', notification_sent)) if value is not None}
+
+        self.refresh()
+        with self._mutex:
+            orders = self._sorted()
+            bounded = []
+            for order, prefix, lower, upper, covered, in_order in ranges:
+                ids = orders[order]
+                key = self._key(order)
+                lo = bisect_left(ids, lower, key=key) if lower else 0
+                hi = bisect_left(ids, upper, key=key) if upper is not None else len(ids)
+                bounded.append((max(hi - lo, 0), not in_order, order, prefix, lo, hi, covered, in_order))
+            # A range covering every filter holds just the matches, so its size is the count
+            exact = [candidate for candidate in bounded if filters <= candidate[6]]
+            total = min(exact, key=lambda c: c[0])[0] if exact else None
+            narrowest = min(bounded, key=lambda c: c[:2])
+            listed = [candidate for candidate in exact if candidate[7]]
+            if listed:
+                chosen = min(listed, key=lambda c: c[0])
+            else:
+                chosen = min((c for c in bounded if c[7]), key=lambda c: c[0])
+                if not narrowest[7]:
+                    # Walking the listing's order finds about one match per (walked / matches)
+                    # entries; sorting the narrowest range's matches costs a few steps per entry
+                    found = total if total is not None else narrowest[0]
+                    walk_cost = min(chosen[0], (offset + limit + 1) * chosen[0] / max(found, 1))
+                    if 4 * narrowest[0] < walk_cost:
+                        chosen = narrowest
+            _, _, order, prefix, lo, hi, covered, in_order = chosen
+            ids = orders[order]
+            key = self._key(order)
+            match = None if filters <= covered else matches
+            if not in_order:
+                # Sort the matches of the narrowest range, e.g. a few agencies' entries by submission date
+                key = self._key(sort)
+                ids = sorted((assessment_id for assessment_id in ids[lo:hi] if matches(self._entries[assessment_id])),
+                             key=key)
+                prefix, lo, hi, match = (), 0, len(ids), None
+                total = len(ids)
+
+            page = self._walk(ids, key, lo, hi, prefix, descending, cursor, before is not None,
+                              offset, limit, match)
+            if total is None:
+                # Count in the narrowest range, in whatever order, up to just past max_count
+                _, _, order, _, lo, hi, _, _ = narrowest
+                total = 0
+                for assessment_id in orders[order][lo:hi]:
+                    if matches(self._entries[assessment_id]):
+                        total += 1
+                        if max_count is not None and total > max_count:
+                            break
+            if filters and max_count is not None:
+                total = min(total, max_count + 1)
+            return [dict(self._entries[assessment_id]) for assessment_id in page], total
+
+    def _walk(self, ids, key, lo, hi, prefix, descending, cursor, backwards, offset, limit, match):
+        """
+        Return the IDs of one page of ids[lo:hi] (sorted by key, whose keys there start with
+        prefix), in the listing's direction. The page follows the cursor, or precedes it when
+        backwards, or starts after offset matches when there is no cursor. Call with the mutex held.
+        """
+        # Read upwards for an ascending listing, downwards for a descending one; against
+        # the listing's direction for the page before a cursor
+        upwards = descending == backwards
+        if cursor is None:
+            start = lo if upwards else hi - 1
+            if match is None:
+                start, offset = start + offset if upwards else start - offset, 0
+        elif upwards:
+            start = max(bisect_right(ids, prefix + cursor, key=key), lo)
+            offset = 0
+        else:
+            start = min(bisect_left(ids, prefix + cursor, key=key), hi) - 1
+            offset = 0
+        positions = range(start, hi) if upwards else range(start, lo - 1, -1)
+        page = []
+        for position in positions:
+            if len(page) >= limit:
+                break
+            assessment_id = ids[position]
+            if match is not None and not match(self._entries[assessment_id]):
+                continue
+            if offset:
+                offset -= 1
+                continue
+            page.append(assessment_id)
+        if backwards:
+            page.reverse()
+        return page
+
+    def generation(self):
+        """
+        Return (tag, last modified) for the index log. Every save and update appends
+        to the log and a rebuild replaces it, so the tag changes with any record.
+        """
+        self.refresh()
+        with self._mutex:
+            try:
+                mtime = os.stat(self.index_path).st_mtime
+            except FileNotFoundError:
+                mtime = 0.0
+            return f"{self._inode or 0:x}-{self._offset:x}", mtime
+
+    def counters(self):
+        """
+        Return the dashboard counters (see COUNTER_NAMES), including changes made by other workers.
+        """
+        self.refresh()
+        with self._mutex:
+            return dict(self._counters)
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Build step for the site stylesheet.
+
+The templates are styled with Tailwind utility classes. Instead of loading the Tailwind
+CDN script, which compiles CSS in the browser on every page load, the stylesheet is
+generated here ahead of time:
+
+1. Every template is scanned for class names, the way Tailwind scans its content files.
+2. CSS is generated only for the utilities that are actually used (the "purge"), on top
+   of Tailwind's base reset, followed by the hand-written rules in static/css/site.css.
+3. The result is minified and written to static/dist/ under a content-hashed name
+   (app.<hash>.css) with a gzip-compressed copy next to it, and manifest.json maps
+   app.css to the current file.
+
+Because the name changes whenever the content does, the files can be cached forever.
+Templates refer to the stylesheet through asset_url('app.css'), which reads the manifest.
+
+Run `python manage.py build-assets` after changing templates or site.css.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+SITE_CSS = os.path.join(STATIC_DIR, 'css', 'site.css')
+MANIFEST_NAME = 'manifest.json'
+
+# Tailwind's default theme (v3), limited to the scales this site can use
+COLORS = {
+    "slate": ("#f8fafc", "#f1f5f9", "#e2e8f0", "#cbd5e1", "#94a3b8", "#64748b", "#475569", "#334155", "#1e293b", "#0f172a"),
+    "gray": ("#f9fafb", "#f3f4f6", "#e5e7eb", "#d1d5db", "#9ca3af", "#6b7280", "#4b5563", "#374151", "#1f2937", "#111827"),
+    "red": ("#fef2f2", "#fee2e2", "#fecaca", "#fca5a5", "#f87171", "#ef4444", "#dc2626", "#b91c1c", "#991b1b", "#7f1d1d"),
+    "orange": ("#fff7ed", "#ffedd5", "#fed7aa", "#fdba74", "#fb923c", "#f97316", "#ea580c", "#c2410c", "#9a3412", "#7c2d12"),
+    "yellow": ("#fefce8", "#fef9c3", "#fef08a", "#fde047", "#facc15", "#eab308", "#ca8a04", "#a16207", "#854d0e", "#713f12"),
+    "green": ("#f0fdf4", "#dcfce7", "#bbf7d0", "#86efac", "#4ade80", "#22c55e", "#16a34a", "#15803d", "#166534", "#14532d"),
+    "blue": ("#eff6ff", "#dbeafe", "#bfdbfe", "#93c5fd", "#60a5fa", "#3b82f6", "#2563eb", "#1d4ed8", "#1e40af", "#1e3a8a"),
+    "indigo": ("#eef2ff", "#e0e7ff", "#c7d2fe", "#a5b4fc", "#818cf8", "#6366f1", "#4f46e5", "#4338ca", "#3730a3", "#312e81"),
+    "purple": ("#faf5ff", "#f3e8ff", "#e9d5ff", "#d8b4fe", "#c084fc", "#a855f7", "#9333ea", "#7e22ce", "#6b21a8", "#581c87"),
+}
+SHADES = ("50", "100", "200", "300", "400", "500", "600", "700", "800", "900")
+SPECIAL_COLORS = {"white": "#fff", "black": "#000", "transparent": "transparent", "current": "currentColor"}
+
+SPACING_STEPS = ("0", "px", "0.5", "1", "1.5", "2", "2.5", "3", "3.5", "4", "5", "6", "7", "8", "9", "10",
+                 "11", "12", "14", "16", "20", "24", "28", "32", "36", "40", "44", "48", "52", "56", "60", "64", "72", "80", "96")
+
+SCREENS = (("sm", 640), ("md", 768), ("lg", 1024), ("xl", 1280), ("2xl", 1536))
+PSEUDO_VARIANTS = ("hover", "focus", "active", "disabled")
+
+FONT_SIZES = {
+    "xs": ("0.75rem", "1rem"), "sm": ("0.875rem", "1.25rem"), "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"), "xl": ("1.25rem", "1.75rem"), "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"), "4xl": ("2.25rem", "2.5rem"), "5xl": ("3rem", "1"),
+}
+FONT_WEIGHTS = {"thin": 100, "extralight": 200, "light": 300, "normal": 400, "medium": 500,
+                "semibold": 600, "bold": 700, "extrabold": 800, "black": 900}
+FONT_FAMILIES = {
+    "sans": 'ui-sans-serif,system-ui,sans-serif,"Apple Color Emoji","Segoe UI Emoji","Segoe UI Symbol","Noto Color Emoji"',
+    "serif": 'ui-serif,Georgia,Cambria,"Times New Roman",Times,serif',
+    "mono": 'ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,"Liberation Mono","Courier New",monospace',
+}
+MAX_WIDTHS = {"none": "none", "xs": "20rem", "sm": "24rem", "md": "28rem", "lg": "32rem", "xl": "36rem",
+              "2xl": "42rem", "3xl": "48rem", "4xl": "56rem", "5xl": "64rem", "6xl": "72rem", "7xl": "80rem",
+              "full": "100%", "prose": "65ch"}
+RADII = {"none": "0px", "sm": "0.125rem", "": "0.25rem", "md": "0.375rem", "lg": "0.5rem", "xl": "0.75rem",
+         "2xl": "1rem", "3xl": "1.5rem", "full": "9999px"}
+SHADOWS = {
+    "sm": "0 1px 2px 0 rgb(0 0 0/0.05)",
+    "": "0 1px 3px 0 rgb(0 0 0/0.1),0 1px 2px -1px rgb(0 0 0/0.1)",
+    "md": "0 4px 6px -1px rgb(0 0 0/0.1),0 2px 4px -2px rgb(0 0 0/0.1)",
+    "lg": "0 10px 15px -3px rgb(0 0 0/0.1),0 4px 6px -4px rgb(0 0 0/0.1)",
+    "xl": "0 20px 25px -5px rgb(0 0 0/0.1),0 8px 10px -6px rgb(0 0 0/0.1)",
+    "2xl": "0 25px 50px -12px rgb(0 0 0/0.25)",
+    "none": "0 0 #0000",
+}
+GRADIENT_DIRECTIONS = {"t": "top", "tr": "top right", "r": "right", "br": "bottom right",
+                       "b": "bottom", "bl": "bottom left", "l": "left", "tl": "top left"}
+TRANSITION_TIMING = "transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms"
+TRANSITIONS = {
+    "": "color,background-color,border-color,text-decoration-color,fill,stroke,opacity,box-shadow,transform,filter,backdrop-filter",
+    "all": "all",
+    "colors": "color,background-color,border-color,text-decoration-color,fill,stroke",
+    "opacity": "opacity",
+    "shadow": "box-shadow",
+    "transform": "transform",
+}
+
+# Tailwind's base reset ("preflight"), condensed
+PREFLIGHT = (
+    "*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb;"
+    "--tw-ring-offset-width:0px;--tw-ring-offset-color:#fff;--tw-ring-color:rgb(59 130 246/0.5);"
+    "--tw-ring-offset-shadow:0 0 #0000;--tw-ring-shadow:0 0 #0000;--tw-shadow:0 0 #0000}"
+    "html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:" + FONT_FAMILIES["sans"] + "}"
+    "body{margin:0;line-height:inherit}"
+    "hr{height:0;color:inherit;border-top-width:1px}"
+    "h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}"
+    "a{color:inherit;text-decoration:inherit}"
+    "b,strong{font-weight:bolder}"
+    "code,kbd,samp,pre{font-family:" + FONT_FAMILIES["mono"] + ";font-size:1em}"
+    "small{font-size:80%}"
+    "table{text-indent:0;border-color:inherit;border-collapse:collapse}"
+    "button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;"
+    "line-height:inherit;color:inherit;margin:0;padding:0}"
+    "button,select{text-transform:none}"
+    "button,[type=button],[type=reset],[type=submit]{-webkit-appearance:button;background-color:transparent;background-image:none}"
+    "summary{display:list-item}"
+    "blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}"
+    "fieldset{margin:0;padding:0}"
+    "legend{padding:0}"
+    "ol,ul,menu{list-style:none;margin:0;padding:0}"
+    "textarea{resize:vertical}"
+    "input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}"
+    "button,[role=button]{cursor:pointer}"
+    ":disabled{cursor:default}"
+    "img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}"
+    "img,video{max-width:100%;height:auto}"
+    "[hidden]{display:none}"
+)
+
+# A class candidate: anything between quotes, whitespace and template delimiters
+CANDIDATE_RE = re.compile(r"[^\s\"'`<>{}()=%,;]+")
+
+
+def color_value(name):
+    """
+    Return the CSS color for a palette name like 'blue-800' or 'white', or None.
+    """
+    if name in SPECIAL_COLORS:
+        return SPECIAL_COLORS[name]
+    family, _, shade = name.rpartition('-')
+    if family in COLORS and shade in SHADES:
+        return COLORS[family][SHADES.index(shade)]
+    return None
+
+
+def transparent(color):
+    """
+    Return a fully transparent version of a hex color (the end stop of a gradient).
+    """
+    if not color.startswith('#'):
+        return "rgb(255 255 255/0)"
+    digits = color[1:] if len(color) == 7 else ''.join(c * 2 for c in color[1:])
+    return "rgb({} {} {}/0)".format(*(int(digits[i:i + 2], 16) for i in (0, 2, 4)))
+
+
+def spacing_value(step):
+    """
+    Return the length for a spacing scale step ('4' is 1rem), or None.
+    """
+    if step not in SPACING_STEPS:
+        return None
+    if step == "px":
+        return "1px"
+    if step == "0":
+        return "0px"
+    return f"{float(step) / 4:g}rem"
+
+
+# Side suffixes of margin, padding and border utilities; all-side utilities are output
+# first, then x/y, then single sides, so the more specific one wins
+SIDES = {"": ("",), "x": ("-left", "-right"), "y": ("-top", "-bottom"),
+         "t": ("-top",), "r": ("-right",), "b": ("-bottom",), "l": ("-left",)}
+SIDE_ORDER = {"": 0, "x": 1, "y": 1, "t": 2, "r": 2, "b": 2, "l": 2}
+
+
+def _sides(property, side, value, suffix=""):
+    declarations = ";".join(f"{property}{s}{suffix}:{value}" for s in SIDES[side])
+    return (declarations, "", SIDE_ORDER[side])
+
+
+def _box_spacing(prefix, property, allow_auto, allow_negative=False):
+    """
+    Resolver for margin ('m') or padding ('p') utilities and their side variants,
+    and with allow_negative their negated forms ('-mt-4').
+    """
+    def resolve(name):
+        match = re.fullmatch(r"(-?)" + prefix + r"([xytrbl]?)-(.+)", name)
+        if not match or (match.group(1) and not allow_negative):
+            return None
+        value = "auto" if allow_auto and match.group(3) == "auto" else spacing_value(match.group(3))
+        if value is None or (match.group(1) and value == "auto"):
+            return None
+        if match.group(1) and value != "0px":
+            value = "-" + value
+        return _sides(property, match.group(2), value)
+    return resolve
+
+
+def _keyword(table):
+    return lambda name: table.get(name)
+
+
+def _space_between(name):
+    match = re.fullmatch(r"space-([xy])-(.+)", name)
+    value = match and spacing_value(match.group(2))
+    if not value:
+        return None
+    side = "margin-top" if match.group(1) == "y" else "margin-left"
+    return (f"{side}:{value}", ">:not([hidden])~:not([hidden])", 0)
+
+
+def _gap(name):
+    match = re.fullmatch(r"gap-(?:([xy])-)?(.+)", name)
+    value = match and spacing_value(match.group(2))
+    if not value:
+        return None
+    property = {None: "gap", "x": "column-gap", "y": "row-gap"}[match.group(1)]
+    return f"{property}:{value}"
+
+
+def _sizing(prefix, property, extra):
+    def resolve(name):
+        if not name.startswith(prefix + "-"):
+            return None
+        step = name[len(prefix) + 1:]
+        if step in extra:
+            value = extra[step]
+        elif re.fullmatch(r"\d+/\d+", step):
+            numerator, denominator = map(int, step.split('/'))
+            value = f"{numerator / denominator * 100:g}%" if denominator else None
+        else:
+            value = spacing_value(step)
+        return f"{property}:{value}" if value else None
+    return resolve
+
+
+def _prefixed(prefix, table, template):
+    def resolve(name):
+        if not name.startswith(prefix):
+            return None
+        value = table.get(name[len(prefix):])
+        return template.format(value) if value is not None else None
+    return resolve
+
+
+def _colored(prefix, template):
+    def resolve(name):
+        if not name.startswith(prefix):
+            return None
+        color = color_value(name[len(prefix):])
+        return template.format(color=color, transparent=transparent(color)) if color else None
+    return resolve
+
+
+def _border_width(name):
+    match = re.fullmatch(r"border(?:-([xytrbl]))?(?:-(0|2|4|8))?", name)
+    if not match:
+        return None
+    return _sides("border", match.group(1) or "", f"{match.group(2) or 1}px", suffix="-width")
+
+
+def _rounded(name):
+    match = re.fullmatch(r"rounded(?:-(.+))?", name)
+    value = match and RADII.get(match.group(1) or "")
+    return f"border-radius:{value}" if value else None
+
+
+def _shadow(name):
+    match = re.fullmatch(r"shadow(?:-(.+))?", name)
+    value = match and SHADOWS.get(match.group(1) or "")
+    if not value:
+        return None
+    return (f"--tw-shadow:{value};"
+            "box-shadow:var(--tw-ring-offset-shadow,0 0 #0000),var(--tw-ring-shadow,0 0 #0000),var(--tw-shadow)")
+
+
+def _ring_width(name):
+    match = re.fullmatch(r"ring(?:-(0|1|2|4|8))?", name)
+    if not match:
+        return None
+    width = match.group(1) or "3"
+    return ("--tw-ring-offset-shadow:0 0 0 var(--tw-ring-offset-width) var(--tw-ring-offset-color);"
+            f"--tw-ring-shadow:0 0 0 calc({width}px + var(--tw-ring-offset-width)) var(--tw-ring-color);"
+            "box-shadow:var(--tw-ring-offset-shadow),var(--tw-ring-shadow),var(--tw-shadow,0 0 #0000)")
+
+
+def _transition(name):
+    match = re.fullmatch(r"transition(?:-(.+))?", name)
+    properties = match and TRANSITIONS.get(match.group(1) or "")
+    return f"transition-property:{properties};{TRANSITION_TIMING}" if properties else None
+
+
+def _numeric(prefix, template, allowed):
+    def resolve(name):
+        match = re.fullmatch(prefix + r"-(\d+)", name)
+        return template.format(match.group(1)) if match and match.group(1) in allowed else None
+    return resolve
+
+
+# Utility resolvers in Tailwind's output order: a later one wins over an earlier one on the
+# same element, so e.g. border-b-2 must come after border, and p-4 before px-6.
+UTILITIES = (
+    _keyword({"sr-only": "position:absolute;width:1px;height:1px;padding:0;margin:-1px;overflow:hidden;"
+                         "clip:rect(0,0,0,0);white-space:nowrap;border-width:0"}),
+    _keyword({"static": "position:static", "fixed": "position:fixed", "absolute": "position:absolute",
+              "relative": "position:relative", "sticky": "position:sticky"}),
+    _box_spacing("m", "margin", allow_auto=True, allow_negative=True),
+    _keyword({"block": "display:block", "inline-block": "display:inline-block", "inline": "display:inline",
+              "flex": "display:flex", "inline-flex": "display:inline-flex", "table": "display:table",
+              "table-row": "display:table-row", "table-cell": "display:table-cell", "grid": "display:grid",
+              "inline-grid": "display:inline-grid", "contents": "display:contents", "hidden": "display:none"}),
+    _sizing("h", "height", {"auto": "auto", "full": "100%", "screen": "100vh"}),
+    _keyword({"min-h-0": "min-height:0px", "min-h-full": "min-height:100%", "min-h-screen": "min-height:100vh"}),
+    _sizing("w", "width", {"auto": "auto", "full": "100%", "screen": "100vw", "min": "min-content", "max": "max-content"}),
+    _prefixed("max-w-", MAX_WIDTHS, "max-width:{}"),
+    _keyword({"flex-1": "flex:1 1 0%", "flex-auto": "flex:1 1 auto", "flex-initial": "flex:0 1 auto",
+              "flex-none": "flex:none", "shrink-0": "flex-shrink:0", "flex-shrink-0": "flex-shrink:0",
+              "grow": "flex-grow:1", "flex-grow": "flex-grow:1"}),
+    _keyword({"border-collapse": "border-collapse:collapse", "border-separate": "border-collapse:separate"}),
+    _keyword({"cursor-pointer": "cursor:pointer", "cursor-default": "cursor:default",
+              "cursor-not-allowed": "cursor:not-allowed"}),
+    _keyword({"list-inside": "list-style-position:inside", "list-outside": "list-style-position:outside"}),
+    _keyword({"list-disc": "list-style-type:disc", "list-decimal": "list-style-type:decimal",
+              "list-none": "list-style-type:none"}),
+    _numeric("grid-cols", "grid-template-columns:repeat({},minmax(0,1fr))", {str(n) for n in range(1, 13)}),
+    _keyword({"flex-row": "flex-direction:row", "flex-row-reverse": "flex-direction:row-reverse",
+              "flex-col": "flex-direction:column", "flex-col-reverse": "flex-direction:column-reverse"}),
+    _keyword({"flex-wrap": "flex-wrap:wrap", "flex-nowrap": "flex-wrap:nowrap"}),
+    _keyword({"items-start": "align-items:flex-start", "items-end": "align-items:flex-end",
+              "items-center": "align-items:center", "items-baseline": "align-items:baseline",
+              "items-stretch": "align-items:stretch"}),
+    _keyword({"justify-start": "justify-content:flex-start", "justify-end": "justify-content:flex-end",
+              "justify-center": "justify-content:center", "justify-between": "justify-content:space-between",
+              "justify-around": "justify-content:space-around", "justify-evenly": "justify-content:space-evenly"}),
+    _gap,
+    _space_between,
+    _keyword({"overflow-auto": "overflow:auto", "overflow-hidden": "overflow:hidden",
+              "overflow-x-auto": "overflow-x:auto", "overflow-y-auto": "overflow-y:auto",
+              "overflow-x-hidden": "overflow-x:hidden"}),
+    _keyword({"truncate": "overflow:hidden;text-overflow:ellipsis;white-space:nowrap"}),
+    _keyword({"whitespace-normal": "white-space:normal", "whitespace-nowrap": "white-space:nowrap",
+              "whitespace-pre-line": "white-space:pre-line", "whitespace-pre-wrap": "white-space:pre-wrap"}),
+    _keyword({"break-words": "overflow-wrap:break-word", "break-all": "word-break:break-all"}),
+    _rounded,
+    _border_width,
+    _keyword({"border-solid": "border-style:solid", "border-dashed": "border-style:dashed", "border-none": "border-style:none"}),
+    _colored("border-", "border-color:{color}"),
+    _colored("bg-", "background-color:{color}"),
+    _prefixed("bg-gradient-to-", GRADIENT_DIRECTIONS, "background-image:linear-gradient(to {},var(--tw-gradient-stops))"),
+    _colored("from-", "--tw-gradient-from:{color};--tw-gradient-to:{transparent};"
+                      "--tw-gradient-stops:var(--tw-gradient-from),var(--tw-gradient-to)"),
+    _colored("via-", "--tw-gradient-to:{transparent};"
+                     "--tw-gradient-stops:var(--tw-gradient-from),{color},var(--tw-gradient-to)"),
+    _colored("to-", "--tw-gradient-to:{color}"),
+    _box_spacing("p", "padding", allow_auto=False),
+    _keyword({"text-left": "text-align:left", "text-center": "text-align:center", "text-right": "text-align:right",
+              "text-justify": "text-align:justify"}),
+    _keyword({"align-top": "vertical-align:top", "align-middle": "vertical-align:middle",
+              "align-bottom": "vertical-align:bottom"}),
+    _prefixed("font-", FONT_FAMILIES, "font-family:{}"),
+    _prefixed("text-", {size: f"font-size:{fs};line-height:{lh}" for size, (fs, lh) in FONT_SIZES.items()}, "{}"),
+    _prefixed("font-", FONT_WEIGHTS, "font-weight:{}"),
+    _keyword({"uppercase": "text-transform:uppercase", "lowercase": "text-transform:lowercase",
+              "capitalize": "text-transform:capitalize", "normal-case": "text-transform:none"}),
+    _keyword({"italic": "font-style:italic", "not-italic": "font-style:normal"}),
+    _keyword({"leading-none": "line-height:1", "leading-tight": "line-height:1.25", "leading-normal": "line-height:1.5",
+              "leading-relaxed": "line-height:1.625"}),
+    _colored("text-", "color:{color}"),
+    _keyword({"underline": "text-decoration-line:underline", "line-through": "text-decoration-line:line-through",
+              "no-underline": "text-decoration-line:none"}),
+    _numeric("opacity", "opacity:{}", {"0", "25", "50", "75", "100"}),
+    _shadow,
+    _keyword({"outline-none": "outline:2px solid transparent;outline-offset:2px"}),
+    _ring_width,
+    _colored("ring-", "--tw-ring-color:{color}"),
+    _transition,
+    _numeric("duration", "transition-duration:{}ms", {"75", "100", "150", "200", "300", "500", "700", "1000"}),
+)
+
+
+def escape_class(name):
+    """
+    Escape a class name for use in a CSS selector (e.g. md:flex-row -> md\\:flex-row).
+    """
+    return re.sub(r"([^A-Za-z0-9_-])", r"\\\1", name)
+
+
+def resolve_class(name):
+    """
+    Work out the CSS rule for a class name, including hover:/focus:/md: style variants.
+    Returns:
+        tuple: (screen index or -1, pseudo-class variant order, utility order, rule text),
+            or None if the name is not a known utility. The first three sort rules into
+            Tailwind's output order.
+    """
+    *variants, utility = name.split(':')
+    screen, pseudos = -1, []
+    for variant in variants:
+        screens = [s for s, _ in SCREENS]
+        if variant in screens and screen == -1 and not pseudos:
+            screen = screens.index(variant)
+        elif variant in PSEUDO_VARIANTS and variant not in pseudos:
+            pseudos.append(variant)
+        else:
+            return None
+    for order, resolver in enumerate(UTILITIES):
+        resolved = resolver(utility)
+        if resolved is None:
+            continue
+        declarations, child, side_order = resolved if isinstance(resolved, tuple) else (resolved, "", 0)
+        selector = "." + escape_class(name) + "".join(f":{p}" for p in pseudos) + child
+        variant_order = tuple(PSEUDO_VARIANTS.index(p) + 1 for p in pseudos)
+        return (screen, variant_order, (order, side_order), f"{selector}{{{declarations}}}")
+    return None
+
+
+def scan_classes(paths):
+    """
+    Collect every token in the given files that could be a class name.
+    Like Tailwind, this over-collects (e.g. template keywords); tokens that are not
+    utilities are simply ignored when generating CSS.
+    """
+    candidates = set()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            candidates.update(CANDIDATE_RE.findall(f.read()))
+    return candidates
+
+
+def generate_css(candidates):
+    """
+    Generate the base reset plus a rule for every utility class in candidates.
+    Returns:
+        tuple: (css (str), used utility class names (sorted list))
+    """
+    rules = {}
+    for name in candidates:
+        rule = resolve_class(name)
+        if rule is not None:
+            rules[name] = rule
+    ordered = sorted(rules.values(), key=lambda rule: (rule[0], rule[1], rule[2], rule[3]))
+
+    parts = [PREFLIGHT]
+    if "container" in candidates:
+        parts.append(".container{width:100%}")
+    parts.extend(rule[3] for rule in ordered if rule[0] == -1)
+    for index, (_, width) in enumerate(SCREENS):
+        screen_rules = [rule[3] for rule in ordered if rule[0] == index]
+        if "container" in candidates:
+            screen_rules.insert(0, f".container{{max-width:{width}px}}")
+        if screen_rules:
+            parts.append(f"@media (min-width:{width}px){{{''.join(screen_rules)}}}")
+    return ''.join(parts), sorted(rules)
+
+
+def minify_css(css):
+    """
+    Minify hand-written CSS: drop comments and whitespace that carries no meaning.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build(template_dir=TEMPLATE_DIR, site_css=SITE_CSS, dist_dir=DIST_DIR):
+    """
+    Build the purged, minified, content-hashed stylesheet and its gzip copy.
+    Earlier builds in dist_dir are removed.
+    Args:
+        template_dir (str): Templates to scan for class names.
+        site_css (str): Hand-written CSS appended after the utilities.
+        dist_dir (str): Output directory.
+    Returns:
+        dict: The manifest, mapping logical names (app.css) to built file names.
+    """
+    templates = sorted(os.path.join(template_dir, name) for name in os.listdir(template_dir)
+                       if name.endswith('.html'))
+    css, _ = generate_css(scan_classes(templates))
+    if os.path.exists(site_css):
+        with open(site_css, 'r', encoding='utf-8') as f:
+            css += minify_css(f.read())
+    data = css.encode('utf-8')
+
+    name = f"app.{hashlib.sha256(data).hexdigest()[:12]}.css"
+    os.makedirs(dist_dir, exist_ok=True)
+    _write_atomic(os.path.join(dist_dir, name), data)
+    _write_atomic(os.path.join(dist_dir, name + '.gz'), gzip.compress(data, compresslevel=9, mtime=0))
+    manifest = {"app.css": name}
+    _write_atomic(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+
+    for old in os.listdir(dist_dir):
+        if re.fullmatch(r"app\.[0-9a-f]{12}\.css(\.gz)?", old) and not old.startswith(name):
+            os.remove(os.path.join(dist_dir, old))
+    return manifest
+
+
+def load_manifest(dist_dir=DIST_DIR):
+    """
+    Read the manifest written by build().
+    Returns:
+        dict: The manifest, or None if the assets have not been built.
+    """
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Vectorized scoring of many answer sets at once (e.g. a whole application portfolio).
+
+Answer sets are encoded as an integer matrix with one row per application and one
+column per question, holding the index of the chosen option. The weights of the
+current scoring rules are laid out as an (options x platforms) matrix, so every
+platform score for every row is one gather-and-sum over that matrix with NumPy. Explanations are
+resolved per distinct (recommendation, matched conditions) pattern rather than per row.
+
+The results are identical to scoring.recommend() for the same rules; an answer that
+is not one of its question's options scores no points, exactly as it does there.
+"""
+
+import json
+
+import numpy as np
+
+import scoring
+from scoring import ANSWER_KEYS, ANSWER_OPTIONS
+
+
+class BatchScorer:
+    """
+    Weight and condition matrices for one version of the rules (a scoring.CompiledRules).
+    """
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.version = compiled.version
+        self.platforms = compiled.platforms
+        rules = compiled.rules
+
+        # Features in matrix column order: the answers, then the derived app_age.
+        # Each feature's options get one extra index for "unmatched" answers, which carries no weight.
+        self._features = ANSWER_OPTIONS + (("app_age", scoring.FEATURE_OPTIONS["app_age"]),)
+        self._feature_columns = {key: i for i, (key, _) in enumerate(self._features)}
+        self._option_indexes = [{option: i for i, option in enumerate(options)} for _, options in self._features]
+        offsets = []
+        rows = 0
+        for _, options in self._features:
+            offsets.append(rows)
+            rows += len(options) + 1
+        self._offsets = np.array(offsets, dtype=np.intp)
+
+        # Row offset[f] + option of the weights matrix holds that option's points per platform
+        self.weights = np.zeros((rows, len(self.platforms)), dtype=np.int32)
+        for feature, options in rules["weights"].items():
+            column = self._feature_columns[feature]
+            for value, points in options.items():
+                for platform, weight in points.items():
+                    self.weights[offsets[column] + self._option_indexes[column][value], self.platforms.index(platform)] = weight
+
+        app_age = rules["app_age"]
+        self._ready_conditions = self._conditions(app_age["cloud_ready_answers"])
+        self._modern_threshold = app_age["modern_threshold"]
+        self._explanations = [
+            [(self._conditions(entry["when"]), entry["text"]) for entry in rules["explanations"].get(platform, [])]
+            for platform in self.platforms
+        ]
+
+    def _conditions(self, when):
+        """
+        Translate {feature: value} conditions into (matrix column, option index) pairs.
+        """
+        pairs = []
+        for feature, value in when.items():
+            column = self._feature_columns[feature]
+            pairs.append((column, self._option_indexes[column][value]))
+        return pairs
+
+    def encode(self, answer_sets):
+        """
+        Encode answer sets as an (n x features) matrix of option indices.
+        The last column (app_age) is left for score_matrix() to fill in.
+        Args:
+            answer_sets (list of dict): Answers keyed by ANSWER_KEYS.
+        Returns:
+            numpy.ndarray: uint8 option indices; unknown answers get the "unmatched" index.
+        Raises:
+            KeyError: If an answer set is missing a question.
+        """
+        n = len(answer_sets)
+        matrix = np.zeros((n, len(self._features)), dtype=np.uint8)
+        for column, key in enumerate(ANSWER_KEYS):
+            index = self._option_indexes[column]
+            unmatched = len(index)
+            matrix[:, column] = np.fromiter(
+                (index.get(answers[key], unmatched) for answers in answer_sets), dtype=np.uint8, count=n)
+        return matrix
+
+    def _matches(self, matrix, conditions):
+        mask = np.ones(len(matrix), dtype=bool)
+        for column, option in conditions:
+            mask &= matrix[:, column] == option
+        return mask
+
+    def score_matrix(self, matrix):
+        """
+        Derive app_age and score an encoded matrix (the app_age column is filled in place).
+        Returns:
+            tuple: (scores (n x platforms int array), recommendation indices (n,))
+        """
+        ready = np.zeros(len(matrix), dtype=np.int32)
+        for column, option in self._ready_conditions:
+            ready += matrix[:, column] == option
+        # app_age options are ("modern", "legacy")
+        matrix[:, -1] = ready < self._modern_threshold
+
+        scores = self.weights[matrix + self._offsets].sum(axis=1)
+        # argmax returns the first maximum, so platform order breaks ties like recommend()
+        best = scores.argmax(axis=1)
+        return scores, best
+
+    def explain(self, matrix, best):
+        """
+        Resolve explanation texts for scored rows.
+        Each row's matched explanations form a bit pattern (packed into bytes, so any number
+        of explanations fits); texts are built once per distinct (recommendation, pattern)
+        and shared by the rows that have it.
+        Returns:
+            list: One tuple of explanation strings per row.
+        """
+        matched = np.zeros((len(matrix), max(map(len, self._explanations), default=0)), dtype=bool)
+        for p, entries in enumerate(self._explanations):
+            rows = best == p
+            if not rows.any():
+                continue
+            selected = matrix[rows]
+            for bit, (conditions, _) in enumerate(entries):
+                matched[rows, bit] = self._matches(selected, conditions)
+        keys = np.column_stack((best, np.packbits(matched, axis=1)))
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        texts = []
+        for row in first.tolist():
+            entries = self._explanations[best[row]]
+            texts.append(tuple(text for bit, (_, text) in enumerate(entries) if matched[row, bit]))
+        return [texts[i] for i in inverse.ravel().tolist()]
+
+    def score_columns(self, answer_sets):
+        """
+        Score answer sets, returning the results column by column.
+        This skips building a dict per row, for callers that aggregate over a portfolio.
+        Returns:
+            tuple: (recommendations (list of str), scores (n x platforms int array, columns
+                    in self.platforms order), explanations (list of tuples), app_ages (list of str))
+        """
+        matrix = self.encode(answer_sets)
+        scores, best = self.score_matrix(matrix)
+        explanations = self.explain(matrix, best)
+        recommendations = np.array(self.platforms, dtype=object)[best].tolist()
+        app_ages = np.array(["modern", "legacy"], dtype=object)[matrix[:, -1]].tolist()
+        return recommendations, scores, explanations, app_ages
+
+    def score(self, answer_sets):
+        """
+        Score answer sets.
+        Returns:
+            list: One (recommendation, scores, explanations, app_age) tuple per answer set,
+                  as returned by scoring.recommend().
+        """
+        recommendations, scores, explanations, app_ages = self.score_columns(answer_sets)
+        platforms = self.platforms
+        return [
+            (recommendation, dict(zip(platforms, row)), list(texts), app_age)
+            for recommendation, row, texts, app_age in zip(recommendations, scores.tolist(), explanations, app_ages)
+        ]
+
+
+_scorer = None
+
+
+def current_scorer():
+    """
+    Return a BatchScorer for the rules currently in service, rebuilding it after a reload.
+    """
+    global _scorer
+    compiled = scoring.ENGINE.current()
+    scorer = _scorer
+    if scorer is None or scorer.compiled is not compiled:
+        scorer = _scorer = BatchScorer(compiled)
+    return scorer
+
+
+def score_batch(answer_sets):
+    """
+    Score many answer sets with the current rules.
+    Args:
+        answer_sets (list of dict): Answers keyed by ANSWER_KEYS.
+    Returns:
+        list: One (recommendation, scores, explanations, app_age) tuple per answer set.
+    Raises:
+        KeyError: If an answer set is missing a question.
+    """
+    return current_scorer().score(answer_sets)
+
+
+def parse_answer_sets(text):
+    """
+    Parse a JSON array or NDJSON (one JSON object per line) of answer sets.
+    Returns:
+        list: The parsed items, not yet validated.
+    Raises:
+        ValueError: If the text is neither.
+    """
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        items = json.loads(stripped)
+    else:
+        items = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"Line {number}: {e}")
+    return items
+
+
+def missing_answers(item):
+    """
+    Return the questions an answer set leaves unanswered (all of them if it is not an object).
+    Answers must be non-empty strings, as submitted by the web form.
+    """
+    if not isinstance(item, dict):
+        return list(ANSWER_KEYS)
+    return [key for key in ANSWER_KEYS if not isinstance(item.get(key), str) or not item[key]]
+
+
+def invalid_answers(item):
+    """
+    Return the questions of a complete answer set (see missing_answers) whose answer is not
+    one of the question's options.
+    """
+    return [key for key, options in ANSWER_OPTIONS if item[key] not in options]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput of batch scoring versus scoring applications one at a time.
+
+Scores N random answer sets with a loop over app.score_answers(), with
+batch_scoring.score_batch() (one result tuple per app) and with
+BatchScorer.score_columns() (column arrays, no per-app objects), checks they agree,
+and prints apps/second for each.
+
+Usage:
+    python benchmarks/bench_batch_scoring.py [--count 100000] [--repeat 3] [--seed 1]
+"""
+
+import argparse
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+# Importing the app opens its data directory (index, search database, outbox); keep that
+# away from ./assessment_data and from any DATA_DIR or data paths set for a real deployment
+_data_dir = tempfile.mkdtemp(prefix='bench_scoring_')
+atexit.register(shutil.rmtree, _data_dir, ignore_errors=True)
+os.environ.update(DATA_DIR=_data_dir, SQLITE_PATH=os.path.join(_data_dir, 'assessments.db'),
+                  SEARCH_INDEX_PATH=os.path.join(_data_dir, 'search.db'), OUTBOX_DIR=os.path.join(_data_dir, 'outbox'))
+
+import batch_scoring  # noqa: E402
+from app import score_answers  # noqa: E402
+from scoring import ANSWER_OPTIONS  # noqa: E402
+
+
+def random_answer_sets(count, seed):
+    rng = random.Random(seed)
+    return [{key: rng.choice(options) for key, options in ANSWER_OPTIONS} for _ in range(count)]
+
+
+def best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000, help='Answer sets to score (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per method; the best is reported (default: 3)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    answer_sets = random_answer_sets(args.count, args.seed)
+    scorer = batch_scoring.current_scorer()  # build the weight matrices outside the timing
+
+    loop_time, loop_results = best_time(lambda: [score_answers(dict(a)) for a in answer_sets], args.repeat)
+    batch_time, batch_results = best_time(lambda: batch_scoring.score_batch(answer_sets), args.repeat)
+    columns_time, columns = best_time(lambda: scorer.score_columns(answer_sets), args.repeat)
+    if [r[:3] for r in batch_results] != loop_results or columns[0] != [r[0] for r in loop_results]:
+        print("Batch results differ from score_answers", file=sys.stderr)
+        return 1
+
+    print(f"{args.count} answer sets, best of {args.repeat}")
+    print(f"  score_answers loop: {loop_time:8.3f}s  {args.count / loop_time:12,.0f} apps/s")
+    print(f"  score_batch:        {batch_time:8.3f}s  {args.count / batch_time:12,.0f} apps/s")
+    print(f"  score_columns:      {columns_time:8.3f}s  {args.count / columns_time:12,.0f} apps/s")
+    print(f"  speedup:            {loop_time / batch_time:8.2f}x (tuples), {loop_time / columns_time:.2f}x (columns)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
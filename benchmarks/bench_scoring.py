@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark and regression gate for the scoring hot path.
+
+Every answer set in the scoring table's domain (all ANSWER_OPTIONS combinations) is
+scored by each implementation:
+
+    interpret_rules         the uncompiled reference evaluator
+    compiled                the rules compiled to a closure
+    table.lookup            one lookup in the precomputed table
+    scoring.recommend       table lookup for the rules in service (the shared entry point)
+    app.score_answers       the web app's scoring call
+    cli.score_batch_row     the CLI's batch row (validation + scoring)
+    batch_scoring           the vectorized batch scorer, per answer set
+
+and get_migration_complexity (the CLI's migration sub-questions) over all of its answers.
+
+For each, ns/call (best of --repeat passes) and tracemalloc's peak bytes allocated during
+a call are reported, and outputs are checked against interpret_rules.
+
+Each pass is paired with a pass of a fixed pure-Python calibration loop over the same
+inputs, and the gate compares the ratio of the two ("relative"), so a slower or busier
+machine does not read as a regression. The run fails if any output differs, or, with
+--baseline, if any implementation's relative time is more than --max-slowdown percent
+above the baseline's. Refresh the baseline with --save-baseline after an intended change.
+
+Usage:
+    python benchmarks/bench_scoring.py [--repeat 7] [--baseline benchmarks/scoring_baseline.json]
+        [--max-slowdown 25] [--save-baseline] [--output results.json]
+"""
+
+import argparse
+import atexit
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+# Importing the app opens its data directory (index, search database, outbox); keep that
+# away from ./assessment_data and from any DATA_DIR or data paths set for a real deployment
+_data_dir = tempfile.mkdtemp(prefix='bench_scoring_')
+atexit.register(shutil.rmtree, _data_dir, ignore_errors=True)
+os.environ.update(DATA_DIR=_data_dir, SQLITE_PATH=os.path.join(_data_dir, 'assessments.db'),
+                  SEARCH_INDEX_PATH=os.path.join(_data_dir, 'search.db'), OUTBOX_DIR=os.path.join(_data_dir, 'outbox'))
+
+import batch_scoring  # noqa: E402
+from app import score_answers  # noqa: E402
+from eotss_hosting_recommendation_with_app_age import get_migration_complexity, score_batch_row  # noqa: E402
+from scoring import ENGINE, interpret_rules, recommend  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_baseline.json')
+
+# Every answer to the CLI's migration sub-questions
+MIGRATION_ANSWER_SPACE = [
+    {"custom_hardware": a, "legacy_software": b, "large_data": c, "many_integrations": d, "documentation": e}
+    for a, b, c, d, e in itertools.product(("yes", "no"), ("yes", "no"), ("yes", "no"), ("yes", "no"),
+                                           ("documented", "somewhat", "not documented"))
+]
+
+
+def row_result(row):
+    return row["recommendation"], row["scores"], row["explanations"], row["app_age"]
+
+
+def implementations(compiled):
+    """
+    Return (name, score one answer set, normalize its result to the reference's tuple) entries.
+    """
+    return [
+        ("interpret_rules", lambda answers: interpret_rules(compiled.rules, answers), tuple),
+        ("compiled", compiled.evaluate, tuple),
+        ("table.lookup", compiled.table.lookup, tuple),
+        ("scoring.recommend", recommend, tuple),
+        # score_answers adds app_age to the dict it is given; the table ignores the extra key
+        ("app.score_answers", score_answers, tuple),
+        ("cli.score_batch_row", lambda answers: score_batch_row(0, answers), row_result),
+    ]
+
+
+def calibration(answers):
+    # Dictionary and string work of the same kind as scoring, but independent of the repo's code
+    total = 0
+    for key, value in answers.items():
+        total += len(key) + len(value)
+    return {"total": total}
+
+
+def best_ns_per_call(run, calls, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        run()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls
+
+
+def timing(run, inputs, calls, repeat):
+    """
+    Time repeat passes of run, each right after a calibration pass over the same inputs.
+    Returns:
+        dict: ns_per_call (best pass) and relative (median of the per-pass ratios of run's
+        time to the calibration's, per input)
+    """
+    best = None
+    ratios = []
+    for _ in range(repeat):
+        calibration_ns = best_ns_per_call(lambda: deque(map(calibration, inputs), maxlen=0), len(inputs), 1)
+        ns_per_call = best_ns_per_call(run, calls, 1)
+        best = ns_per_call if best is None else min(best, ns_per_call)
+        ratios.append(ns_per_call * calls / len(inputs) / calibration_ns)
+    return {"ns_per_call": best, "relative": statistics.median(ratios)}
+
+
+def allocations(func, inputs, samples):
+    """
+    Return the mean peak bytes traced while func runs on one input, over up to samples inputs.
+    """
+    step = max(1, len(inputs) // samples)
+    chosen = inputs[::step]
+    total = 0
+    tracemalloc.start()
+    try:
+        for item in chosen:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = func(item)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+            del result
+    finally:
+        tracemalloc.stop()
+    return total / len(chosen)
+
+
+def measure(args):
+    compiled = ENGINE.current()
+    answer_sets = [compiled.table.decode(code) for code in range(compiled.table.size)]
+    reference = [interpret_rules(compiled.rules, answers) for answers in answer_sets]
+    results = {}
+
+    for name, func, normalize in implementations(compiled):
+        inputs = [dict(answers) for answers in answer_sets]
+        outputs = [normalize(func(answers)) for answers in inputs]
+        if name == "app.score_answers":
+            matches = sum(out == ref[:3] for out, ref in zip(outputs, reference))
+        else:
+            matches = sum(out == ref for out, ref in zip(outputs, reference))
+        results[name] = dict(
+            timing(lambda: deque(map(func, inputs), maxlen=0), inputs, len(inputs), args.repeat),
+            calls=len(inputs),
+            alloc_bytes_per_call=allocations(func, inputs, args.alloc_samples),
+            mismatches=len(inputs) - matches,
+        )
+
+    scorer = batch_scoring.current_scorer()
+    batch_outputs = scorer.score(answer_sets)
+    results["batch_scoring"] = dict(
+        timing(lambda: scorer.score(answer_sets), answer_sets, len(answer_sets), args.repeat),
+        calls=len(answer_sets),
+        # One call scores the whole batch; report its allocations per answer set
+        alloc_bytes_per_call=allocations(scorer.score, [answer_sets], 1) / len(answer_sets),
+        mismatches=sum(out != ref for out, ref in zip(batch_outputs, reference)),
+    )
+
+    # Far fewer combinations, so repeat over them to get a stable timing
+    migration_inputs = MIGRATION_ANSWER_SPACE * 10000
+    results["get_migration_complexity"] = dict(
+        timing(lambda: deque(map(get_migration_complexity, migration_inputs), maxlen=0),
+               migration_inputs, len(migration_inputs), args.repeat),
+        calls=len(migration_inputs),
+        alloc_bytes_per_call=allocations(get_migration_complexity, MIGRATION_ANSWER_SPACE, args.alloc_samples),
+        mismatches=0,  # no second implementation to compare with
+    )
+    return compiled.version, results
+
+
+def check_baseline(results, baseline_path, max_slowdown):
+    """
+    Print each implementation's change against the baseline.
+    Returns:
+        bool: False if one is more than max_slowdown percent slower.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\nCompared with {baseline_path} ({baseline.get('created_at', 'unknown date')}, max slowdown {max_slowdown}%):")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<26} not in baseline")
+            continue
+        change = (result["relative"] / before["relative"] - 1) * 100
+        raw_change = (result["ns_per_call"] / before["ns_per_call"] - 1) * 100
+        alloc_change = result["alloc_bytes_per_call"] - before["alloc_bytes_per_call"]
+        slower = change > max_slowdown
+        ok = ok and not slower
+        print(f"  {name:<26} {change:+7.1f}% relative ({raw_change:+7.1f}% ns/call)  "
+              f"{alloc_change:+6.0f} B/call{'  SLOWER' if slower else ''}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7, help='Timed passes per implementation; the best is reported (default: 7)')
+    parser.add_argument('--alloc-samples', type=int, default=5000, help='Calls traced for allocations (default: 5000)')
+    parser.add_argument('--baseline', help=f"Baseline to gate against (e.g. {os.path.relpath(DEFAULT_BASELINE)})")
+    parser.add_argument('--max-slowdown', type=float, default=25.0, help='Allowed slowdown against the baseline, in %% (default: 25)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline (--baseline or the default file)')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    version, results = measure(args)
+    reference_ns = results["interpret_rules"]["ns_per_call"]
+    print(f"Scoring rules {version}, {results['interpret_rules']['calls']} answer sets, best of {args.repeat}")
+    print(f"  {'implementation':<26} {'ns/call':>10} {'relative':>9} {'speedup':>8} {'alloc B/call':>13} {'mismatches':>10}")
+    for name, result in results.items():
+        speedup = f"{reference_ns / result['ns_per_call']:7.1f}x" if name != "get_migration_complexity" else ''
+        print(f"  {name:<26} {result['ns_per_call']:10.1f} {result['relative']:9.2f} {speedup:>8} "
+              f"{result['alloc_bytes_per_call']:13.0f} {result['mismatches']:>10}")
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rules_version": version,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    mismatched = [name for name, result in results.items() if result["mismatches"]]
+    if mismatched:
+        print(f"\nOutputs differ from interpret_rules: {', '.join(mismatched)}", file=sys.stderr)
+        status = 1
+    if args.baseline and not args.save_baseline and not check_baseline(results, args.baseline, args.max_slowdown):
+        status = 1
+    if args.save_baseline:
+        path = args.baseline or DEFAULT_BASELINE
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline written to {path}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Latency, throughput and memory of the web app's routes over synthetic assessments.
+
+For each data size, a child process seeds a fresh data directory with synthetic
+records (test_system.build_test_assessment) and drives these routes:
+
+    GET /                    assessment form
+    POST /                   results page for random answers
+    POST /submit_to_eotss    new submission (mail suppressed: emails are only queued)
+    GET /dashboard           first dashboard page
+    GET /view/<ticket_id>    random existing assessments
+    POST /process_review/<id>  approve pending assessments
+
+with one or both drivers:
+
+    client  the Flask test client, one request at a time (app code only, no server)
+    http    --concurrency concurrent keep-alive HTTP clients against gunicorn
+            (gunicorn.conf.py; the WEB_* environment variables apply)
+
+p50/p95/p99 latency, throughput and peak RSS (the test client's process, or the sum
+over gunicorn's processes) are printed per route and written to --output as JSON.
+--compare reports the change against an earlier output file, and with
+--max-regression exits with status 1 if any route's p95 grew by more than that
+percentage.
+
+Usage:
+    python benchmarks/bench_web.py [--sizes 1000,10000] [--backend json] [--driver both]
+        [--requests 200] [--concurrency 16] [--output bench_web.json]
+        [--compare previous.json] [--max-regression 20]
+
+100k and 1M records take minutes to seed, and several GB of disk with the JSON backend.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ('GET /', 'POST /', 'POST /submit_to_eotss', 'GET /dashboard', 'GET /view/<ticket_id>', 'POST /process_review/<id>')
+EXPECTED_STATUS = {'GET /': 200, 'POST /': 200, 'POST /submit_to_eotss': 302, 'GET /dashboard': 200,
+                   'GET /view/<ticket_id>': 200, 'POST /process_review/<id>': 302}
+SEED_CHUNK = 10000
+TICKET_SAMPLE = 1000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(route, latencies, errors, elapsed, peak_rss_mb):
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None  # noqa: E731
+    return {
+        "route": route,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+class Workload:
+    """
+    The seeded data set, and the requests sent for each route.
+    """
+
+    def __init__(self, size, seed, pending_ids, tickets):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.size = size
+        self.pending_ids = pending_ids
+        self.tickets = tickets
+        self.submissions = 0
+
+    def request(self, route):
+        """
+        Return (method, path, form data) for one request to route, or None when a route
+        has run out of work (no pending assessment left to review).
+        """
+        import answer_format
+        import scoring
+        from test_system import build_test_assessment
+        with self.lock:
+            if route == 'GET /':
+                return 'GET', '/', None
+            if route == 'POST /':
+                return 'POST', '/', {key: self.rng.choice(options) for key, options in scoring.ANSWER_OPTIONS}
+            if route == 'POST /submit_to_eotss':
+                self.submissions += 1
+                record = build_test_assessment(self.size + self.submissions, self.rng)
+                data = dict(record['agency_info'])
+                data.update(answer_format.decode_answers(record['assessment_data']['answers']))
+                return 'POST', '/submit_to_eotss', data
+            if route == 'GET /dashboard':
+                return 'GET', '/dashboard', None
+            if route == 'GET /view/<ticket_id>':
+                return 'GET', f"/view/{self.rng.choice(self.tickets)}", None
+            if not self.pending_ids:
+                return None
+            return 'POST', f"/process_review/{self.pending_ids.pop()}", {'decision': 'approved', 'review_notes': 'Benchmark'}
+
+
+def seed(data_dir, backend, size, seed_value, pending_needed):
+    """
+    Write size synthetic assessments and return (seconds, pending IDs, ticket sample).
+    """
+    from test_system import build_test_assessment, create_test_assessment
+    from storage import SQLiteStore
+
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    pending_ids = []
+    tickets = []
+    start = time.perf_counter()
+    sqlite_store = SQLiteStore(os.path.join(data_dir, 'assessments.db')) if backend == 'sqlite' else None
+    chunk = []
+    for index in range(size):
+        record = build_test_assessment(index, rng, now)
+        if record['status'] == 'pending' and len(pending_ids) < pending_needed:
+            pending_ids.append(record['id'])
+        # Reservoir sample of tickets for /view, so 1M records do not need 1M IDs in memory
+        if len(tickets) < TICKET_SAMPLE:
+            tickets.append(record['ticket_id'])
+        elif rng.random() < TICKET_SAMPLE / (index + 1):
+            tickets[rng.randrange(TICKET_SAMPLE)] = record['ticket_id']
+        if sqlite_store is None:
+            create_test_assessment(data_dir, record, verbose=False)
+            continue
+        chunk.append(record)
+        if len(chunk) == SEED_CHUNK:
+            sqlite_store.save_many(chunk)
+            chunk = []
+    if chunk:
+        sqlite_store.save_many(chunk)
+    return time.perf_counter() - start, pending_ids, tickets
+
+
+def own_peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def process_tree_peak_rss_mb(pid):
+    """
+    Sum of the peak RSS (VmHWM) of a process and its children, from /proc (Linux only).
+    """
+    def peak_kb(p):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return None
+    return round(sum(peak_kb(p) for p in [pid] + children) / 1024, 1)
+
+
+def drive_client(workload, routes, requests, warmup):
+    """
+    Send each route's requests one at a time through the Flask test client.
+    """
+    from app import app
+    client = app.test_client()
+
+    def send(route):
+        request = workload.request(route)
+        if request is None:
+            return None
+        method, path, data = request
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        elapsed = time.perf_counter() - start
+        response.close()
+        return elapsed, response.status_code
+
+    results = []
+    for route in routes:
+        if route != 'POST /process_review/<id>':
+            for _ in range(warmup):
+                send(route)
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            outcome = send(route)
+            if outcome is None:
+                break
+            latencies.append(outcome[0])
+            errors += outcome[1] != EXPECTED_STATUS[route]
+        results.append(summarize(route, latencies, errors, time.perf_counter() - start, own_peak_rss_mb()))
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, port):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=ROOT, env=dict(env, PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start within 120s")
+
+
+def drive_http(workload, routes, requests, warmup, concurrency, env):
+    """
+    Send each route's requests from concurrency keep-alive clients to a gunicorn server.
+    """
+    port = free_port()
+    server = start_gunicorn(env, port)
+    local = threading.local()
+
+    def send(route):
+        request = workload.request(route)
+        if request is None:
+            return None
+        method, path, data = request
+        body = urlencode(data) if data is not None else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if data is not None else {}
+        for attempt in range(2):
+            if getattr(local, 'conn', None) is None:
+                local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            start = time.perf_counter()
+            try:
+                local.conn.request(method, path, body=body, headers=headers)
+                response = local.conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                # The server closed the keep-alive connection; retry once on a new one
+                local.conn.close()
+                local.conn = None
+                if attempt:
+                    return time.perf_counter() - start, 0
+                continue
+            if response.getheader('Connection', '').lower() == 'close':
+                local.conn.close()
+                local.conn = None
+            return time.perf_counter() - start, response.status
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for route in routes:
+                if route != 'POST /process_review/<id>':
+                    list(pool.map(lambda _: send(route), range(warmup * concurrency)))
+                start = time.perf_counter()
+                outcomes = [outcome for outcome in pool.map(lambda _: send(route), range(requests)) if outcome is not None]
+                elapsed = time.perf_counter() - start
+                errors = sum(status != EXPECTED_STATUS[route] for _, status in outcomes)
+                results.append(summarize(route, [latency for latency, _ in outcomes], errors, elapsed,
+                                         process_tree_peak_rss_mb(server.pid)))
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return results
+
+
+def run_size(args, size):
+    """
+    Seed one data size and run the drivers (in a child process, so every size starts
+    from a fresh app and its own peak RSS).
+    """
+    data_dir = tempfile.mkdtemp(prefix=f"bench_web_{size}_")
+    try:
+        env = dict(os.environ, FLASK_ENV='testing', DATA_DIR=data_dir, STORAGE_BACKEND=args.backend,
+                   SQLITE_PATH=os.path.join(data_dir, 'assessments.db'))
+        os.environ.update(env)
+        drivers = ['client', 'http'] if args.driver == 'both' else [args.driver]
+        seed_seconds, pending_ids, tickets = seed(data_dir, args.backend, size, args.seed, args.requests * len(drivers))
+        workload = Workload(size, args.seed, pending_ids, tickets)
+        results = []
+        for driver in drivers:
+            if driver == 'client':
+                driver_results = drive_client(workload, ROUTES, args.requests, args.warmup)
+            else:
+                driver_results = drive_http(workload, ROUTES, args.requests, args.warmup, args.concurrency, env)
+            for result in driver_results:
+                result.update(size=size, backend=args.backend, driver=driver)
+            results.extend(driver_results)
+        return {"size": size, "seed_seconds": round(seed_seconds, 3), "results": results}
+    finally:
+        if args.keep_data:
+            print(f"Data for {size} records kept in {data_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def result_key(result):
+    return result['size'], result['backend'], result['driver'], result['route']
+
+
+def compare(results, baseline_path, max_regression):
+    """
+    Print each route's p95 and throughput change against an earlier run.
+    Returns:
+        bool: False if a p95 grew by more than max_regression percent.
+    """
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+    ok = True
+    compared = 0
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result_key(result))
+        if not before or not before['p95_ms'] or not result['p95_ms']:
+            continue
+        compared += 1
+        p95_change = (result['p95_ms'] / before['p95_ms'] - 1) * 100
+        rps_change = (result['throughput_rps'] / before['throughput_rps'] - 1) * 100
+        regressed = max_regression is not None and p95_change > max_regression
+        ok = ok and not regressed
+        print(f"  {result['size']:>8} {result['driver']:<6} {result['route']:<28} p95 {p95_change:+7.1f}%  "
+              f"throughput {rps_change:+7.1f}%{'  REGRESSION' if regressed else ''}")
+    if not compared:
+        print("  No routes in common (different sizes, backend or driver)")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help='Comma-separated record counts (default: 1000,10000)')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--driver', choices=('client', 'http', 'both'), default='both')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per route (default: 200)')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route (per client for http)')
+    parser.add_argument('--concurrency', type=int, default=16, help='HTTP clients (default: 16)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_web.json', help='JSON results file (default: bench_web.json)')
+    parser.add_argument('--compare', help='Earlier JSON results to compare with')
+    parser.add_argument('--max-regression', type=float, help='With --compare: fail if a p95 grew by more than this %%')
+    parser.add_argument('--keep-data', action='store_true', help='Keep the seeded data directories')
+    parser.add_argument('--child-size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_size is not None:
+        with open(args.child_output, 'w') as f:
+            json.dump(run_size(args, args.child_size), f)
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    runs = []
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(suffix='.json') as child_output:
+            child_args = [arg for arg in (argv if argv is not None else sys.argv[1:])]
+            subprocess.run([sys.executable, os.path.abspath(__file__), *child_args,
+                            '--child-size', str(size), '--child-output', child_output.name], check=True)
+            with open(child_output.name) as f:
+                runs.append(json.load(f))
+
+    results = [result for run in runs for result in run['results']]
+    print(f"{'records':>8} {'driver':<6} {'route':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>6} {'peak RSS MB':>11}")
+    for run in runs:
+        for r in run['results']:
+            print(f"{r['size']:>8} {r['driver']:<6} {r['route']:<28} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+                  f"{r['throughput_rps']:>8} {r['errors']:>6} {r['peak_rss_mb']:>11}")
+        print(f"{run['size']:>8} records seeded in {run['seed_seconds']}s")
+
+    output = {
+        "benchmark": "bench_web",
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {key: getattr(args, key) for key in ('backend', 'driver', 'requests', 'warmup', 'concurrency', 'seed')},
+        "environment": {key: value for key, value in os.environ.items() if key.startswith('WEB_')},
+        "seed_seconds": {str(run['size']): run['seed_seconds'] for run in runs},
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
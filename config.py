@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -12,6 +13,8 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME', 'jimixoso@gmail.com')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', 'zxpe jbvo ntqy xtme')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'jimixoso@gmail.com')
+    MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE', 2))  # open SMTP connections per worker
+    MAIL_POOL_IDLE_TIMEOUT = float(os.environ.get('MAIL_POOL_IDLE_TIMEOUT', 30))  # seconds before a warm connection is dropped
     
     # EOTSS recipient email
     EOTSS_EMAIL = os.environ.get('EOTSS_EMAIL', 'jimixoso@mit.edu')
@@ -24,6 +27,60 @@ class Config:
     
     # Data storage
     DATA_DIR = os.environ.get('DATA_DIR', 'assessment_data')
+    # 'sharded' (new JSON records in hashed subdirectories) or 'flat'; both layouts are read
+    DATA_LAYOUT = os.environ.get('DATA_LAYOUT', 'sharded')
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')  # 'json' or 'sqlite'
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(DATA_DIR, 'assessments.db'))
+    # Full-text search index (SQLite FTS5), shared by all workers; see `manage.py reindex`
+    SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', os.path.join(DATA_DIR, 'search.db'))
+    # Review and delivery changes are journaled; a record's journal is folded in after this many events
+    JOURNAL_COMPACT_EVENTS = int(os.environ.get('JOURNAL_COMPACT_EVENTS', 32))
+    
+    # Email outbox (queued in OUTBOX_DIR, delivered by a background thread per worker)
+    OUTBOX_DIR = os.environ.get('OUTBOX_DIR', os.path.join(DATA_DIR, 'outbox'))
+    OUTBOX_WORKER = os.environ.get('OUTBOX_WORKER', 'true').lower() == 'true'
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+    OUTBOX_RETRY_BASE = float(os.environ.get('OUTBOX_RETRY_BASE', 30))  # seconds, doubled per attempt
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 2))
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))  # emails sent per SMTP session
+    
+    # Scoring rules (re-read when the file changes; checked every RELOAD_INTERVAL seconds)
+    SCORING_RULES_PATH = os.environ.get('SCORING_RULES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_rules.json'))
+    SCORING_RULES_RELOAD_INTERVAL = float(os.environ.get('SCORING_RULES_RELOAD_INTERVAL', 5))
+    BATCH_SCORE_MAX_ITEMS = int(os.environ.get('BATCH_SCORE_MAX_ITEMS', 50000))
+    BULK_SUBMIT_MAX_ROWS = int(os.environ.get('BULK_SUBMIT_MAX_ROWS', 10000))  # rows per /api/assessments/bulk request
+    
+    # Rendered results pages cached per worker (one entry per answer combination, ~13KB each)
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 5000))
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    
+    # Parsed assessment records cached per worker, checked against the stored version on
+    # every read (0 entries disables the cache)
+    RECORD_CACHE_MAX_ENTRIES = int(os.environ.get('RECORD_CACHE_MAX_ENTRIES', 2048))
+    RECORD_CACHE_MAX_BYTES = int(os.environ.get('RECORD_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    
+    # Web server (read by gunicorn.conf.py). Concurrent requests per worker:
+    # sync = 1, gthread = WEB_THREADS, gevent = WEB_WORKER_CONNECTIONS
+    WEB_WORKER_CLASS = os.environ.get('WEB_WORKER_CLASS', 'gthread')  # 'sync', 'gthread' or 'gevent'
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 4))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 16))
+    WEB_WORKER_CONNECTIONS = int(os.environ.get('WEB_WORKER_CONNECTIONS', 250))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 120))
+    
+    # Metrics (/metrics). Each worker writes its counters to METRICS_DIR every
+    # METRICS_FLUSH_INTERVAL seconds; the scraped worker sums them.
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'eotss_metrics'))
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    
+    # Request profiling (profiling.py). PROFILE_REQUESTS profiles every request and keeps those
+    # slower than PROFILE_THRESHOLD_MS; a request with the header X-Profile: <PROFILE_TOKEN> is
+    # always profiled and kept. The token also unlocks the /debug/profiles listing.
+    PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'false').lower() == 'true'
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_THRESHOLD_MS = float(os.environ.get('PROFILE_THRESHOLD_MS', 500))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'eotss_profiles'))
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))  # profiled requests kept
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds between stack samples
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -49,6 +106,8 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     MAIL_SUPPRESS_SEND = True
+    OUTBOX_WORKER = False  # tests deliver with outbox.process_due()
+    METRICS_DIR = None  # single-process metrics
 
 # Configuration dictionary
 config = {
@@ -0,0 +1,10 @@
+"""
+Test session setup: the app is imported in testing mode with its data (records, search
+index, outbox) in a temporary directory instead of ./assessment_data.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault('FLASK_ENV', 'testing')
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='eotss_test_data_'))
@@ -1,8 +1,17 @@
 import sys
 import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 
+from scoring import recommend
+
 # QUESTIONS: Main assessment questions for application requirements.
 # Each question is a dict with a key, prompt, valid options, and a help string for user guidance.
 QUESTIONS = [
@@ -68,9 +77,11 @@ def get_valid_input(prompt, valid_options):
         print(f"Invalid input. Please enter one of: {', '.join(valid_options)}")
 
 
-def parse_args():
+def parse_args(argv=None):
     """
     Parse command-line arguments for the hosting recommendation tool.
+    Args:
+        argv (list): Arguments to parse (defaults to sys.argv[1:]).
     Returns:
         argparse.Namespace: Parsed arguments object.
     """
@@ -80,7 +91,15 @@ def parse_args():
     for q in CLOUD_READINESS_QUESTIONS:
         parser.add_argument(f'--{q["key"]}', type=str, choices=q["options"], help=q["help"])
     parser.add_argument('--gui', action='store_true', help='Launch the GUI version')
-    return parser.parse_args()
+    batch = parser.add_argument_group('batch mode', 'Score a CSV or NDJSON file of answer rows non-interactively')
+    batch.add_argument('--batch', metavar='INPUT', help="Input file of answer rows ('-' for stdin)")
+    batch.add_argument('--input-format', choices=BATCH_FORMATS, help='Input format (default: from the file extension, else ndjson)')
+    batch.add_argument('--output', '-o', metavar='FILE', default='-', help="Where to write results (default: '-' for stdout)")
+    batch.add_argument('--output-format', choices=BATCH_FORMATS, help='Output format (default: from the file extension, else ndjson)')
+    batch.add_argument('--id-field', metavar='NAME', help='Input field copied to each result as "id" (e.g. an application name)')
+    batch.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes; 1 scores in this process (default: CPU count)')
+    batch.add_argument('--chunk-size', type=int, default=1000, help='Rows sent to a worker at a time (default: 1000)')
+    return parser.parse_args(argv)
 
 
 def recommend_hosting():
@@ -130,7 +149,7 @@ def recommend_hosting():
     answers["app_age"] = app_age
 
     # Review and edit answers before processing (only if running interactively)
-    if not any(arg_dict.values()):
+    if not any(arg_dict.get(q["key"]) for q in QUESTIONS + CLOUD_READINESS_QUESTIONS):
         while True:
             print("\nSummary of your answers:")
             for idx, q in enumerate(QUESTIONS):
@@ -144,130 +163,11 @@ def recommend_hosting():
                 print(f"  (Hint: {q['help']})")
             answers[q["key"]] = get_valid_input(q["prompt"], q["options"])
 
-    # Scoring logic
-    scores = {"aws": 0, "on_prem_cloud": 0, "physical": 0}
-
-    # Fault Tolerance
-    if answers["fault_tolerance"] == "high":
-        scores["aws"] += 2
-    elif answers["fault_tolerance"] == "moderate":
-        scores["on_prem_cloud"] += 1
-
-    # Latency Sensitivity
-    if answers["latency"] == "high":
-        scores["physical"] += 2
-    elif answers["latency"] == "moderate":
-        scores["on_prem_cloud"] += 1
-
-    # Data Volume
-    if answers["data_volume"] == "high":
-        scores["on_prem_cloud"] += 2
-    elif answers["data_volume"] == "moderate":
-        scores["aws"] += 1
-    else:
-        scores["aws"] += 2
-
-    # Security Needs
-    if answers["security"] == "high":
-        scores["physical"] += 2
-    elif answers["security"] == "moderate":
-        scores["on_prem_cloud"] += 2
-    else:
-        scores["aws"] += 1
-
-    # Application Age (using logic above)
-    if answers["app_age"] == "modern":
-        scores["aws"] += 2
-    else:
-        scores["physical"] += 2
-
-    # Migration Complexity
+    # Scoring: a lookup in the precomputed table shared with the web app.
+    # Migration complexity is derived from the migration sub-questions.
     migration_complexity = get_migration_complexity(answers)
-    if migration_complexity == "low":
-        scores["aws"] += 2
-    elif migration_complexity == "moderate":
-        scores["on_prem_cloud"] += 1
-    else: # high
-        scores["physical"] += 2
-
-    # Operational Expertise
-    if answers["ops_expertise"] == "aws":
-        scores["aws"] += 2
-    elif answers["ops_expertise"] == "vmware":
-        scores["on_prem_cloud"] += 2
-    else:
-        scores["physical"] += 1
-
-    # Budget Sensitivity
-    if answers["budget"] == "low":
-        scores["aws"] += 2
-    elif answers["budget"] == "moderate":
-        scores["on_prem_cloud"] += 1
-
-    # Compliance Requirements
-    if answers["compliance"] == "yes":
-        scores["on_prem_cloud"] += 2
-        scores["aws"] += 1  # Some compliance can be met in AWS, but on-prem is often preferred
-    else:
-        scores["aws"] += 1
+    recommendation, scores, explanations, _ = recommend(dict(answers, migration=migration_complexity))
 
-    # Scalability Needs
-    if answers["scalability"] == "yes":
-        scores["aws"] += 2
-        scores["on_prem_cloud"] += 1
-    else:
-        scores["physical"] += 1
-
-    # Final recommendation
-    recommendation = max(scores, key=scores.get)
-
-    # Explanation logic: collect top contributing factors
-    explanations = []
-    if recommendation == "aws":
-        if answers["fault_tolerance"] == "high":
-            explanations.append("High fault tolerance needs are best met by AWS.")
-        if answers["budget"] == "low":
-            explanations.append("Low budget sensitivity favors AWS's cost efficiency.")
-        if answers["app_age"] == "modern":
-            explanations.append("Modern, cloud-ready applications are ideal for AWS.")
-        if migration_complexity == "low":
-            explanations.append("Low migration complexity makes AWS adoption easier.")
-        if answers["ops_expertise"] == "aws":
-            explanations.append("Your team has AWS expertise.")
-        if answers["scalability"] == "yes":
-            explanations.append("AWS is well-suited for scalable workloads.")
-        if answers["compliance"] == "no":
-            explanations.append("No strict compliance requirements allow for public cloud hosting.")
-    elif recommendation == "on_prem_cloud":
-        if answers["fault_tolerance"] == "moderate":
-            explanations.append("Moderate fault tolerance can be handled by on-prem cloud.")
-        if answers["latency"] == "moderate":
-            explanations.append("Moderate latency sensitivity is suitable for on-prem cloud.")
-        if answers["data_volume"] == "high":
-            explanations.append("High data volume is often better managed on-premises.")
-        if answers["security"] == "moderate":
-            explanations.append("Moderate security needs are met by on-prem cloud.")
-        if migration_complexity == "moderate":
-            explanations.append("Moderate migration complexity fits on-prem cloud.")
-        if answers["ops_expertise"] == "vmware":
-            explanations.append("Your team has VMware/on-prem expertise.")
-        if answers["compliance"] == "yes":
-            explanations.append("Compliance requirements are often easier to meet on-premises.")
-        if answers["scalability"] == "yes":
-            explanations.append("On-prem cloud can support some scalability needs.")
-    elif recommendation == "physical":
-        if answers["latency"] == "high":
-            explanations.append("High latency sensitivity is best served by physical infrastructure.")
-        if answers["security"] == "high":
-            explanations.append("High security needs are best met by physical hosting.")
-        if answers["app_age"] == "legacy":
-            explanations.append("Legacy applications are often better suited to physical servers.")
-        if migration_complexity == "high":
-            explanations.append("High migration complexity favors staying on physical infrastructure.")
-        if answers["ops_expertise"] == "minimal":
-            explanations.append("Minimal cloud/on-prem expertise may require physical hosting.")
-        if answers["scalability"] == "no":
-            explanations.append("Physical infrastructure is suitable for stable, non-scaling workloads.")
     print("\nSystem Recommendation:", recommendation.upper())
     print("Scores:", scores)
     if explanations:
@@ -306,6 +206,173 @@ def recommend_hosting():
             f.write(f"\n{final_recommendation}\n")
         print(f"Results saved to {filename}")
 
+# Batch mode: answer rows stream through read -> chunk -> score (in worker processes) -> write.
+# At most a few chunks per worker are in flight, so memory stays constant regardless of input size.
+
+BATCH_FORMATS = ("csv", "ndjson")
+
+# Migration sub-questions read by get_migration_complexity()
+MIGRATION_SUBQUESTIONS = ("custom_hardware", "legacy_software", "large_data", "many_integrations", "documentation")
+
+BATCH_CSV_FIELDS = ["row", "id", "recommendation", "score_aws", "score_on_prem_cloud", "score_physical", "app_age", "explanations", "error"]
+
+
+def batch_format(path, requested):
+    """
+    Return the requested format, or infer it from the file extension (ndjson by default).
+    """
+    if requested:
+        return requested
+    return "csv" if path != "-" and path.lower().endswith(".csv") else "ndjson"
+
+
+def read_batch_rows(stream, fmt):
+    """
+    Yield (row number, answers) pairs from a CSV or NDJSON stream, one row at a time.
+    Malformed NDJSON lines are yielded as (row number, error message) instead.
+    """
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(stream), 1):
+            yield number, row
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, row if isinstance(row, dict) else "Row is not a JSON object"
+
+
+def chunked(iterable, size):
+    """
+    Yield lists of up to size items from an iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_batch_row(number, row, id_field=None):
+    """
+    Validate and score one input row.
+    Migration complexity is derived from the migration sub-questions, as in interactive
+    mode, when the row includes any of them; otherwise the row's own migration answer is used.
+    Returns:
+        dict: The result record (with an "error" instead of scores for invalid rows).
+    """
+    result = {"row": number}
+    if isinstance(row, str):
+        result["error"] = row
+        return result
+    if id_field:
+        result["id"] = row.get(id_field)
+    answers = {}
+    problems = []
+    for q in QUESTIONS + CLOUD_READINESS_QUESTIONS:
+        value = str(row.get(q["key"]) or "").strip().lower()
+        if value not in q["options"]:
+            problems.append(f"{q['key']}={value!r}" if value else f"{q['key']} missing")
+        answers[q["key"]] = value
+    if problems:
+        result["error"] = "Invalid answers: " + ", ".join(problems)
+        return result
+    if any(row.get(key) for key in MIGRATION_SUBQUESTIONS):
+        for key in MIGRATION_SUBQUESTIONS:
+            answers[key] = str(row.get(key) or "").strip().lower()
+        answers["migration"] = get_migration_complexity(answers)
+    recommendation, scores, explanations, app_age = recommend(answers)
+    result.update(recommendation=recommendation, scores=scores, app_age=app_age, explanations=explanations)
+    return result
+
+
+def score_batch_chunk(chunk, id_field=None):
+    """
+    Score a chunk of (row number, answers) pairs (runs in a worker process).
+    """
+    return [score_batch_row(number, row, id_field) for number, row in chunk]
+
+
+def score_batch_stream(rows, workers, chunk_size, id_field=None):
+    """
+    Score rows, yielding result records in input order.
+    Chunks are fanned out to a process pool with a bounded number in flight.
+    """
+    chunks = chunked(rows, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from score_batch_chunk(chunk, id_field)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_batch_chunk, chunk, id_field))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class BatchWriter:
+    """
+    Write result records incrementally as CSV or NDJSON.
+    """
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.csv = csv.DictWriter(stream, fieldnames=BATCH_CSV_FIELDS) if fmt == "csv" else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv is None:
+            self.stream.write(json.dumps(result) + "\n")
+            return
+        row = {key: result.get(key, "") for key in ("row", "id", "recommendation", "app_age", "error")}
+        for platform, score in result.get("scores", {}).items():
+            row[f"score_{platform}"] = score
+        row["explanations"] = " | ".join(result.get("explanations", []))
+        self.csv.writerow(row)
+
+
+def run_batch(args):
+    """
+    Run batch mode: score every row of args.batch and write the results to args.output.
+    Returns:
+        int: Exit status (0 when every row was scored, 1 if any row had errors).
+    """
+    input_format = batch_format(args.batch, args.input_format)
+    output_format = batch_format(args.output, args.output_format)
+    source = sys.stdin if args.batch == "-" else open(args.batch, "r", newline="", encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    started = time.monotonic()
+    total = errors = 0
+    try:
+        writer = BatchWriter(target, output_format)
+        rows = read_batch_rows(source, input_format)
+        for result in score_batch_stream(rows, args.workers, max(1, args.chunk_size), args.id_field):
+            writer.write(result)
+            total += 1
+            errors += "error" in result
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        else:
+            target.flush()
+    elapsed = time.monotonic() - started
+    print(f"Scored {total - errors} of {total} rows in {elapsed:.1f}s ({errors} with errors)", file=sys.stderr)
+    return 1 if errors else 0
+
+
 def run_gui():
     """
     Launch the Tkinter GUI version of the EOTSS Hosting Recommendation System.
@@ -400,73 +467,10 @@ def run_gui():
             if not answers[q["key"]]:
                 messagebox.showerror("Missing Input", f"Please answer: {q['prompt']}")
                 return
-        # Compute cloud readiness with reversed logic for hardware dependencies
-        cloud_ready_score = 0
-        for q in CLOUD_READINESS_QUESTIONS:
-            if q["key"] == "no_hardware_deps":
-                # For hardware question: "no" means cloud-ready (no hardware requirements)
-                if answers[q["key"]] == "no":
-                    cloud_ready_score += 1
-            else:
-                # For other questions: "yes" means cloud-ready
-                if answers[q["key"]] == "yes":
-                    cloud_ready_score += 1
-        app_age = "modern" if cloud_ready_score >= 2 else "legacy"
-        answers["app_age"] = app_age
-        # Scoring logic (same as CLI)
-        scores = {"aws": 0, "on_prem_cloud": 0, "physical": 0}
-        if answers["fault_tolerance"] == "high": scores["aws"] += 2
-        elif answers["fault_tolerance"] == "moderate": scores["on_prem_cloud"] += 1
-        if answers["latency"] == "high": scores["physical"] += 2
-        elif answers["latency"] == "moderate": scores["on_prem_cloud"] += 1
-        if answers["data_volume"] == "high": scores["on_prem_cloud"] += 2
-        elif answers["data_volume"] == "moderate": scores["aws"] += 1
-        else: scores["aws"] += 2
-        if answers["security"] == "high": scores["physical"] += 2
-        elif answers["security"] == "moderate": scores["on_prem_cloud"] += 2
-        else: scores["aws"] += 1
-        if answers["app_age"] == "modern": scores["aws"] += 2
-        else: scores["physical"] += 2
+        # Scoring (same precomputed table as the CLI)
         migration_complexity = get_migration_complexity(answers)
-        if migration_complexity == "low":
-            scores["aws"] += 2
-        elif migration_complexity == "moderate": scores["on_prem_cloud"] += 1
-        else: scores["physical"] += 2
-        if answers["ops_expertise"] == "aws": scores["aws"] += 2
-        elif answers["ops_expertise"] == "vmware": scores["on_prem_cloud"] += 2
-        else: scores["physical"] += 1
-        if answers["budget"] == "low": scores["aws"] += 2
-        elif answers["budget"] == "moderate": scores["on_prem_cloud"] += 1
-        if answers["compliance"] == "yes": scores["on_prem_cloud"] += 2; scores["aws"] += 1
-        else: scores["aws"] += 1
-        if answers["scalability"] == "yes": scores["aws"] += 2; scores["on_prem_cloud"] += 1
-        else: scores["physical"] += 1
-        recommendation = max(scores, key=scores.get)
-        explanations = []
-        if recommendation == "aws":
-            if answers["fault_tolerance"] == "high": explanations.append("High fault tolerance needs are best met by AWS.")
-            if answers["budget"] == "low": explanations.append("Low budget sensitivity favors AWS's cost efficiency.")
-            if answers["app_age"] == "modern": explanations.append("Modern, cloud-ready applications are ideal for AWS.")
-            if migration_complexity == "low": explanations.append("Low migration complexity makes AWS adoption easier.")
-            if answers["ops_expertise"] == "aws": explanations.append("Your team has AWS expertise.")
-            if answers["scalability"] == "yes": explanations.append("AWS is well-suited for scalable workloads.")
-            if answers["compliance"] == "no": explanations.append("No strict compliance requirements allow for public cloud hosting.")
-        elif recommendation == "on_prem_cloud":
-            if answers["fault_tolerance"] == "moderate": explanations.append("Moderate fault tolerance can be handled by on-prem cloud.")
-            if answers["latency"] == "moderate": explanations.append("Moderate latency sensitivity is suitable for on-prem cloud.")
-            if answers["data_volume"] == "high": explanations.append("High data volume is often better managed on-premises.")
-            if answers["security"] == "moderate": explanations.append("Moderate security needs are met by on-prem cloud.")
-            if migration_complexity == "moderate": explanations.append("Moderate migration complexity fits on-prem cloud.")
-            if answers["ops_expertise"] == "vmware": explanations.append("Your team has VMware/on-prem expertise.")
-            if answers["compliance"] == "yes": explanations.append("Compliance requirements are often easier to meet on-premises.")
-            if answers["scalability"] == "yes": explanations.append("On-prem cloud can support some scalability needs.")
-        elif recommendation == "physical":
-            if answers["latency"] == "high": explanations.append("High latency sensitivity is best served by physical infrastructure.")
-            if answers["security"] == "high": explanations.append("High security needs are best met by physical hosting.")
-            if answers["app_age"] == "legacy": explanations.append("Legacy applications are often better suited to physical servers.")
-            if migration_complexity == "high": explanations.append("High migration complexity favors staying on physical infrastructure.")
-            if answers["ops_expertise"] == "minimal": explanations.append("Minimal cloud/on-prem expertise may require physical hosting.")
-            if answers["scalability"] == "no": explanations.append("Physical infrastructure is suitable for stable, non-scaling workloads.")
+        recommendation, scores, explanations, app_age = recommend(dict(answers, migration=migration_complexity))
+        answers["app_age"] = app_age
         # Show results
         result_box.config(state='normal')
         result_box.delete(1.0, tk.END)
@@ -482,6 +486,8 @@ def run_gui():
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.batch:
+        sys.exit(run_batch(args))
     if hasattr(args, 'gui') and args.gui:
         run_gui()
     else:
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Streaming exports of assessments for the EOTSS Hosting Recommendation System.
+
+The formatters take an iterable of records (normally store.iter_matching(...), which
+reads them one at a time) and yield the export as text chunks, so the web endpoints
+(/export.csv, /export.ndjson) and `python manage.py export` write any number of records
+in constant memory:
+
+    csv      one row per assessment with the fields in CSV_COLUMNS (agency, the
+             recommendation and the review decision), then one column per answer
+    ndjson   one complete JSON record per line
+"""
+
+import csv
+import json
+
+import answer_format
+from scoring import ANSWER_KEYS
+
+FORMATS = ('csv', 'ndjson')
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column, function of the record returning its value)
+CSV_COLUMNS = (
+    ('id', lambda record: record.get('id')),
+    ('ticket_id', lambda record: record.get('ticket_id')),
+    ('submitted_at', lambda record: record.get('submitted_at')),
+    ('agency_name', lambda record: (record.get('agency_info') or {}).get('agency_name')),
+    ('department', lambda record: (record.get('agency_info') or {}).get('department')),
+    ('contact_name', lambda record: (record.get('agency_info') or {}).get('contact_name')),
+    ('contact_email', lambda record: (record.get('agency_info') or {}).get('contact_email')),
+    # Platform key, e.g. 'on_prem_cloud' (records saved before answers were structured stored 'ON_PREM_CLOUD')
+    ('recommendation', lambda record: ((record.get('assessment_data') or {}).get('recommendation') or '').lower()),
+    ('scoring_rules_version', lambda record: record.get('scoring_rules_version')),
+    ('status', lambda record: record.get('status')),
+    ('reviewed_at', lambda record: record.get('reviewed_at')),
+    ('override_reason', lambda record: record.get('override_reason')),
+    ('review_notes', lambda record: record.get('review_notes')),
+    ('notification_sent', lambda record: record.get('notification_sent', False)),
+    ('notification_sent_at', lambda record: record.get('notification_sent_at')),
+)
+
+
+def record_answers(record):
+    """
+    Return a record's answers keyed by ANSWER_KEYS, or {} if they cannot be read.
+    """
+    assessment_data = record.get('assessment_data') or {}
+    try:
+        if not answer_format.is_structured(assessment_data):
+            assessment_data = answer_format.parse_legacy(assessment_data)
+        return answer_format.decode_answers(assessment_data['answers'])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return {}
+
+
+# Rows are collected into chunks of about this many characters before being yielded,
+# so a large export is not sent as one tiny HTTP chunk per record
+CHUNK_SIZE = 64 * 1024
+
+
+class _Buffer:
+    """
+    A write-only file for csv.writer that keeps what was written until it is taken.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+    def take(self):
+        text = ''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return text
+
+
+def _chunked(buffer, write_records):
+    for _ in write_records:
+        if buffer.size >= CHUNK_SIZE:
+            yield buffer.take()
+    if buffer.size:
+        yield buffer.take()
+
+
+def csv_chunks(records):
+    """
+    Yield records as CSV text (a header row, then one row per record).
+    """
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in CSV_COLUMNS] + list(ANSWER_KEYS))
+
+    def write_records():
+        for record in records:
+            answers = record_answers(record)
+            row = ['' if value is None else value for value in (get(record) for _, get in CSV_COLUMNS)]
+            writer.writerow(row + [answers.get(key, '') for key in ANSWER_KEYS])
+            yield
+
+    return _chunked(buffer, write_records())
+
+
+def ndjson_chunks(records):
+    """
+    Yield records as NDJSON text, one JSON object per line.
+    """
+    buffer = _Buffer()
+
+    def write_records():
+        for record in records:
+            buffer.write(json.dumps(record, separators=(',', ':')) + '\n')
+            yield
+
+    return _chunked(buffer, write_records())
+
+
+def export_chunks(export_format, records):
+    """
+    Yield records in one of FORMATS as text chunks.
+    """
+    if export_format == 'csv':
+        return csv_chunks(records)
+    if export_format == 'ndjson':
+        return ndjson_chunks(records)
+    raise ValueError(f"Unknown export format: {export_format}")
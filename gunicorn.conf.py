@@ -0,0 +1,49 @@
+"""
+Gunicorn settings for the EOTSS Hosting Recommendation System.
+
+The worker class and pool sizes come from config.py (WEB_* environment variables):
+
+    sync      one request at a time per worker (gunicorn's default)
+    gthread   WEB_THREADS requests per worker, each in its own thread (default)
+    gevent    up to WEB_WORKER_CONNECTIONS requests per worker as greenlets; the
+              standard library is monkey-patched, so socket, lock and sleep waits yield
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+import metrics
+
+# Imported under another name: gunicorn reads every top-level name here as a setting
+from config import config as app_configs
+
+settings = app_configs[os.environ.get('FLASK_ENV', 'development')]
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+worker_class = settings.WEB_WORKER_CLASS
+workers = settings.WEB_WORKERS
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+
+if worker_class == 'gthread':
+    threads = settings.WEB_THREADS
+elif worker_class == 'gevent':
+    worker_connections = settings.WEB_WORKER_CONNECTIONS
+elif worker_class != 'sync':
+    raise ValueError(f"WEB_WORKER_CLASS must be 'sync', 'gthread' or 'gevent', not {worker_class!r}")
+
+# The app is imported in each worker, after the gevent worker has patched the standard
+# library; preloading it in the master would create unpatched locks and threads
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = settings.LOG_LEVEL.lower()
+
+
+def on_starting(server):
+    # Workers of a previous run left their metrics snapshots behind; start the totals from zero
+    metrics.clear_snapshots(settings.METRICS_DIR)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+A bounded, thread-safe LRU cache.
+
+Entries are limited both by count and by their total size in bytes (as measured by
+the cache's sizeof function), so a cache of rendered pages or parsed records cannot
+grow past a known memory budget. Hit, miss and eviction counts are kept for monitoring.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Least-recently-used cache with entry and byte limits.
+
+    Args:
+        max_entries (int): Most entries kept; 0 disables the cache.
+        max_bytes (int): Most total bytes kept; values larger than this are never stored.
+        sizeof (callable): sizeof(value) returns a value's size in bytes (default: len).
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key (marking it most recently used), or default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Store a value, evicting least recently used entries to stay within the limits.
+        Returns:
+            bool: False if the value was too large (or the cache disabled) and was not stored.
+        """
+        size = self.sizeof(value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counts["evictions"] += 1
+        return True
+
+    def discard(self, key):
+        """
+        Remove one entry if present.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        """
+        Remove every entry (the statistics are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        """
+        Return the cache's counters and current size.
+        Returns:
+            dict: hits, misses, evictions, entries, bytes, max_entries and max_bytes.
+        """
+        with self._lock:
+            return dict(self._counts, entries=len(self._entries), bytes=self._bytes,
+                        max_entries=self.max_entries, max_bytes=self.max_bytes)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the EOTSS Hosting Recommendation System.
+
+Usage:
+    python manage.py migrate-json [--data-dir DIR] [--sqlite-path FILE]
+    python manage.py build-assets
+    python manage.py compact
+    python manage.py shard [--data-dir DIR]
+    python manage.py reindex [--batch-size N]
+    python manage.py migrate-answers [--dry-run]
+    python manage.py export [--format csv|ndjson] [--output FILE] [--status STATUS]
+        [--agency NAME] [--date-from YYYY-MM-DD] [--date-to YYYY-MM-DD]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from config import config
+import answer_format
+import assets
+import export
+import storage
+from search import SearchIndex
+
+
+def get_config():
+    """
+    Return the configuration class for the current FLASK_ENV.
+    """
+    return config[os.environ.get('FLASK_ENV', 'development')]
+
+
+def cmd_migrate_json(args):
+    """
+    Import the JSON assessment files into the SQLite database.
+    """
+    db_path = args.sqlite_path or os.path.join(args.data_dir, 'assessments.db')
+    read, imported = storage.migrate_json_to_sqlite(args.data_dir, db_path, batch_size=args.batch_size)
+    print(f"Read {read} assessments from {args.data_dir}, imported {imported} into {db_path}")
+    print("Set STORAGE_BACKEND=sqlite to serve from the database.")
+    return 0
+
+
+def cmd_build_assets(args):
+    """
+    Build the purged, minified, content-hashed stylesheet (see assets.py).
+    """
+    manifest = assets.build(dist_dir=args.dist_dir)
+    for name, built in manifest.items():
+        size = os.path.getsize(os.path.join(args.dist_dir, built))
+        gz_size = os.path.getsize(os.path.join(args.dist_dir, built + '.gz'))
+        print(f"{name} -> {built} ({size} bytes, {gz_size} gzipped)")
+    return 0
+
+
+def cmd_compact(args):
+    """
+    Fold every journaled record change into the stored records.
+    """
+    cfg = get_config()
+    store = storage.open_store({
+        'STORAGE_BACKEND': cfg.STORAGE_BACKEND,
+        'DATA_DIR': cfg.DATA_DIR,
+        'SQLITE_PATH': cfg.SQLITE_PATH,
+        'JOURNAL_COMPACT_EVENTS': cfg.JOURNAL_COMPACT_EVENTS,
+    })
+    print(f"Compacted the journals of {store.compact()} assessments ({cfg.STORAGE_BACKEND} backend)")
+    return 0
+
+
+def cmd_shard(args):
+    """
+    Move JSON assessment files from the flat layout into shard directories, online.
+    """
+    store = storage.JSONFileStore(args.data_dir)
+    moved = store.shard_files()
+    print(f"Moved {moved} assessments in {args.data_dir} into shard directories")
+    return 0
+
+
+def cmd_reindex(args):
+    """
+    Rebuild the full-text search index from every stored assessment.
+    """
+    cfg = get_config()
+    store = storage.open_store({
+        'STORAGE_BACKEND': cfg.STORAGE_BACKEND,
+        'DATA_DIR': cfg.DATA_DIR,
+        'SQLITE_PATH': cfg.SQLITE_PATH,
+    })
+    index = SearchIndex(cfg.SEARCH_INDEX_PATH)
+    index.clear()
+    indexed = 0
+    batch = []
+    for record in store.iter_records():
+        if 'id' not in record:
+            continue
+        batch.append(record)
+        if len(batch) >= args.batch_size:
+            indexed += index.add_many(batch)
+            batch = []
+    if batch:
+        indexed += index.add_many(batch)
+    print(f"Indexed {indexed} assessments into {cfg.SEARCH_INDEX_PATH}")
+    return 0
+
+
+def cmd_migrate_answers(args):
+    """
+    Convert assessments stored with text answers to the structured format (see answer_format.py),
+    then compact the store so the rewritten records replace the old ones on disk.
+    """
+    cfg = get_config()
+    store = storage.open_store({
+        'STORAGE_BACKEND': cfg.STORAGE_BACKEND,
+        'DATA_DIR': cfg.DATA_DIR,
+        'SQLITE_PATH': cfg.SQLITE_PATH,
+        'JOURNAL_COMPACT_EVENTS': cfg.JOURNAL_COMPACT_EVENTS,
+    })
+    migrated, skipped = answer_format.migrate_store(store, dry_run=args.dry_run)
+    for assessment_id, ticket_id, error in skipped:
+        # Left as they are; they are still displayed from their stored text
+        print(f"Skipped {ticket_id} ({assessment_id}): {error}", file=sys.stderr)
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {migrated} assessments; "
+          f"skipped {len(skipped)} that could not be read")
+    return 1 if skipped else 0
+
+
+def cmd_export(args):
+    """
+    Write the assessments matching the filters to a file (or stdout), oldest first.
+    """
+    cfg = get_config()
+    store = storage.open_store({
+        'STORAGE_BACKEND': cfg.STORAGE_BACKEND,
+        'DATA_DIR': cfg.DATA_DIR,
+        'SQLITE_PATH': cfg.SQLITE_PATH,
+    })
+    records = store.iter_matching(
+        status=args.status,
+        agency=args.agency,
+        date_from=args.date_from.isoformat() if args.date_from else None,
+        # --date-to is inclusive, so stop at the start of the following day
+        date_until=(args.date_to + timedelta(days=1)).isoformat() if args.date_to else None,
+    )
+    exported = 0
+
+    def counted(records):
+        nonlocal exported
+        for record in records:
+            exported += 1
+            yield record
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        for chunk in export.export_chunks(args.format, counted(records)):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {exported} assessments", file=sys.stderr)
+    return 0
+
+
+def parse_date(value):
+    """
+    argparse type for YYYY-MM-DD dates.
+    """
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {value!r}")
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments for the maintenance commands.
+    Returns:
+        argparse.Namespace: Parsed arguments object.
+    """
+    cfg = get_config()
+    parser = argparse.ArgumentParser(description="EOTSS Hosting Recommendation System maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate-json', help='Import JSON assessment files into SQLite')
+    migrate.add_argument('--data-dir', default=cfg.DATA_DIR, help='Directory holding the JSON assessment files')
+    migrate.add_argument('--sqlite-path', default=cfg.SQLITE_PATH, help='SQLite database to import into')
+    migrate.add_argument('--batch-size', type=int, default=1000, help='Records per transaction')
+    migrate.set_defaults(func=cmd_migrate_json)
+
+    build = subparsers.add_parser('build-assets', help='Build the site stylesheet into static/dist')
+    build.add_argument('--dist-dir', default=assets.DIST_DIR, help='Output directory')
+    build.set_defaults(func=cmd_build_assets)
+
+    compact = subparsers.add_parser('compact', help='Fold journaled record changes into the stored records')
+    compact.set_defaults(func=cmd_compact)
+
+    shard = subparsers.add_parser('shard', help='Move flat JSON assessment files into shard directories')
+    shard.add_argument('--data-dir', default=cfg.DATA_DIR, help='Directory holding the JSON assessment files')
+    shard.set_defaults(func=cmd_shard)
+
+    reindex = subparsers.add_parser('reindex', help='Rebuild the full-text search index')
+    reindex.add_argument('--batch-size', type=int, default=5000, help='Records per transaction')
+    reindex.set_defaults(func=cmd_reindex)
+
+    answers = subparsers.add_parser('migrate-answers', help='Store text answers of older assessments in the structured format')
+    answers.add_argument('--dry-run', action='store_true', help='Only report what would be migrated')
+    answers.set_defaults(func=cmd_migrate_answers)
+
+    dump = subparsers.add_parser('export', help='Export assessments as CSV or NDJSON')
+    dump.add_argument('--format', choices=export.FORMATS, default='csv', help='Output format (default: csv)')
+    dump.add_argument('--output', help='File to write (default: stdout)')
+    dump.add_argument('--status', choices=('pending', 'approved', 'overridden'), help='Only assessments with this status')
+    dump.add_argument('--agency', help='Only agencies whose name starts with this text')
+    dump.add_argument('--date-from', type=parse_date, help='Only assessments submitted on or after this date')
+    dump.add_argument('--date-to', type=parse_date, help='Only assessments submitted on or before this date')
+    dump.set_defaults(func=cmd_export)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
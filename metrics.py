@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+In-process metrics in the Prometheus text format.
+
+Each gunicorn worker counts into its own Registry. Counters and histograms only ever
+grow, so the registry periodically writes a snapshot of them to a file of its own
+in a directory shared by the workers:
+
+    <directory>/<pid>-<start time>.json
+
+The worker that answers a /metrics scrape adds its live values to the latest snapshot
+of every other worker (including workers that have since exited, so totals never go
+backwards) and renders the sums. Gauges are not aggregated: their callbacks are
+evaluated by the scraped worker, so they must report shared state (e.g. record counts
+from the store), not per-process state.
+
+The directory is emptied when the server starts (see on_starting in gunicorn.conf.py), so
+totals count from zero per server run, as Prometheus expects after a restart.
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a fast cached page to a slow batch request
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def clear_snapshots(directory):
+    """
+    Remove the snapshot files left in directory by an earlier run of the server.
+    """
+    if not directory or not os.path.isdir(directory):
+        return
+    for file_name in os.listdir(directory):
+        if file_name.endswith(('.json', '.tmp')):
+            try:
+                os.remove(os.path.join(directory, file_name))
+            except FileNotFoundError:
+                pass
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        # Called on every observation, so no sets or generators here
+        try:
+            key = tuple([labels[name] for name in self.labelnames])
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        for value in key:
+            if type(value) is not str:
+                return tuple([str(value) for value in key])
+        return key
+
+    def samples(self):
+        """
+        Return {label values: value} for the current process.
+        """
+        with self._lock:
+            return {key: (list(value) if isinstance(value, list) else value) for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    """
+    A count that only goes up, e.g. submissions.
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """
+    A distribution of observed values (usually durations in seconds) over fixed buckets.
+    Each label set stores per-bucket counts, then the sum and count of observations.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe how long the block takes.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Gauge(_Metric):
+    """
+    A current value computed at scrape time by a callback, e.g. records per status.
+    The callback returns a number, or {label values tuple: number} when the gauge has labels.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def samples(self):
+        value = self.function()
+        if not self.labelnames:
+            return {(): value}
+        return {tuple(str(v) for v in key): amount for key, amount in value.items()}
+
+
+class Registry:
+    """
+    The metrics of one process, shared with the other workers through snapshot files.
+
+    Args:
+        directory (str): Snapshot directory shared by all workers, or None for a
+            single-process registry.
+        flush_interval (float): Seconds between snapshots written by the background thread.
+    """
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._pid = os.getpid()
+        self._started_at = time.time_ns()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, function, labelnames=()):
+        return self._add(Gauge(name, documentation, function, labelnames))
+
+    def _snapshot_name(self):
+        # The start time keeps a recycled pid from overwriting an earlier worker's totals
+        return f"{os.getpid()}-{self._started_at}.json"
+
+    def snapshot(self):
+        """
+        Return this process's counter and histogram values, as written to its snapshot file.
+        """
+        return {
+            name: [[list(key), value] for key, value in metric.samples().items()]
+            for name, metric in self._metrics.items() if metric.kind != 'gauge'
+        }
+
+    def flush(self):
+        """
+        Write this process's snapshot file.
+        """
+        if not self.directory:
+            return
+        if self._pid != os.getpid():
+            # A forked child counts from zero under its own file
+            self._reset_after_fork()
+        path = os.path.join(self.directory, self._snapshot_name())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _reset_after_fork(self):
+        for metric in self._metrics.values():
+            if metric.kind != 'gauge':
+                metric._values = {}
+                metric._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._started_at = time.time_ns()
+
+    def collect(self):
+        """
+        Return every metric's values summed over all workers.
+        Returns:
+            dict: {metric name: {label values tuple: value}}
+        """
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        totals = {name: metric.samples() for name, metric in self._metrics.items()}
+        if not self.directory:
+            return totals
+        own = self._snapshot_name()
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json') or file_name == own:
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), 'r') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # Being replaced right now; the next scrape reads it
+            for name, samples in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None or metric.kind == 'gauge':
+                    continue
+                for key, value in samples:
+                    key = tuple(key)
+                    current = totals[name].get(key)
+                    if current is None:
+                        totals[name][key] = value
+                    elif isinstance(current, list):
+                        totals[name][key] = [a + b for a, b in zip(current, value)] if len(current) == len(value) else current
+                    else:
+                        totals[name][key] = current + value
+        return totals
+
+    def render(self):
+        """
+        Render all metrics, summed over workers, in the Prometheus text exposition format.
+        """
+        totals = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(totals[name].items()):
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), value[:-2] + [value[-1] - sum(value[:-2])]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(metric.labelnames, key, [('le', _format_value(float(bound)))])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(metric.labelnames, key)} {value[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def ensure_started(self):
+        """
+        Start the snapshot thread in this process if it is not running.
+        Safe to call on every request: after a fork the child starts its own thread.
+        """
+        if not self.directory:
+            return
+        if self._thread_pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            if self._thread_pid is None:
+                # The thread is a daemon, so write the last counts when the worker exits
+                atexit.register(self.flush)
+            self._thread_pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the snapshot thread after writing a final snapshot.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Could not write metrics snapshot")
+        self.flush()
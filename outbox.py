@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Durable email outbox.
+
+Requests queue emails here instead of talking to the SMTP server, and a background
+thread in each worker process delivers them with retries. Each queued email is one
+JSON file under the outbox directory:
+
+    pending/<due time ns>-<id>.json     waiting for delivery (sorted by due time)
+    processing/<id>.json                claimed by a worker that is delivering it
+    failed/<id>.json                    gave up after max_attempts
+
+Workers claim an email by renaming it from pending/ to processing/, which only one
+of them can do, so several gunicorn workers can share the same outbox. Claims left
+behind by a crashed worker are put back in pending/ once they are older than the lease.
+Due emails are handed to the deliverer in batches, so it can send a whole batch over
+one SMTP session.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_STATES = ('pending', 'processing', 'failed')
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Outbox:
+    """
+    A directory-backed email queue with a background delivery thread.
+
+    Args:
+        directory (str): Where queued emails are kept.
+        deliver (callable): deliver(entries) sends a batch of emails and returns one result per
+            entry: None if it was sent, or the exception that means "retry later".
+        on_status (callable): on_status(entry, status, error) is called after each attempt with
+            status 'sent', 'retrying' or 'failed' (e.g. to record it on the assessment).
+        max_attempts (int): Attempts before an email is moved to failed/.
+        retry_base (float): Delay in seconds before the first retry; doubled after each attempt.
+        retry_max (float): Upper bound on the retry delay.
+        poll_interval (float): How often the delivery thread looks for due emails.
+        lease (float): Seconds after which an unfinished claim is considered abandoned.
+        batch_size (int): Most emails passed to one deliver() call.
+    """
+
+    def __init__(self, directory, deliver, on_status=None, max_attempts=8, retry_base=30.0,
+                 retry_max=3600.0, poll_interval=2.0, lease=300.0, batch_size=50):
+        self.directory = directory
+        self.deliver = deliver
+        self.on_status = on_status
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.batch_size = batch_size
+        for state in OUTBOX_STATES:
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _path(self, state, name):
+        return os.path.join(self.directory, state, name)
+
+    def enqueue(self, kind, assessment_id, message):
+        """
+        Queue an email for delivery.
+        Args:
+            kind (str): What the email is, e.g. 'eotss_notification'.
+            assessment_id (str): The assessment it belongs to.
+            message (dict): subject, recipients, body and optionally html and sender.
+        Returns:
+            str: The outbox entry id.
+        """
+        entry = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "assessment_id": assessment_id,
+            "message": message,
+            "attempts": 0,
+            "queued_at": datetime.now().isoformat(),
+            "last_error": None,
+        }
+        self._schedule(entry, time.time())
+        self._wakeup.set()
+        return entry["id"]
+
+    def _schedule(self, entry, due):
+        _write_json(self._path('pending', f"{int(due * 1e9):020d}-{entry['id']}.json"), entry)
+
+    def _claim(self, name):
+        """
+        Move a pending entry to processing/. Returns its new path, or None if another worker got it.
+        """
+        claimed = self._path('processing', name.split('-', 1)[1])
+        try:
+            os.rename(self._path('pending', name), claimed)
+        except FileNotFoundError:
+            return None
+        # Claim time drives the lease
+        os.utime(claimed)
+        return claimed
+
+    def due(self, now=None):
+        """
+        Return the names of pending entries that are due, oldest first.
+        """
+        cutoff = f"{int((now if now is not None else time.time()) * 1e9):020d}"
+        names = sorted(n for n in os.listdir(os.path.join(self.directory, 'pending')) if n.endswith('.json'))
+        return [n for n in names if n[:20] <= cutoff]
+
+    def process_due(self, limit=None):
+        """
+        Attempt delivery of every due email (or up to limit of them), batch_size at a time.
+        Returns:
+            int: Number of emails delivered.
+        """
+        self.requeue_abandoned()
+        delivered = 0
+        names = self.due()[:limit]
+        for start in range(0, len(names), self.batch_size):
+            batch = []
+            for name in names[start:start + self.batch_size]:
+                claimed = self._claim(name)
+                if claimed is None:
+                    continue
+                with open(claimed, 'r') as f:
+                    batch.append((claimed, json.load(f)))
+            if not batch:
+                continue
+            entries = [entry for _, entry in batch]
+            try:
+                errors = self.deliver(entries)
+            except Exception as e:
+                errors = [e] * len(entries)
+            for (claimed, entry), error in zip(batch, errors):
+                delivered += self._finish(claimed, entry, error)
+        return delivered
+
+    def _finish(self, claimed, entry, error):
+        """
+        Record the outcome of one delivery attempt. Returns 1 if the email was sent.
+        """
+        entry["attempts"] += 1
+        if error is None:
+            os.remove(claimed)
+            self._report(entry, 'sent')
+            return 1
+        entry["last_error"] = f"{type(error).__name__}: {error}"
+        if entry["attempts"] >= self.max_attempts:
+            logger.error("Giving up on %s email %s after %d attempts: %s",
+                         entry["kind"], entry["id"], entry["attempts"], entry["last_error"])
+            _write_json(self._path('failed', f"{entry['id']}.json"), entry)
+            status = 'failed'
+        else:
+            delay = min(self.retry_base * 2 ** (entry["attempts"] - 1), self.retry_max)
+            logger.warning("Delivery of %s email %s failed (attempt %d), retrying in %.0fs: %s",
+                           entry["kind"], entry["id"], entry["attempts"], delay, entry["last_error"])
+            self._schedule(entry, time.time() + delay)
+            status = 'retrying'
+        os.remove(claimed)
+        self._report(entry, status)
+        return 0
+
+    def _report(self, entry, status):
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(entry, status, entry["last_error"] if status != 'sent' else None)
+        except Exception:
+            logger.exception("Could not record %s status of email %s", status, entry["id"])
+
+    def requeue_abandoned(self):
+        """
+        Put claims older than the lease back in pending/ (their worker died mid-delivery).
+        """
+        processing = os.path.join(self.directory, 'processing')
+        cutoff = time.time() - self.lease
+        for name in os.listdir(processing):
+            path = os.path.join(processing, name)
+            try:
+                if not name.endswith('.json') or os.stat(path).st_mtime > cutoff:
+                    continue
+                # A rename, so only one worker requeues it
+                os.rename(path, self._path('pending', f"{int(time.time() * 1e9):020d}-{name}"))
+            except OSError:
+                continue
+            logger.warning("Requeued abandoned email %s", name[:-len('.json')])
+
+    def counts(self):
+        """
+        Return the number of entries in each state.
+        """
+        return {state: sum(1 for n in os.listdir(os.path.join(self.directory, state)) if n.endswith('.json'))
+                for state in OUTBOX_STATES}
+
+    def ensure_started(self):
+        """
+        Start the delivery thread in this process if it is not running.
+        Safe to call on every request: after a fork the child starts its own thread.
+        """
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the delivery thread (emails still queued are delivered after the next start).
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            try:
+                self.process_due()
+            except Exception:
+                logger.exception("Email outbox delivery pass failed")
+            self._wakeup.wait(self.poll_interval)
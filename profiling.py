@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+On-demand request profiling for the WSGI app.
+
+ProfilingMiddleware profiles a request when profiling is enabled in the configuration
+(PROFILE_REQUESTS) or when the request carries the X-Profile header with the secret
+PROFILE_TOKEN. While the request runs (including the iteration of a streamed body):
+
+- cProfile records every call, for a pstats file (`python -m pstats <file>`, snakeviz, ...)
+- a sampler thread records the request thread's stack every PROFILE_SAMPLE_INTERVAL
+  seconds, for a collapsed-stack file (flamegraph.pl, speedscope, ...)
+
+Requests enabled by configuration are kept only if they took at least
+PROFILE_THRESHOLD_MS; header requests are always kept. Each kept request writes
+
+    <directory>/<name>.pstats, <name>.collapsed and <name>.json (path, duration, ...)
+
+and only the newest PROFILE_MAX_FILES requests are kept.
+
+One request is profiled at a time per worker (a profiler sees everything that runs on
+its thread, and under gevent that includes other greenlets). Requests arriving while
+another is being profiled run unprofiled.
+"""
+
+import cProfile
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    from gevent import monkey
+    # The sampler must be a real thread: a greenlet would not run while the request is busy
+    _start_thread = monkey.get_original('_thread', 'start_new_thread')
+    _allocate_lock = monkey.get_original('_thread', 'allocate_lock')
+    _get_ident = monkey.get_original('_thread', 'get_ident')
+    _sleep = monkey.get_original('time', 'sleep')
+except ImportError:
+    import _thread
+    _start_thread = _thread.start_new_thread
+    _allocate_lock = _thread.allocate_lock
+    _get_ident = _thread.get_ident
+    _sleep = time.sleep
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+
+# Fetching profiles is not itself profiled
+EXCLUDED_PREFIXES = ('/debug/',)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples one thread's stack at a fixed interval and counts identical stacks.
+
+    Args:
+        thread_id (int): The OS thread to sample.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._running = False
+        self._done = _allocate_lock()
+
+    def start(self):
+        self._running = True
+        self._done.acquire()
+        _start_thread(self._run, ())
+
+    def stop(self):
+        self._running = False
+        with self._done:
+            pass
+
+    def _run(self):
+        try:
+            while self._running:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is not None:
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack = ';'.join(reversed(labels))
+                    self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                _sleep(self.interval)
+        finally:
+            self._done.release()
+
+    def collapsed(self):
+        """
+        Return the samples in the collapsed-stack format, one 'frame;frame;frame count' line per stack.
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware that profiles selected requests and writes the slow ones to a directory.
+
+    Args:
+        app: The WSGI application to wrap.
+        directory (str): Where profiles are written.
+        enabled (bool): Profile every request (kept if over threshold_ms).
+        token (str): Secret that enables profiling of one request via the X-Profile header,
+            and gives access to the /debug/profiles listing; None disables both.
+        threshold_ms (float): Minimum duration of a profile kept for an enabled request.
+        max_files (int): Most profiled requests kept; the oldest are removed first.
+        sample_interval (float): Seconds between stack samples.
+    """
+
+    def __init__(self, app, directory, enabled=False, token=None, threshold_ms=500, max_files=50, sample_interval=0.005):
+        self.app = app
+        self.directory = directory
+        self.enabled = enabled
+        self.token = token
+        self.threshold_ms = threshold_ms
+        self.max_files = max_files
+        self.sample_interval = sample_interval
+        self._busy = threading.Lock()
+
+    def authorized(self, value):
+        """
+        Return True if value is the profiling token (compared in constant time).
+        """
+        return bool(self.token) and bool(value) and hmac.compare_digest(value.encode(), self.token.encode())
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(EXCLUDED_PREFIXES):
+            return self.app(environ, start_response)
+        forced = self.authorized(environ.get(HEADER))
+        if not (self.enabled or forced) or not self._busy.acquire(blocking=False):
+            return self.app(environ, start_response)
+        run = _ProfiledRun(self, environ, forced)
+        status = []
+
+        def record_status(status_line, headers, exc_info=None):
+            status.append(status_line)
+            return start_response(status_line, headers, exc_info)
+
+        run.start()
+        try:
+            body = self.app(environ, record_status)
+        except BaseException:
+            self._finished(run, None)
+            raise
+        finally:
+            run.pause()
+        return _ProfiledBody(body, run, status)
+
+    def _finished(self, run, status):
+        try:
+            run.finish(status)
+        finally:
+            self._busy.release()
+
+    def save(self, run, status):
+        """
+        Write a finished run's pstats, collapsed stacks and summary, then rotate old profiles.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        started = datetime.fromtimestamp(run.started_at)
+        path = re.sub(r'[^A-Za-z0-9]+', '_', run.environ.get('PATH_INFO', '')).strip('_')[:60] or 'root'
+        name = f"{started:%Y%m%dT%H%M%S}-{int(run.started_at * 1e6) % 1000000:06d}-{os.getpid()}-{path}"
+        base = os.path.join(self.directory, name)
+        run.profiler.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", 'w') as f:
+            f.write(run.sampler.collapsed())
+        summary = {
+            "name": name,
+            "method": run.environ.get('REQUEST_METHOD'),
+            "path": run.environ.get('PATH_INFO'),
+            "query": run.environ.get('QUERY_STRING', ''),
+            "status": status,
+            "duration_ms": round(run.duration_ms, 3),
+            "started_at": started.isoformat(),
+            "pid": os.getpid(),
+            "forced": run.forced,
+        }
+        with open(f"{base}.json.tmp", 'w') as f:
+            json.dump(summary, f)
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+        self.rotate()
+
+    def rotate(self):
+        """
+        Remove the oldest profiles beyond max_files.
+        """
+        names = sorted(n[:-len('.json')] for n in os.listdir(self.directory) if n.endswith('.json'))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            for suffix in ('.json', '.pstats', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def profiles(self):
+        """
+        Return the summaries of the kept profiles, slowest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), 'r') as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Rotated away while listing
+        return sorted(summaries, key=lambda summary: summary['duration_ms'], reverse=True)
+
+
+class _ProfiledRun:
+    """
+    The profiler, sampler and timing of one request.
+    """
+
+    def __init__(self, middleware, environ, forced):
+        self.middleware = middleware
+        self.environ = environ
+        self.forced = forced
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(_get_ident(), middleware.sample_interval)
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self._resumed = None
+
+    def start(self):
+        self.sampler.start()
+        self.resume()
+
+    def resume(self):
+        self._resumed = time.perf_counter()
+        self.profiler.enable()
+
+    def pause(self):
+        self.profiler.disable()
+        self.duration_ms += (time.perf_counter() - self._resumed) * 1000
+
+    def finish(self, status):
+        self.profiler.disable()
+        self.sampler.stop()
+        if status is None:
+            return  # The app raised; nothing worth keeping
+        if self.forced or self.duration_ms >= self.middleware.threshold_ms:
+            try:
+                self.middleware.save(self, status)
+            except OSError:
+                logger.exception("Could not write request profile")
+
+
+class _ProfiledBody:
+    """
+    Response body that profiles the iteration of a streamed response, and saves the
+    profile when the server closes it.
+    """
+
+    def __init__(self, body, run, status):
+        self.body = body
+        self.run = run
+        self.status = status
+
+    def __iter__(self):
+        iterator = iter(self.body)
+        while True:
+            self.run.resume()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.run.pause()
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            status = self.status[0].split(' ', 1)[0] if self.status else None
+            self.run.middleware._finished(self.run, int(status) if status else None)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Hosting recommendation scoring shared by the web app, the CLI and the GUI.
+
+The weights and explanation texts are defined once, as data, in scoring_rules.json.
+They are compiled into a closure-based evaluator, and because the answer space is
+finite (3^7 x 2^2 x 2^3 = 69,984 combinations) every combination is then scored
+once into a compact array-backed table. Scoring an answer set is a single lookup.
+
+The rules file carries a version tag and is re-read when it changes on disk, so
+weight changes roll out to running workers without a restart.
+
+Run `python scoring.py --verify` to check every table entry against the rules.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from itertools import product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_rules.json')
+
+# Answer keys and their options, in the order used to encode an answer set
+ANSWER_OPTIONS = (
+    ("fault_tolerance", ("low", "moderate", "high")),
+    ("latency", ("low", "moderate", "high")),
+    ("data_volume", ("low", "moderate", "high")),
+    ("security", ("low", "moderate", "high")),
+    ("migration", ("low", "moderate", "high")),
+    ("ops_expertise", ("aws", "vmware", "minimal")),
+    ("budget", ("low", "moderate", "high")),
+    ("compliance", ("yes", "no")),
+    ("scalability", ("yes", "no")),
+    ("containerized", ("yes", "no")),
+    ("compatible_runtime", ("yes", "no")),
+    ("no_hardware_deps", ("yes", "no")),
+)
+
+ANSWER_KEYS = tuple(key for key, _ in ANSWER_OPTIONS)
+
+# Features the rules may refer to: every answer plus the derived application age
+FEATURE_OPTIONS = dict(ANSWER_OPTIONS, app_age=("modern", "legacy"))
+
+# Array type of the scores in a ScoringTable, and the largest platform total it can hold
+SCORE_TYPECODE = 'i'
+MAX_SCORE = 2 ** (8 * array(SCORE_TYPECODE).itemsize - 1) - 1
+
+
+class RulesError(ValueError):
+    """Raised when a rules file is malformed."""
+
+
+def load_rules(path):
+    """
+    Read and validate a rules file.
+    Args:
+        path (str): Path to a JSON rules file (see scoring_rules.json).
+    Returns:
+        dict: The rules.
+    Raises:
+        RulesError: If the file is not valid rules.
+    """
+    try:
+        with open(path, 'r') as f:
+            rules = json.load(f)
+    except ValueError as e:
+        raise RulesError(f"{path} is not valid JSON: {e}")
+    validate_rules(rules)
+    return rules
+
+
+def validate_rules(rules):
+    """
+    Check that rules only refer to known platforms, features and options.
+    Raises:
+        RulesError: Describing the first problem found.
+    """
+    for field in ("version", "platforms", "app_age", "weights", "explanations"):
+        if field not in rules:
+            raise RulesError(f"Rules are missing '{field}'")
+    platforms = rules["platforms"]
+
+    def check_condition(feature, value, where):
+        if feature not in FEATURE_OPTIONS:
+            raise RulesError(f"{where}: unknown feature '{feature}'")
+        if value not in FEATURE_OPTIONS[feature]:
+            raise RulesError(f"{where}: '{value}' is not an option of '{feature}'")
+
+    for feature, value in rules["app_age"]["cloud_ready_answers"].items():
+        check_condition(feature, value, "app_age")
+    for feature, options in rules["weights"].items():
+        for value, weights in options.items():
+            check_condition(feature, value, "weights")
+            for platform, points in weights.items():
+                if platform not in platforms or not isinstance(points, int):
+                    raise RulesError(f"weights.{feature}.{value}: bad weight {platform}={points!r}")
+    for platform in platforms:
+        # A platform's total is one weight per feature, so this bounds it for every answer set
+        largest = sum(max((abs(weights.get(platform, 0)) for weights in options.values()), default=0)
+                      for options in rules["weights"].values())
+        if largest > MAX_SCORE:
+            raise RulesError(f"weights: totals for '{platform}' can reach {largest}, more than {MAX_SCORE}")
+    for platform, entries in rules["explanations"].items():
+        if platform not in platforms:
+            raise RulesError(f"explanations: unknown platform '{platform}'")
+        for entry in entries:
+            for feature, value in entry["when"].items():
+                check_condition(feature, value, f"explanations.{platform}")
+
+
+def interpret_rules(rules, answers):
+    """
+    Score an answer set by walking the rules data directly.
+    This straightforward, uncompiled evaluator is the reference that compiled
+    evaluators and lookup tables are verified against.
+    Returns:
+        tuple: (recommendation (str), scores (dict), explanations (list of str), app_age (str))
+    """
+    app_age_rules = rules["app_age"]
+    ready = sum(1 for key, value in app_age_rules["cloud_ready_answers"].items() if answers.get(key) == value)
+    app_age = "modern" if ready >= app_age_rules["modern_threshold"] else "legacy"
+    features = dict(answers, app_age=app_age)
+
+    scores = {platform: 0 for platform in rules["platforms"]}
+    for feature, options in rules["weights"].items():
+        for platform, points in options.get(features[feature], {}).items():
+            scores[platform] += points
+    recommendation = max(scores, key=scores.get)
+    explanations = [
+        entry["text"] for entry in rules["explanations"].get(recommendation, [])
+        if all(features.get(key) == value for key, value in entry["when"].items())
+    ]
+    return recommendation, scores, explanations, app_age
+
+
+def compile_rules(rules):
+    """
+    Compile rules into a fast evaluator.
+    Weights become per-feature tuples indexed by platform position, and explanation
+    conditions become flat (conditions, text) tuples, all captured in a closure.
+    Returns:
+        callable: evaluate(answers) -> (recommendation, scores, explanations, app_age)
+    """
+    platforms = tuple(rules["platforms"])
+    positions = range(len(platforms))
+    no_points = (0,) * len(platforms)
+    ready_answers = tuple(rules["app_age"]["cloud_ready_answers"].items())
+    modern_threshold = rules["app_age"]["modern_threshold"]
+    weight_tables = tuple(
+        (feature, {value: tuple(weights.get(p, 0) for p in platforms) for value, weights in options.items()})
+        for feature, options in rules["weights"].items()
+    )
+    explanation_rules = tuple(
+        tuple((tuple(entry["when"].items()), entry["text"]) for entry in rules["explanations"].get(platform, []))
+        for platform in platforms
+    )
+
+    def evaluate(answers):
+        ready = 0
+        for key, value in ready_answers:
+            if answers.get(key) == value:
+                ready += 1
+        app_age = "modern" if ready >= modern_threshold else "legacy"
+        features = dict(answers, app_age=app_age)
+
+        totals = [0] * len(platforms)
+        for feature, table in weight_tables:
+            points = table.get(features[feature], no_points)
+            for i in positions:
+                totals[i] += points[i]
+        # index() finds the first of equal scores, i.e. platform order breaks ties
+        best = totals.index(max(totals))
+        explanations = []
+        for conditions, text in explanation_rules[best]:
+            for key, value in conditions:
+                if features.get(key) != value:
+                    break
+            else:
+                explanations.append(text)
+        return platforms[best], dict(zip(platforms, totals)), explanations, app_age
+
+    return evaluate
+
+
+class ScoringTable:
+    """
+    Precomputed results of an evaluator for every combination in ANSWER_OPTIONS.
+
+    Row i holds the result for the answer set whose mixed-radix code is i (see encode).
+    Recommendations, scores and app ages are stored as small integers in flat arrays;
+    explanation lists are interned, so each row only stores an index into them.
+    """
+
+    def __init__(self, evaluate, platforms):
+        self.evaluate = evaluate
+        self.platforms = tuple(platforms)
+        # Place value of each option in the answer code, per key
+        self._place_values = {}
+        stride = 1
+        for key, options in reversed(ANSWER_OPTIONS):
+            self._place_values[key] = {option: i * stride for i, option in enumerate(options)}
+            stride *= len(options)
+        self.size = stride
+
+        width = len(self.platforms)
+        self._recommendations = bytearray(self.size)
+        self._app_ages = bytearray(self.size)
+        self._scores = array(SCORE_TYPECODE, [0]) * (self.size * width)
+        # There are at most as many distinct explanation lists as rows, which 'I' always holds
+        self._explanation_ids = array('I', [0]) * self.size
+        self._explanation_sets = []
+        explanation_ids = {}
+
+        # product() enumerates combinations in code order, so the row index is the code
+        for code, combination in enumerate(product(*(options for _, options in ANSWER_OPTIONS))):
+            recommendation, scores, explanations, app_age = evaluate(dict(zip(ANSWER_KEYS, combination)))
+            self._recommendations[code] = self.platforms.index(recommendation)
+            self._app_ages[code] = app_age == "modern"
+            for i, platform in enumerate(self.platforms):
+                self._scores[code * width + i] = scores[platform]
+            explanations = tuple(explanations)
+            if explanations not in explanation_ids:
+                explanation_ids[explanations] = len(self._explanation_sets)
+                self._explanation_sets.append(explanations)
+            self._explanation_ids[code] = explanation_ids[explanations]
+
+    def encode(self, answers):
+        """
+        Encode an answer set as its row number in the table.
+        Raises:
+            KeyError: If an answer is missing or not one of the question's options.
+        """
+        place_values = self._place_values
+        return sum(place_values[key][answers[key]] for key in ANSWER_KEYS)
+
+    def decode(self, code):
+        """
+        Return the answer set encoded by a row number.
+        """
+        answers = {}
+        for key, options in reversed(ANSWER_OPTIONS):
+            code, index = divmod(code, len(options))
+            answers[key] = options[index]
+        return {key: answers[key] for key in ANSWER_KEYS}
+
+    def result(self, code):
+        """
+        Return the stored result for a row number.
+        Returns:
+            tuple: (recommendation, scores, explanations, app_age)
+        """
+        width = len(self.platforms)
+        base = code * width
+        scores = dict(zip(self.platforms, self._scores[base:base + width]))
+        return (
+            self.platforms[self._recommendations[code]],
+            scores,
+            list(self._explanation_sets[self._explanation_ids[code]]),
+            "modern" if self._app_ages[code] else "legacy",
+        )
+
+    def lookup(self, answers):
+        """
+        Score an answer set with a single table lookup.
+        Answer sets outside the table's domain fall back to the evaluator.
+        """
+        try:
+            code = self.encode(answers)
+        except KeyError:
+            return self.evaluate(answers)
+        return self.result(code)
+
+    def verify(self, reference):
+        """
+        Check every row against a reference evaluator.
+        Returns:
+            list: Codes whose stored result differs from the reference (empty when the table is correct).
+        """
+        return [code for code in range(self.size) if self.result(code) != reference(self.decode(code))]
+
+
+class CompiledRules:
+    """
+    One version of the rules: the data, its compiled evaluator and its lookup table.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.version = rules["version"]
+        self.platforms = tuple(rules["platforms"])
+        self.evaluate = compile_rules(rules)
+        self.table = ScoringTable(self.evaluate, self.platforms)
+
+    def verify(self):
+        """
+        Check the lookup table against the uncompiled rules.
+        Returns:
+            list: Mismatching answer codes (empty when the table is correct).
+        """
+        return self.table.verify(lambda answers: interpret_rules(self.rules, answers))
+
+
+class RuleEngine:
+    """
+    Holds the current CompiledRules and reloads them when the rules file changes.
+
+    The file's modification time is checked at most once per reload_interval seconds.
+    A changed file is only swapped in if it is valid; otherwise the previous rules
+    stay in service, the error is logged, and that version of the file is not tried again.
+    """
+
+    def __init__(self, path=DEFAULT_RULES_PATH, reload_interval=5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._failed_mtime = None
+        self._compiled = CompiledRules(load_rules(path))
+
+    def configure(self, path, reload_interval):
+        """
+        Point the engine at a (possibly different) rules file.
+        """
+        self.reload_interval = reload_interval
+        if os.path.abspath(path) != os.path.abspath(self.path):
+            self.path = path
+            self.reload(force=True)
+
+    def reload(self, force=False):
+        """
+        Reload the rules file if it has changed (or unconditionally with force=True).
+        Returns:
+            bool: True if new rules were swapped in.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtime = None
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if not force and mtime in (self._mtime, self._failed_mtime):
+                    return False
+                compiled = CompiledRules(load_rules(self.path))
+            except (OSError, ValueError, ArithmeticError, KeyError, TypeError) as e:
+                logger.error("Keeping scoring rules %s; could not load %s: %s", self._compiled.version, self.path, e)
+                # Don't rebuild the same bad file on every check; the next change to it is retried
+                self._failed_mtime = mtime
+                return False
+            self._mtime = mtime
+            self._failed_mtime = None
+            if compiled.version != self._compiled.version:
+                logger.info("Scoring rules updated from %s to %s", self._compiled.version, compiled.version)
+            self._compiled = compiled
+            return True
+
+    def current(self):
+        """
+        Return the CompiledRules in service, reloading first if the check interval has passed.
+        """
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+        return self._compiled
+
+
+ENGINE = RuleEngine(
+    os.environ.get('SCORING_RULES_PATH', DEFAULT_RULES_PATH),
+    float(os.environ.get('SCORING_RULES_RELOAD_INTERVAL', 5)),
+)
+
+
+def configure(path, reload_interval):
+    """
+    Configure the shared rule engine (called by the web app from its config).
+    """
+    ENGINE.configure(path, reload_interval)
+
+
+def rules_version():
+    """
+    Return the version tag of the rules currently in service.
+    """
+    return ENGINE.current().version
+
+
+def recommend(answers):
+    """
+    Score an answer set using the current rules' precomputed table.
+    Args:
+        answers (dict): Answers keyed by ANSWER_KEYS.
+    Returns:
+        tuple: (recommendation (str), scores (dict), explanations (list of str), app_age (str))
+    """
+    return ENGINE.current().table.lookup(answers)
+
+
+if __name__ == "__main__":
+    if "--verify" in sys.argv[1:]:
+        compiled = ENGINE.current()
+        mismatches = compiled.verify()
+        if mismatches:
+            print(f"Scoring table mismatch for {len(mismatches)} of {compiled.table.size} answer sets, e.g. {compiled.table.decode(mismatches[0])}")
+            sys.exit(1)
+        print(f"Scoring rules {compiled.version} verified: all {compiled.table.size} answer sets match the rules.")
+    else:
+        print("Usage: python scoring.py --verify")
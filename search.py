@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Full-text search over assessments for the EOTSS Hosting Recommendation System.
+
+SearchIndex keeps an SQLite FTS5 inverted index of each assessment's ticket ID, agency,
+department, contact, review notes and recommendation text, in its own database file
+(SEARCH_INDEX_PATH, by default next to the records in DATA_DIR) shared by every worker.
+The app updates an assessment's entry when it is submitted and when it is reviewed, so
+the index never has to be rebuilt at startup; `python manage.py reindex` rebuilds it
+from the store (e.g. after a restore, or for records written by other tools).
+
+Search terms match words by prefix ('depart' finds 'Department'), every term must match,
+and results come newest first.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Words of a search term, split as the index's unicode61 tokenizer splits text
+TOKEN_RE = re.compile(r'\w+')
+
+
+def document_fields(record):
+    """
+    Return the text indexed for a record, keyed by SearchIndex.COLUMNS.
+    """
+    agency_info = record.get('agency_info') or {}
+    assessment_data = record.get('assessment_data') or {}
+    explanations = assessment_data.get('explanations') or ''
+    if isinstance(explanations, list):  # structured records (see answer_format.py)
+        explanations = '\n'.join(explanations)
+    return {
+        "ticket_id": record.get('ticket_id') or '',
+        "agency": agency_info.get('agency_name', ''),
+        "department": agency_info.get('department', ''),
+        "contact": f"{agency_info.get('contact_name', '')} {agency_info.get('contact_email', '')}".strip(),
+        "notes": record.get('review_notes') or '',
+        "text": f"{assessment_data.get('recommendation', '')}\n{explanations}".strip(),
+    }
+
+
+def match_expression(text):
+    """
+    Turn what a user typed into an FTS5 query: each whitespace-separated term becomes a
+    prefix phrase of its words, and all terms must match. Returns None if there are no words.
+    """
+    phrases = []
+    for term in text.split():
+        words = TOKEN_RE.findall(term.lower())
+        if words:
+            # A one-letter prefix would expand to most of the vocabulary
+            phrases.append('"' + ' '.join(words) + ('"*' if len(words[-1]) > 1 else '"'))
+    return ' '.join(phrases) or None
+
+
+class SearchIndex:
+    """
+    FTS5 index of assessment text, with a row per assessment.
+    Each worker process uses one connection, guarded by a lock (searches take milliseconds).
+
+    Args:
+        path (str): The index database file (created if missing).
+        busy_timeout_ms (int): How long a write waits for another worker's write.
+    """
+
+    COLUMNS = ('ticket_id', 'agency', 'department', 'contact', 'notes', 'text')
+
+    SCHEMA = (
+        # FTS5 rows are addressed by rowid; this maps assessment IDs to them
+        "CREATE TABLE IF NOT EXISTS docs (rowid INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE)",
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS assessment_text USING fts5(
+            {', '.join(COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )""",
+    )
+
+    def __init__(self, path, busy_timeout_ms=5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._write() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        # Call with the lock held; a connection inherited across a fork belongs to the parent
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _read(self):
+        with self._lock:
+            yield self._connection()
+
+    @contextmanager
+    def _write(self):
+        """
+        Run a block inside a write transaction; the write lock is taken up front so
+        workers writing at the same time queue instead of deadlocking.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _upsert(self, conn, record):
+        row = conn.execute("SELECT rowid FROM docs WHERE id = ?", (record['id'],)).fetchone()
+        if row is None:
+            rowid = conn.execute("INSERT INTO docs (id) VALUES (?)", (record['id'],)).lastrowid
+        else:
+            rowid = row[0]
+            conn.execute("DELETE FROM assessment_text WHERE rowid = ?", (rowid,))
+        fields = document_fields(record)
+        conn.execute(
+            f"INSERT INTO assessment_text (rowid, {', '.join(self.COLUMNS)}) VALUES (?{', ?' * len(self.COLUMNS)})",
+            (rowid,) + tuple(fields[column] for column in self.COLUMNS),
+        )
+
+    def add(self, record):
+        """
+        Index a record, replacing its previous entry.
+        """
+        self.add_many([record])
+
+    def add_many(self, records):
+        """
+        Index many records in one transaction.
+        Returns:
+            int: Number of records indexed.
+        """
+        count = 0
+        with self._write() as conn:
+            for record in records:
+                self._upsert(conn, record)
+                count += 1
+        return count
+
+    def update_notes(self, assessment_id, notes):
+        """
+        Replace the indexed review notes of an assessment (e.g. after a review).
+        Returns:
+            bool: False if the assessment is not in the index.
+        """
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE assessment_text SET notes = ? WHERE rowid = (SELECT rowid FROM docs WHERE id = ?)",
+                (notes or '', assessment_id),
+            )
+            return cursor.rowcount > 0
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._write() as conn:
+            conn.execute("DELETE FROM assessment_text")
+            conn.execute("DELETE FROM docs")
+
+    def is_empty(self):
+        with self._read() as conn:
+            return conn.execute("SELECT 1 FROM docs LIMIT 1").fetchone() is None
+
+    def search(self, text, offset=0, limit=25, max_results=1000):
+        """
+        Find the assessments matching every term of text, newest first.
+        Args:
+            text (str): The user's search, e.g. 'revenue smith'.
+            offset (int): Number of matches to skip.
+            limit (int): Maximum number of IDs to return.
+            max_results (int): Matches counted at most; counting every match of a common
+                word in a large index would cost more than the search itself.
+        Returns:
+            tuple: (list of assessment IDs, number of matches (at most max_results + 1,
+            meaning "more than max_results"))
+        """
+        expression = match_expression(text)
+        if expression is None:
+            return [], 0
+        with self._read() as conn:
+            total = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT rowid FROM assessment_text WHERE assessment_text MATCH ? LIMIT ?)",
+                (expression, max_results + 1),
+            ).fetchone()[0]
+            # rowids grow with each newly indexed assessment, and FTS5 walks them in order
+            # without scoring every match
+            rows = conn.execute(
+                "SELECT docs.id FROM assessment_text JOIN docs ON docs.rowid = assessment_text.rowid "
+                "WHERE assessment_text MATCH ? ORDER BY assessment_text.rowid DESC LIMIT ? OFFSET ?",
+                (expression, limit, offset),
+            ).fetchall()
+        return [assessment_id for (assessment_id,) in rows], total
+
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Reusable SMTP connections for Flask-Mail.
+
+mail.send() opens a new SMTP connection (and TLS handshake and login) for every
+message. SMTPPool keeps connections opened with mail.connect() and hands them out
+again, so a batch of messages goes over one authenticated session and the next
+batch can reuse it while it is still warm.
+"""
+
+import logging
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def session_broken(error):
+    """
+    Return True if an error means the SMTP session itself is unusable, as opposed to one
+    message being refused (SMTP response errors leave the session usable).
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPPool:
+    """
+    A small per-process pool of open Flask-Mail connections.
+
+    Args:
+        mail (flask_mail.Mail): The configured Mail extension.
+        size (int): Maximum connections open at once in this process.
+        idle_timeout (float): Connections idle longer than this are closed rather than
+            reused (SMTP servers drop idle sessions after a few minutes).
+    """
+
+    def __init__(self, mail, size=2, idle_timeout=30.0):
+        self.mail = mail
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []  # (connection, returned_at)
+        self._pid = os.getpid()
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+    def _open(self):
+        connection = self.mail.connect()
+        connection.__enter__()
+        self.stats["opened"] += 1
+        return connection
+
+    def _close(self, connection):
+        try:
+            connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def _take_idle(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Sockets inherited across a fork belong to the parent
+                self._idle = []
+                self._pid = os.getpid()
+            while self._idle:
+                connection, returned_at = self._idle.pop()
+                if time.monotonic() - returned_at <= self.idle_timeout:
+                    self.stats["reused"] += 1
+                    return connection
+                self._close(connection)
+        return None
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection, opening one if none is idle.
+        It goes back to the pool afterwards, unless an error was raised while it was
+        in use, in which case it is closed since the session may be broken.
+        """
+        with self._slots:
+            connection = self._take_idle() or self._open()
+            try:
+                yield connection
+            except BaseException:
+                self.discard(connection)
+                raise
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+
+    def discard(self, connection):
+        """
+        Close a connection instead of returning it to the pool.
+        """
+        self.stats["discarded"] += 1
+        self._close(connection)
+
+    def reconnect(self, connection):
+        """
+        Replace a dropped connection's SMTP session in place.
+        """
+        self._close(connection)
+        connection.__enter__()
+        self.stats["opened"] += 1
+
+    def send_batch(self, messages):
+        """
+        Send messages over one pooled connection.
+        A connection the server dropped (e.g. after being idle) is reopened once per message.
+        Returns:
+            list: None for each message sent, or the exception that stopped it.
+        """
+        if not messages:
+            return []
+        results = []
+        try:
+            with self.connection() as connection:
+                for message in messages:
+                    try:
+                        try:
+                            connection.send(message)
+                        except smtplib.SMTPServerDisconnected:
+                            self.reconnect(connection)
+                            connection.send(message)
+                        results.append(None)
+                    except Exception as e:
+                        if session_broken(e):
+                            # Fail the rest of the batch too; they are retried later
+                            results.extend([e] * (len(messages) - len(results)))
+                            raise
+                        results.append(e)
+        except Exception as e:
+            if not results:
+                # Could not connect at all
+                return [e] * len(messages)
+            if len(results) < len(messages):
+                raise
+            logger.warning("SMTP session failed: %s", e)
+        return results
+
+    def close(self):
+        """
+        Close every idle connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
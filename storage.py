@@ -0,0 +1,1084 @@
+"""
+Storage backends for assessment records.
+
+Routes in app.py talk to an AssessmentStore instead of touching DATA_DIR directly.
+Two backends are provided:
+- JSONFileStore: one JSON file per assessment in DATA_DIR, in hashed shard directories
+- SQLiteStore: a single SQLite database in WAL mode, safe for multiple gunicorn workers
+
+Select the backend with the STORAGE_BACKEND setting ('json' or 'sqlite').
+
+Both backends store a submitted record once and journal later changes as small events
+(reviewed, edited, notified, updated; see append_event), which are folded into the
+stored record every JOURNAL_COMPACT_EVENTS events or by `manage.py compact`.
+"""
+
+import inspect
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+
+from lru import LRUCache
+from assessment_index import (
+    COUNTER_NAMES, EVENT_TYPES, JOURNAL_SUFFIX, SORT_ORDERS, AssessmentIndex, apply_event, apply_events, file_lock,
+    iter_data_files, journal_filename, parse_assessment_filename, pending_batch, read_journal, shard_filename,
+    summarize_record,
+)
+
+RECORDS_LOCK_FILENAME = '.assessment_records.lock'
+
+# Columns the dashboard may sort by (each order is listed in SORT_ORDERS)
+SORT_KEYS = tuple(SORT_ORDERS)
+
+# Current time in epoch seconds, as an SQLite expression
+SQLITE_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# Events journaled for a record before they are folded into its stored copy
+DEFAULT_COMPACT_EVENTS = 32
+
+# summarize_record fields, and the record key each is derived from
+SUMMARY_SOURCES = {'status': 'status', 'submitted_at': 'submitted_at', 'agency_name': 'agency_info',
+                   'notification_sent': 'notification_sent'}
+
+
+def new_event(event_type, changes):
+    """
+    Build a journal event.
+    Args:
+        event_type (str): One of assessment_index.EVENT_TYPES.
+        changes (dict): Fields merged into the record.
+    Returns:
+        dict: id, type, at (ISO timestamp) and changes.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type: {event_type}")
+    return {"id": uuid.uuid4().hex, "type": event_type, "at": datetime.now().isoformat(), "changes": changes}
+
+
+def page_cursor(record, sort):
+    """
+    Return a record's keyset cursor in a SORT_KEYS order: the values it is sorted by, then
+    its ID. Passed to query as after (or before), it selects the page following (or
+    preceding) the record, found by seeking to it instead of skipping offset records.
+    """
+    fields = dict(summarize_record(record), ticket_id=record.get('ticket_id'))
+    return tuple(fields[field] for field in SORT_ORDERS[sort]) + (record['id'],)
+
+
+def summary_changes(changes):
+    """
+    Return the summarize_record fields that applying changes would set.
+    """
+    summary = summarize_record(changes)
+    return {field: summary[field] for field, source in SUMMARY_SOURCES.items() if source in changes}
+
+
+class RecordCache:
+    """
+    Parsed records kept in memory by a store, each with the version tag it was read at
+    (see AssessmentStore.record_version). A record is served from the cache only while
+    its stored tag is unchanged, so a write by any worker invalidates it.
+    Cached records are shared between callers and must not be modified.
+
+    Args:
+        max_entries (int): Most records kept; 0 disables the cache.
+        max_bytes (int): Most stored bytes (of the records' JSON) kept.
+        observe (callable): observe(result, count) is called with 'hit', 'miss' or 'eviction'.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=32 * 1024 * 1024, observe=None):
+        self.lru = LRUCache(max_entries, max_bytes, sizeof=lambda entry: entry[2])
+        self.observe = observe or (lambda result, count: None)
+
+    def get(self, key, tag, size, load):
+        """
+        Return the record cached under key at this tag, or load() it and cache it.
+        Args:
+            key: The record's cache key (its path, or its ID).
+            tag (str): The record's current version tag, read before load() is called.
+            size (int): Bytes the record takes in storage.
+            load (callable): Reads and parses the record; returns None if there is none.
+        """
+        entry = self.lru.get(key)
+        if entry is not None and entry[0] == tag:
+            self.observe('hit', 1)
+            return entry[1]
+        self.observe('miss', 1)
+        record = load()
+        if record is not None:
+            evictions = self.lru.stats()['evictions']
+            self.lru.put(key, (tag, record, size))
+            evicted = self.lru.stats()['evictions'] - evictions
+            if evicted:
+                self.observe('eviction', evicted)
+        return record
+
+
+class AssessmentStore:
+    """
+    Interface implemented by every storage backend.
+    Records are plain dicts with at least 'id', 'ticket_id', 'status' and 'submitted_at'.
+    With a record_cache (RecordCache), lookups and query pages reuse parsed records.
+    """
+
+    record_cache = None
+
+    def save(self, record):
+        """Persist a new assessment record."""
+        raise NotImplementedError
+
+    def save_many(self, records, replace=False):
+        """
+        Persist many new records as one batch.
+        Args:
+            records (iterable): Records to save.
+            replace (bool): Overwrite existing IDs instead of skipping them.
+        Returns:
+            int: Number of records written.
+        """
+        raise NotImplementedError
+
+    def get(self, assessment_id):
+        """Return the record with the given assessment ID, or None."""
+        raise NotImplementedError
+
+    def get_by_ticket(self, ticket_id):
+        """Return the record with the given ticket ID, or None."""
+        raise NotImplementedError
+
+    def update(self, assessment_id, changes):
+        """
+        Atomically merge changes into a stored record (an 'updated' event).
+        Returns:
+            bool: True if the record existed and was updated.
+        """
+        return self.append_event(assessment_id, 'updated', changes)
+
+    def append_event(self, assessment_id, event_type, changes):
+        """
+        Journal a change to a stored record. Reads see the changes merged into the record;
+        'reviewed' and 'edited' events also add an entry to its review_history.
+        Args:
+            assessment_id (str): The record to change.
+            event_type (str): One of assessment_index.EVENT_TYPES.
+            changes (dict): Fields merged into the record.
+        Returns:
+            bool: True if the record existed and the event was recorded.
+        """
+        raise NotImplementedError
+
+    def compact(self):
+        """
+        Fold every journaled event into the stored records.
+        Returns:
+            int: Number of records compacted.
+        """
+        raise NotImplementedError
+
+    def iter_records(self):
+        """Yield every stored record, in no particular order."""
+        raise NotImplementedError
+
+    def record_version(self, assessment_id):
+        """
+        Identify the current version of a record without reading it.
+        Returns:
+            tuple: (tag (str) that changes whenever the record does, last modified (epoch seconds)),
+            or None if there is no such record.
+        """
+        raise NotImplementedError
+
+    def record_version_by_ticket(self, ticket_id):
+        """Like record_version, looked up by ticket ID."""
+        raise NotImplementedError
+
+    def generation(self):
+        """
+        Identify the current state of the whole store.
+        Returns:
+            tuple: (tag (str) that changes whenever any record is saved or updated,
+            last modified (epoch seconds))
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """Return the number of stored records."""
+        return sum(1 for _ in self.iter_records())
+
+    def counters(self):
+        """
+        Return the materialized dashboard counters, keyed by assessment_index.COUNTER_NAMES.
+        Backends keep these up to date on every save and update, so reading them is O(1).
+        """
+        raise NotImplementedError
+
+    def query(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None,
+              sort='submitted_at', descending=True, offset=0, limit=25, after=None, before=None, max_count=None):
+        """
+        Return one page of records matching the filters, read through the backend's index.
+        Records are sorted by the SORT_ORDERS fields of sort, then by ID.
+        Args:
+            status (str): Only records with this status.
+            agency (str): Only records whose agency name starts with this text (case-insensitive).
+            date_from (str): Only records submitted at or after this ISO timestamp.
+            date_until (str): Only records submitted before this ISO timestamp.
+            notification_sent (bool): Only records whose agency notification has (or has not) been sent.
+            sort (str): One of SORT_KEYS.
+            descending (bool): Sort direction.
+            offset (int): Number of matching records to skip (without a cursor).
+            limit (int): Maximum number of records to return.
+            after (tuple): page_cursor of the record just before the page (the last of the previous one).
+            before (tuple): page_cursor of the record just after the page (the first of the next one).
+            max_count (int): Count at most this many matches of a filtered listing (an unfiltered
+                one is counted exactly); None counts them all.
+        Returns:
+            tuple: (list of records on the page, total number of matching records (at most
+            max_count + 1, meaning "more than max_count", for a filtered listing when max_count is given))
+        """
+        raise NotImplementedError
+
+    def iter_matching(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None):
+        """
+        Yield every record matching the filters (as for query), oldest submission first.
+        Records are read as they are consumed rather than collected first, so a scan over
+        the whole store runs in constant memory.
+        """
+        raise NotImplementedError
+
+
+class JSONFileStore(AssessmentStore):
+    """
+    One '{ticket_id}_{id}.json' file per assessment, located through an AssessmentIndex.
+    New files go in the record's shard directory (assessment_index.shard_filename), or
+    directly in data_dir when sharded is False; files in either layout are read.
+    Changes are appended to the record's '{ticket_id}_{id}.events.jsonl' journal, and
+    compaction rewrites the file with them applied (to a temporary file that is renamed
+    into place). Writes hold a cross-process lock so workers cannot interleave them.
+    """
+
+    def __init__(self, data_dir, compact_after=DEFAULT_COMPACT_EVENTS, sharded=True, record_cache=None):
+        self.data_dir = data_dir
+        self.compact_after = compact_after
+        self.sharded = sharded
+        self.record_cache = record_cache
+        os.makedirs(data_dir, exist_ok=True)
+        self.lock_path = os.path.join(data_dir, RECORDS_LOCK_FILENAME)
+        self.index = AssessmentIndex(data_dir)
+        self.index.rebuild()
+
+    def _write(self, path, record):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _read(self, path):
+        if not path:
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _journal_path(path):
+        return path[:-len('.json')] + JOURNAL_SUFFIX
+
+    def _load(self, path):
+        """
+        Read a record and replay its journal over it.
+        """
+        if not path:
+            return None
+        # The journal is read first: a compaction in between leaves a snapshot that
+        # already includes (and skips) the events read, never one missing them
+        events = read_journal(self._journal_path(path))
+        record = self._read(path)
+        return apply_events(record, events) if record is not None else None
+
+    def _cached_load(self, path):
+        """
+        Like _load, through the record cache: a hit costs two stats instead of reads and parsing.
+        """
+        if self.record_cache is None or not path:
+            return self._load(path)
+        version = self._file_version(path)
+        if version is None:
+            return None
+        tag, _, size = version
+        return self.record_cache.get(path, tag, size, lambda: self._load(path))
+
+    def _record_filename(self, record):
+        if self.sharded:
+            return shard_filename(record['ticket_id'], record['id'])
+        return f"{record['ticket_id']}_{record['id']}.json"
+
+    def _write_record(self, record):
+        """
+        Write a record's file and return its filename (relative to data_dir).
+        """
+        filename = self._record_filename(record)
+        path = os.path.join(self.data_dir, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write(path, record)
+        try:
+            os.remove(self._journal_path(path))  # Left by a record saved over
+        except FileNotFoundError:
+            pass
+        return filename
+
+    def save(self, record):
+        filename = self._write_record(record)
+        self.index.add(record['id'], record['ticket_id'], filename, summarize_record(record))
+
+    def save_many(self, records, replace=False):
+        # The index append that lists the whole batch is its commit: the batch becomes visible
+        # to lookups and listings at once, and new files written before it are named in a
+        # pending_batch marker, so a rebuild after a crash removes them instead of indexing them
+        batch = []
+        seen = set()
+        for record in records:
+            if record['id'] in seen or (not replace and self.index.path_for_id(record['id'])):
+                continue
+            seen.add(record['id'])
+            batch.append(record)
+        new_files = [(record['id'], self._record_filename(record)) for record in batch
+                     if not self.index.path_for_id(record['id'])]
+        if not batch:
+            return 0
+        with pending_batch(self.data_dir, new_files):
+            entries = [(record['id'], record['ticket_id'], self._write_record(record), summarize_record(record))
+                       for record in batch]
+            self.index.add_many(entries)
+        return len(entries)
+
+    def _located(self, find, key, read):
+        """
+        Look a record up through the index and read it with read(path). If the file is
+        gone, it may have been moved into its shard by another process (see shard_files),
+        so the index is brought up to date and the lookup tried once more.
+        """
+        path = find(key)
+        result = read(path)
+        if result is None and path:
+            self.index.refresh()
+            moved = find(key)
+            if moved != path:
+                result = read(moved)
+        return result
+
+    def get(self, assessment_id):
+        return self._located(self.index.path_for_id, assessment_id, self._cached_load)
+
+    def get_by_ticket(self, ticket_id):
+        return self._located(self.index.path_for_ticket, ticket_id, self._cached_load)
+
+    def append_event(self, assessment_id, event_type, changes):
+        event = new_event(event_type, changes)
+        with file_lock(self.lock_path):
+            path = self._located(self.index.path_for_id, assessment_id,
+                                 lambda path: path if path and os.path.exists(path) else None)
+            if path is None:
+                return False
+            journal_path = self._journal_path(path)
+            with open(journal_path, 'ab') as f:
+                f.write(json.dumps(event).encode() + b'\n')
+            # Appended even when no summary field changed, since it also moves the generation
+            self.index.update(assessment_id, summary_changes(changes))
+            if len(read_journal(journal_path)) >= self.compact_after:
+                self._compact(path)
+        return True
+
+    def _compact(self, path):
+        """
+        Rewrite a record with its journal applied and remove the journal. Call with the lock held.
+        The snapshot records the last event it includes, so if the journal outlives it
+        (a crash before the removal) those events are not applied twice.
+        """
+        journal_path = self._journal_path(path)
+        events = read_journal(journal_path)
+        record = self._read(path)
+        if not events or record is None:
+            return False
+        apply_events(record, events)
+        record['compacted_through'] = events[-1]['id']
+        self._write(path, record)
+        os.remove(journal_path)
+        return True
+
+    def compact(self):
+        # The directory is listed without the lock, which is then taken per record, so writes
+        # by the app only ever wait for one record's compaction. A journal created after the
+        # listing is compacted by its own appends (or the next run).
+        compacted = 0
+        journals = [filename for filename, _ in iter_data_files(self.data_dir) if filename.endswith(JOURNAL_SUFFIX)]
+        for filename in journals:
+            record_filename = filename[:-len(JOURNAL_SUFFIX)] + '.json'
+            with file_lock(self.lock_path):
+                if self._compact(os.path.join(self.data_dir, record_filename)):
+                    compacted += 1
+        return compacted
+
+    def shard_files(self):
+        """
+        Move the record files (and journals) still in the flat layout into their shard
+        directories, while the app keeps serving: each file is linked into its shard, the
+        index is pointed at it, and only then is the old name removed, so every lookup
+        finds the record under one name or the other.
+        Returns:
+            int: Number of records moved.
+        """
+        moved = 0
+        with os.scandir(self.data_dir) as it:
+            flat = [dir_entry.name for dir_entry in it
+                    if parse_assessment_filename(dir_entry.name) and dir_entry.is_file()]
+        for filename in flat:
+            ticket_id, assessment_id = parse_assessment_filename(filename)
+            target = shard_filename(ticket_id, assessment_id)
+            os.makedirs(os.path.dirname(os.path.join(self.data_dir, target)), exist_ok=True)
+            moves = [(filename, target), (journal_filename(filename), journal_filename(target))]
+            # Holding the records lock keeps journal appends and compaction out meanwhile
+            with file_lock(self.lock_path):
+                if not os.path.exists(os.path.join(self.data_dir, filename)):
+                    continue
+                for source, destination in moves:
+                    _link(os.path.join(self.data_dir, source), os.path.join(self.data_dir, destination))
+                self.index.update(assessment_id, {"file": target})
+                for source, _ in moves:
+                    try:
+                        os.remove(os.path.join(self.data_dir, source))
+                    except FileNotFoundError:
+                        pass
+            moved += 1
+        return moved
+
+    @staticmethod
+    def _stat_version(path):
+        if not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # Files are replaced on every write, so the inode changes too
+        return f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_mtime, stat.st_size
+
+    def _file_version(self, path):
+        """
+        Return (tag, last modified, bytes) of a record file and its journal, or None.
+        """
+        version = self._stat_version(path)
+        journal = self._stat_version(self._journal_path(path)) if version else None
+        if journal is None:
+            return version
+        # Appends change the journal's size and mtime
+        return f"{version[0]}-{journal[0]}", max(version[1], journal[1]), version[2] + journal[2]
+
+    def _version(self, path):
+        version = self._file_version(path)
+        return version[:2] if version else None
+
+    def record_version(self, assessment_id):
+        return self._located(self.index.path_for_id, assessment_id, self._version)
+
+    def record_version_by_ticket(self, ticket_id):
+        return self._located(self.index.path_for_ticket, ticket_id, self._version)
+
+    def generation(self):
+        return self.index.generation()
+
+    def count(self):
+        return self.index.counters()['total']
+
+    def counters(self):
+        return self.index.counters()
+
+    def iter_records(self):
+        files = [(filename, dir_entry.name) for filename, dir_entry in iter_data_files(self.data_dir)]
+        journals = {filename for filename, _ in files if filename.endswith(JOURNAL_SUFFIX)}
+        for filename, name in files:
+            if not parse_assessment_filename(name):
+                continue
+            path = os.path.join(self.data_dir, filename)
+            try:
+                # Only records with a journal pay for reading one
+                record = self._load(path) if journal_filename(filename) in journals else self._read(path)
+            except ValueError:
+                continue
+            if record is not None:
+                yield record
+
+    def query(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None,
+              sort='submitted_at', descending=True, offset=0, limit=25, after=None, before=None, max_count=None):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        entries, total = self.index.select(status, agency, date_from, date_until, notification_sent, sort,
+                                           descending, after, before, offset, limit, max_count)
+        page = []
+        for entry in entries:
+            record = self._cached_load(os.path.join(self.data_dir, entry['file']))
+            if record is not None:
+                page.append(record)
+        return page, total
+
+    def iter_matching(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None,
+                      batch_size=500):
+        # Index entries are taken a batch at a time after the last one read, and each file is
+        # read when its turn comes, bypassing the record cache so a long scan does not evict
+        # the pages in use
+        after = None
+        while True:
+            entries, _ = self.index.select(status, agency, date_from, date_until, notification_sent,
+                                           descending=False, after=after, limit=batch_size, max_count=0)
+            for entry in entries:
+                record = self._located(self.index.path_for_id, entry['id'], self._load)
+                if record is not None:
+                    yield record
+            if len(entries) < batch_size:
+                return
+            after = (entries[-1]['submitted_at'], entries[-1]['id'])
+
+
+def _link(source, destination):
+    """
+    Give an existing file a second name (a copy where hard links are not supported).
+    A missing source is skipped.
+    """
+    try:
+        os.link(source, destination)
+    except FileNotFoundError:
+        pass
+    except FileExistsError:
+        os.replace(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+class _Lease:
+    """
+    Holds a thread's SQLite connection in its thread-local storage and hands the connection
+    back to the store when the thread (or greenlet) ends and the thread-local is discarded.
+    """
+
+    def __init__(self, conn, release):
+        weakref.finalize(self, release, conn, os.getpid())
+
+
+class SQLiteStore(AssessmentStore):
+    """
+    Assessments stored in SQLite with write-ahead logging, so readers never block the
+    writer. Indexed columns are kept alongside the full JSON record for querying.
+    Changes are rows in the events table (plus an update of the indexed columns), folded
+    into the JSON record on compaction.
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS assessments (
+            id TEXT PRIMARY KEY,
+            ticket_id TEXT,
+            status TEXT NOT NULL,
+            submitted_at TEXT NOT NULL,
+            record TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            assessment_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            at TEXT NOT NULL,
+            changes TEXT NOT NULL
+        )""",
+        "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        # Single row bumped by triggers on every write, for cache validation
+        "CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL, updated_at REAL NOT NULL)",
+    )
+
+    # Columns added after the first release, with the expression used to backfill them
+    ADDED_COLUMNS = {
+        'agency_name': ("TEXT NOT NULL DEFAULT ''", "COALESCE(json_extract(record, '$.agency_info.agency_name'), '')"),
+        'notification_sent': ("INTEGER NOT NULL DEFAULT 0", "COALESCE(json_extract(record, '$.notification_sent'), 0)"),
+        'version': ("INTEGER NOT NULL DEFAULT 1", "1"),
+        'updated_at': ("REAL NOT NULL DEFAULT 0", SQLITE_NOW),
+    }
+
+    # One index per SORT_ORDERS order, on its columns then id, so a page is read in index
+    # order from the start or from a keyset cursor, and filters on the leading column seek
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_assessments_submitted_at_id ON assessments (submitted_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_assessments_ticket_id_id ON assessments (ticket_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_assessments_agency_name_submitted_at_id "
+        "ON assessments (agency_name COLLATE NOCASE, submitted_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_assessments_status_submitted_at_id ON assessments (status, submitted_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_events_assessment_id ON events (assessment_id)",
+    )
+
+    # Indexes of earlier releases, each a prefix of one of INDEXES
+    DROPPED_INDEXES = ('idx_assessments_ticket_id', 'idx_assessments_status', 'idx_assessments_status_submitted_at',
+                       'idx_assessments_submitted_at', 'idx_assessments_agency_name')
+
+    # SQL equivalent of assessment_index.counter_bucket for the OLD/NEW row in a trigger
+    BUCKET_SQL = (
+        "CASE WHEN {row}.status = 'pending' THEN 'pending'"
+        " WHEN {row}.notification_sent = 0 THEN 'reviewed_awaiting'"
+        " WHEN {row}.status = 'approved' THEN 'approved_notified'"
+        " WHEN {row}.status = 'overridden' THEN 'overridden_notified' END"
+    )
+
+    # Keep the counters table in step with every insert, delete and workflow change
+    TRIGGERS = (
+        f"""CREATE TRIGGER IF NOT EXISTS trg_assessments_count_insert AFTER INSERT ON assessments BEGIN
+            UPDATE counters SET value = value + 1 WHERE name IN ('total', {BUCKET_SQL.format(row='NEW')});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_assessments_count_delete AFTER DELETE ON assessments BEGIN
+            UPDATE counters SET value = value - 1 WHERE name IN ('total', {BUCKET_SQL.format(row='OLD')});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_assessments_count_update AFTER UPDATE OF status, notification_sent ON assessments BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = {BUCKET_SQL.format(row='OLD')};
+            UPDATE counters SET value = value + 1 WHERE name = {BUCKET_SQL.format(row='NEW')};
+        END""",
+        # A record saved over (INSERT OR REPLACE) starts without the old one's events
+        """CREATE TRIGGER IF NOT EXISTS trg_assessments_events_delete AFTER DELETE ON assessments BEGIN
+            DELETE FROM events WHERE assessment_id = OLD.id;
+        END""",
+    ) + tuple(
+        f"""CREATE TRIGGER IF NOT EXISTS trg_assessments_generation_{event.lower()} AFTER {event} ON assessments BEGIN
+            UPDATE generation SET value = value + 1, updated_at = {SQLITE_NOW} WHERE id = 1;
+        END"""
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    )
+
+    # Connections kept open for reuse once the thread or greenlet that used them ends
+    MAX_IDLE_CONNECTIONS = 32
+
+    # Written on every save ('version' starts at 1 and is incremented by every event)
+    COLUMNS = ('id', 'ticket_id', 'status', 'submitted_at', 'agency_name', 'notification_sent', 'updated_at', 'record')
+
+    # Selects a record with its journaled events ([seq, type, at, changes] each), in one
+    # statement so a concurrent compaction cannot be seen half done
+    RECORD_SQL = ("record, (SELECT json_group_array(json_array(seq, type, at, json(changes))) "
+                  "FROM events WHERE events.assessment_id = assessments.id)")
+
+    def __init__(self, db_path, busy_timeout_ms=5000, compact_after=DEFAULT_COMPACT_EVENTS, record_cache=None):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.compact_after = compact_after
+        self.record_cache = record_cache
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._idle = []  # connections released by finished threads/greenlets
+        self._idle_pid = os.getpid()
+        self._migrate_schema()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a block inside a write transaction on this thread's connection.
+        The write lock is taken up front so concurrent writers queue instead of deadlocking.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _migrate_schema(self):
+        """
+        Create the tables, add any columns missing from older databases, build the
+        indexes and seed the dashboard counters. Runs in one transaction so workers
+        starting at the same time do not race each other.
+        """
+        with self._transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(assessments)")}
+            for column, (definition, backfill) in self.ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE assessments ADD COLUMN {column} {definition}")
+                    conn.execute(f"UPDATE assessments SET {column} = {backfill}")
+            for statement in self.INDEXES + self.TRIGGERS:
+                conn.execute(statement)
+            for index in self.DROPPED_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+            conn.execute(f"INSERT OR IGNORE INTO generation (id, value, updated_at) VALUES (1, 0, {SQLITE_NOW})")
+            if conn.execute("SELECT COUNT(*) FROM counters").fetchone()[0] == 0:
+                conn.executemany("INSERT INTO counters (name, value) VALUES (?, 0)", ((name,) for name in COUNTER_NAMES))
+                conn.execute("UPDATE counters SET value = (SELECT COUNT(*) FROM assessments) WHERE name = 'total'")
+                conn.execute(
+                    f"UPDATE counters SET value = (SELECT COUNT(*) FROM assessments "
+                    f"WHERE {self.BUCKET_SQL.format(row='assessments')} = counters.name) WHERE name != 'total'"
+                )
+
+    def _connection(self):
+        """
+        Return this thread's connection, opening a new one after a fork.
+        Under gevent, thread-locals are per greenlet, i.e. per request. A finished thread's
+        or greenlet's connection is therefore kept for reuse rather than closed, since
+        opening one (and parsing the schema) costs far more than a query.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._reuse_idle() or self._open()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            # Collected along with the thread-local when the thread or greenlet ends
+            self._local.lease = _Lease(conn, self._release)
+        return conn
+
+    def _open(self):
+        # Connections move between threads through the idle list, never in use by two at once
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        # INSERT OR REPLACE must fire the delete trigger so counters stay correct
+        conn.execute("PRAGMA recursive_triggers=ON")
+        return conn
+
+    def _reuse_idle(self):
+        if self._idle_pid != os.getpid():
+            # Connections inherited across a fork belong to the parent
+            self._idle, self._idle_pid = [], os.getpid()
+        try:
+            return self._idle.pop()
+        except IndexError:
+            return None
+
+    def _release(self, conn, pid):
+        if pid != os.getpid() or conn.in_transaction or len(self._idle) >= self.MAX_IDLE_CONNECTIONS:
+            conn.close()
+        else:
+            self._idle.append(conn)
+
+    @staticmethod
+    def _row_values(record):
+        summary = summarize_record(record)
+        return (
+            record['id'],
+            record.get('ticket_id'),
+            summary['status'],
+            summary['submitted_at'],
+            summary['agency_name'],
+            int(summary['notification_sent']),
+            time.time(),
+            json.dumps(record),
+        )
+
+    def _insert_sql(self, verb="INSERT"):
+        placeholders = ', '.join('?' for _ in self.COLUMNS)
+        return f"{verb} INTO assessments ({', '.join(self.COLUMNS)}) VALUES ({placeholders})"
+
+    def save(self, record):
+        self._connection().execute(self._insert_sql(), self._row_values(record))
+
+    def save_many(self, records, replace=False):
+        """
+        Insert many records in a single transaction.
+        Args:
+            records (iterable): Records to insert.
+            replace (bool): Overwrite existing IDs instead of skipping them.
+        Returns:
+            int: Number of rows written.
+        """
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._transaction() as conn:
+            cursor = conn.executemany(self._insert_sql(verb), (self._row_values(r) for r in records))
+        return cursor.rowcount
+
+    @staticmethod
+    def _materialize(record, events):
+        record = json.loads(record)
+        if events != '[]':
+            for _, event_type, at, changes in sorted(json.loads(events)):
+                apply_event(record, {"type": event_type, "at": at, "changes": changes})
+        return record
+
+    def _cached_materialize(self, assessment_id, version, updated_at, record, events):
+        """
+        Like _materialize, through the record cache (keyed by ID and tagged like record_version).
+        """
+        if self.record_cache is None:
+            return self._materialize(record, events)
+        return self.record_cache.get(assessment_id, f"{version}-{updated_at!r}", len(record) + len(events),
+                                     lambda: self._materialize(record, events))
+
+    def _fetch_one(self, where, value):
+        row = self._connection().execute(
+            f"SELECT id, version, updated_at, {self.RECORD_SQL} FROM assessments WHERE {where} = ?", (value,)).fetchone()
+        return self._cached_materialize(*row) if row else None
+
+    def get(self, assessment_id):
+        return self._fetch_one('id', assessment_id)
+
+    def get_by_ticket(self, ticket_id):
+        return self._fetch_one('ticket_id', ticket_id)
+
+    def append_event(self, assessment_id, event_type, changes):
+        event = new_event(event_type, changes)
+        summary = summary_changes(changes)
+        if 'notification_sent' in summary:
+            summary['notification_sent'] = int(summary['notification_sent'])
+        assignments = ''.join(f"{column} = ?, " for column in summary)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE assessments SET {assignments}version = version + 1, updated_at = ? WHERE id = ?",
+                tuple(summary.values()) + (time.time(), assessment_id),
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute(
+                "INSERT INTO events (assessment_id, type, at, changes) VALUES (?, ?, ?, ?)",
+                (assessment_id, event['type'], event['at'], json.dumps(changes)),
+            )
+            pending = conn.execute("SELECT COUNT(*) FROM events WHERE assessment_id = ?", (assessment_id,)).fetchone()[0]
+            if pending >= self.compact_after:
+                self._compact(conn, [assessment_id])
+        return True
+
+    def _compact(self, conn, assessment_ids):
+        """
+        Fold the events of the given records into their JSON. Call inside a transaction.
+        """
+        for assessment_id in assessment_ids:
+            row = conn.execute(f"SELECT {self.RECORD_SQL} FROM assessments WHERE id = ?", (assessment_id,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE assessments SET record = ? WHERE id = ?",
+                             (json.dumps(self._materialize(*row)), assessment_id))
+            conn.execute("DELETE FROM events WHERE assessment_id = ?", (assessment_id,))
+
+    # Records compacted per write transaction by compact(), so app writes wait for one batch at most
+    COMPACT_BATCH = 256
+
+    def compact(self):
+        assessment_ids = [row[0] for row in self._connection().execute("SELECT DISTINCT assessment_id FROM events")]
+        for start in range(0, len(assessment_ids), self.COMPACT_BATCH):
+            with self._transaction() as conn:
+                self._compact(conn, assessment_ids[start:start + self.COMPACT_BATCH])
+        return len(assessment_ids)
+
+    def iter_records(self):
+        cursor = self._connection().execute(f"SELECT {self.RECORD_SQL} FROM assessments")
+        for record, events in cursor:
+            yield self._materialize(record, events)
+
+    def _version(self, where, value):
+        row = self._connection().execute(
+            f"SELECT version, updated_at FROM assessments WHERE {where} = ?", (value,)).fetchone()
+        return (f"{row[0]}-{row[1]!r}", row[1]) if row else None
+
+    def record_version(self, assessment_id):
+        return self._version('id', assessment_id)
+
+    def record_version_by_ticket(self, ticket_id):
+        return self._version('ticket_id', ticket_id)
+
+    def generation(self):
+        value, updated_at = self._connection().execute("SELECT value, updated_at FROM generation WHERE id = 1").fetchone()
+        return str(value), updated_at
+
+    def count(self):
+        return self.counters()['total']
+
+    def counters(self):
+        counters = dict.fromkeys(COUNTER_NAMES, 0)
+        counters.update(self._connection().execute("SELECT name, value FROM counters"))
+        return counters
+
+    def query(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None,
+              sort='submitted_at', descending=True, offset=0, limit=25, after=None, before=None, max_count=None):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        clauses, params = self._filters(status, agency, date_from, date_until, notification_sent)
+        columns = SORT_ORDERS[sort] + ('id',)
+        cursor = after if after is not None else before
+        # Read forwards for an ascending listing, backwards for a descending one, and
+        # against the listing's direction for the page before a cursor
+        ascending = descending == (before is not None)
+        where_clauses, where_params = list(clauses), list(params)
+        if cursor is not None:
+            # A row value seeks along the (sort columns, id) index; the collation on the right
+            # side makes agency names compare as the index orders them
+            values = ', '.join('? COLLATE NOCASE' if column == 'agency_name' else '?' for column in columns)
+            where_clauses.append(f"({', '.join(columns)}) {'>' if ascending else '<'} ({values})")
+            where_params += list(cursor)
+            offset = 0
+        where = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+        direction = "ASC" if ascending else "DESC"
+        order = ', '.join(f"{column}{' COLLATE NOCASE' if column == 'agency_name' else ''} {direction}"
+                          for column in columns)
+
+        conn = self._connection()
+        rows = conn.execute(
+            f"SELECT id, version, updated_at, {self.RECORD_SQL} FROM assessments {where} "
+            f"ORDER BY {order} LIMIT ? OFFSET ?",
+            where_params + [limit, offset],
+        )
+        page = [self._cached_materialize(*row) for row in rows]
+        if before is not None:
+            page.reverse()
+
+        if not clauses:
+            total = self.counters()['total']
+        elif max_count is None:
+            total = conn.execute(f"SELECT COUNT(*) FROM assessments WHERE {' AND '.join(clauses)}", params).fetchone()[0]
+        else:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM assessments WHERE {' AND '.join(clauses)} LIMIT ?)",
+                params + [max_count + 1],
+            ).fetchone()[0]
+        return page, total
+
+    @staticmethod
+    def _filters(status, agency, date_from, date_until, notification_sent):
+        """
+        Return the WHERE clauses and parameters for query's filters.
+        """
+        clauses = []
+        params = []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if agency:
+            # Prefix match so the NOCASE index on agency_name can be used
+            escaped = agency.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("agency_name LIKE ? ESCAPE '\\'")
+            params.append(escaped + '%')
+        if date_from is not None:
+            clauses.append("submitted_at >= ?")
+            params.append(date_from)
+        if date_until is not None:
+            clauses.append("submitted_at < ?")
+            params.append(date_until)
+        if notification_sent is not None:
+            clauses.append("notification_sent = ?")
+            params.append(int(notification_sent))
+        return clauses, params
+
+    def iter_matching(self, status=None, agency=None, date_from=None, date_until=None, notification_sent=None,
+                      batch_size=500):
+        # Read in keyset-paginated batches: no read transaction stays open for the whole
+        # scan (which would hold back WAL checkpoints), and each batch seeks the
+        # submitted_at index instead of skipping OFFSET rows
+        clauses, params = self._filters(status, agency, date_from, date_until, notification_sent)
+        after = None
+        while True:
+            where = list(clauses)
+            where_params = list(params)
+            if after is not None:
+                where.append("submitted_at >= ? AND (submitted_at, id) > (?, ?)")
+                where_params += [after[0], after[0], after[1]]
+            sql_where = f"WHERE {' AND '.join(where)}" if where else ""
+            rows = self._connection().execute(
+                f"SELECT submitted_at, id, {self.RECORD_SQL} FROM assessments {sql_where} "
+                f"ORDER BY submitted_at, id LIMIT ?",
+                where_params + [batch_size],
+            ).fetchall()
+            for _, _, record, events in rows:
+                yield self._materialize(record, events)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][:2]
+
+
+class TimedStore:
+    """
+    Wraps a store and reports the duration of every call, e.g. to a metrics histogram.
+    Scans (iter_records) are timed from the call until the last record has been read.
+
+    Args:
+        store (AssessmentStore): The backend to wrap.
+        observe (callable): observe(operation, seconds, records) is called after each call,
+            where records is the number of records read (None for calls that read none).
+    """
+
+    def __init__(self, store, observe):
+        self.store = store
+        self.observe = observe
+
+    def __getattr__(self, name):
+        attribute = getattr(self.store, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = attribute(*args, **kwargs)
+            if inspect.isgenerator(result):
+                return self._timed_scan(name, result, start)
+            self.observe(name, time.perf_counter() - start, _records_read(name, result))
+            return result
+        return timed
+
+    def _timed_scan(self, name, records, start):
+        count = 0
+        try:
+            for record in records:
+                count += 1
+                yield record
+        finally:
+            self.observe(name, time.perf_counter() - start, count)
+
+
+def _records_read(operation, result):
+    if operation in ('get', 'get_by_ticket'):
+        return int(result is not None)
+    if operation == 'query':
+        return len(result[0])
+    return None
+
+
+def open_store(config, record_cache=None):
+    """
+    Create the storage backend selected by the application configuration.
+    Args:
+        config (Mapping): Flask config (or any mapping) with STORAGE_BACKEND, DATA_DIR, DATA_LAYOUT,
+            SQLITE_PATH and JOURNAL_COMPACT_EVENTS.
+        record_cache (RecordCache): Cache of parsed records for the store to use, if any.
+    Returns:
+        AssessmentStore: The configured backend.
+    """
+    backend = config.get('STORAGE_BACKEND', 'json')
+    compact_after = config.get('JOURNAL_COMPACT_EVENTS', DEFAULT_COMPACT_EVENTS)
+    if backend == 'json':
+        return JSONFileStore(config['DATA_DIR'], compact_after=compact_after,
+                             sharded=config.get('DATA_LAYOUT', 'sharded') == 'sharded', record_cache=record_cache)
+    if backend == 'sqlite':
+        return SQLiteStore(config.get('SQLITE_PATH') or os.path.join(config['DATA_DIR'], 'assessments.db'),
+                           compact_after=compact_after, record_cache=record_cache)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def migrate_json_to_sqlite(data_dir, db_path, batch_size=1000):
+    """
+    Import the per-file JSON assessments in data_dir into a SQLite database.
+    Records that already exist in the database are left untouched, so the
+    migration can be re-run safely.
+    Returns:
+        tuple: (records read, records imported)
+    """
+    source = JSONFileStore(data_dir)
+    target = SQLiteStore(db_path)
+    read = imported = 0
+    batch = []
+    for record in source.iter_records():
+        if 'id' not in record:
+            continue
+        batch.append(record)
+        read += 1
+        if len(batch) >= batch_size:
+            imported += target.save_many(batch)
+            batch = []
+    if batch:
+        imported += target.save_many(batch)
+    return read, imported
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for structured answer storage and the migration of text answers.
+"""
+
+import json
+
+import pytest
+
+import answer_format
+import scoring
+from storage import JSONFileStore, SQLiteStore
+from test_system import build_test_assessment
+
+ANSWERS = {key: options[-1] for key, options in scoring.ANSWER_OPTIONS}
+
+
+def test_answers_round_trip_as_enum_codes():
+    codes = answer_format.encode_answers(ANSWERS)
+
+    assert codes['ops_expertise'] == 2 and codes['compliance'] == 1
+    assert answer_format.decode_answers(codes) == ANSWERS
+    with pytest.raises(ValueError):
+        answer_format.encode_answers(dict(ANSWERS, latency='extreme'))
+
+
+def test_legacy_text_is_parsed_keeping_its_results():
+    data = answer_format.parse_legacy(build_test_assessment()['assessment_data'])
+
+    assert answer_format.is_structured(data)
+    assert answer_format.decode_answers(data['answers'])['fault_tolerance'] == 'high'
+    assert answer_format.decode_answers(data['answers'])['no_hardware_deps'] == 'yes'
+    assert data['recommendation'] == 'aws' and data['app_age'] == 'modern'
+    assert data['scores'] == {'aws': 15, 'on_prem_cloud': 8, 'physical': 4}
+    assert len(data['explanations']) == 3
+    with pytest.raises(ValueError):
+        answer_format.parse_legacy({'recommendation': 'AWS', 'answers': 'Fault Tolerance: High'})
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_migrate_store_rewrites_legacy_records(backend, tmp_path):
+    store = JSONFileStore(str(tmp_path)) if backend == 'json' else SQLiteStore(str(tmp_path / 'assessments.db'))
+    legacy = dict(build_test_assessment(), ticket_id='AAA00001')
+    # As the results page posted it: the text, again in results_data, and as HTML
+    text = legacy['assessment_data']
+    legacy['assessment_data'] = dict(text, results_data=dict(
+        {f"{name}_text": text[name] for name in ('scores', 'explanations', 'answers')},
+        **{f"{name}_html": text[name].replace('\n', '<br>') for name in ('scores', 'explanations', 'answers')}))
+    broken = dict(build_test_assessment(), ticket_id='AAA00002', assessment_data={'answers': 'unreadable'})
+    store.save_many([legacy, broken])
+    before = len(json.dumps(store.get(legacy['id'])['assessment_data']))
+
+    migrated, skipped = answer_format.migrate_store(store, dry_run=True)
+    assert migrated == 1 and len(skipped) == 1
+    assert not answer_format.is_structured(store.get(legacy['id'])['assessment_data'])
+
+    migrated, skipped = answer_format.migrate_store(store)
+    assert migrated == 1 and [ticket_id for _, ticket_id, _ in skipped] == ['AAA00002']
+
+    record = store.get(legacy['id'])
+    assert answer_format.is_structured(record['assessment_data'])
+    assert len(json.dumps(record['assessment_data'])) < before / 2
+    assert answer_format.migrate_store(store)[0] == 0
+
+
+def test_submission_is_scored_on_the_server():
+    import app as app_module
+    client = app_module.app.test_client()
+    form = dict(ANSWERS, agency_name='Structured Answers Agency', department='IT', contact_name='Pat Smith',
+                contact_email='pat@example.com', scores='AWS: 999')
+
+    client.post('/submit_to_eotss', data=form)
+
+    page, total = app_module.store.query(agency='Structured Answers Agency')
+    assert total == 1
+    data = page[0]['assessment_data']
+    recommendation, scores, _, _ = scoring.recommend(ANSWERS)
+    assert data['answers'] == answer_format.encode_answers(ANSWERS)
+    assert (data['recommendation'], data['scores']) == (recommendation, scores)
+    assert 'results_data' not in data
+
+    body = client.get(f"/view/{page[0]['ticket_id']}").get_data(as_text=True)
+    assert recommendation.upper() in body and 'Budget Sensitivity (Low/Moderate/High): High' in body
+
+    client.post('/submit_to_eotss', data=dict(form, latency='extreme', agency_name='Tampered Agency'))
+    assert app_module.store.query(agency='Tampered Agency')[1] == 0
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk assessment index.
+"""
+
+import json
+import os
+import random
+
+from assessment_index import ORDER_PATCH_LIMIT, SORT_ORDERS, AssessmentIndex, parse_assessment_filename, sort_key
+
+
+def _write_record(data_dir, ticket_id, assessment_id):
+    filename = f"{ticket_id}_{assessment_id}.json" if ticket_id else f"{assessment_id}.json"
+    with open(os.path.join(data_dir, filename), 'w') as f:
+        json.dump({"id": assessment_id, "ticket_id": ticket_id}, f)
+    return filename
+
+
+def test_parse_assessment_filename():
+    assert parse_assessment_filename('ABC12345_1234-abcd.json') == ('ABC12345', '1234-abcd')
+    assert parse_assessment_filename('1234-abcd.json') == (None, '1234-abcd')
+    assert parse_assessment_filename('.assessment_index.jsonl') is None
+
+
+def test_rebuild_maps_ids_and_tickets(tmp_path):
+    data_dir = str(tmp_path)
+    filename = _write_record(data_dir, 'ABC12345', 'id-1')
+    legacy = _write_record(data_dir, None, 'id-2')
+
+    index = AssessmentIndex(data_dir)
+    index.rebuild()
+
+    assert index.path_for_id('id-1') == os.path.join(data_dir, filename)
+    assert index.path_for_ticket('ABC12345') == os.path.join(data_dir, filename)
+    assert index.path_for_id('id-2') == os.path.join(data_dir, legacy)
+    assert index.path_for_id('missing') is None
+
+
+def test_entries_added_by_another_worker_are_replayed(tmp_path):
+    data_dir = str(tmp_path)
+    reader = AssessmentIndex(data_dir)
+    reader.rebuild()
+
+    writer = AssessmentIndex(data_dir)
+    writer.rebuild()
+    filename = _write_record(data_dir, 'XYZ00001', 'id-3')
+    writer.add('id-3', 'XYZ00001', filename, {"status": "pending"})
+
+    assert reader.path_for_ticket('XYZ00001') == os.path.join(data_dir, filename)
+
+    writer.update('id-3', {"status": "approved"})
+    assert [e['status'] for e in reader.entries()] == ['approved']
+
+
+def test_rebuild_reuses_summaries_and_reads_new_files(tmp_path):
+    data_dir = str(tmp_path)
+    _write_record(data_dir, 'ABC12345', 'id-1')
+    index = AssessmentIndex(data_dir)
+    index.rebuild()
+    index.update('id-1', {"status": "approved"})
+
+    _write_record(data_dir, 'DEF67890', 'id-2')
+    index.rebuild()
+
+    statuses = {e['id']: e['status'] for e in index.entries()}
+    assert statuses == {'id-1': 'approved', 'id-2': 'pending'}
+
+
+def test_select_pages_through_the_sorted_orders(tmp_path):
+    rng = random.Random(7)
+    agencies = ['Department of Revenue', 'department of health', 'Registry of Motor Vehicles', '']
+    index = AssessmentIndex(str(tmp_path))
+    index.rebuild()
+
+    def summary():
+        return {"status": rng.choice(['pending', 'approved', 'overridden']),
+                "submitted_at": f"2025-08-{rng.randrange(1, 29):02d}T09:00:00",
+                "agency_name": rng.choice(agencies), "notification_sent": rng.random() < 0.5}
+
+    count = 0
+    # Few changes between listings are moved one by one, many are merged in
+    for changes in (0, 3, ORDER_PATCH_LIMIT * 10):
+        index.add_many([(f"id-{count + i:03d}", f"T{count + i:03d}", f"f{count + i}.json", summary())
+                        for i in range(60)])
+        count += 60
+        for _ in range(changes):
+            index.update(f"id-{rng.randrange(count):03d}", summary())
+        entries = index.entries()
+        for sort in SORT_ORDERS:
+            for filters in ({}, {'status': 'pending'}, {'agency': 'DEPARTMENT'},
+                            {'status': 'approved', 'date_from': '2025-08-10', 'notification_sent': False}):
+                expected = [entry['id'] for entry in sorted(entries, key=lambda entry: sort_key(entry, sort))
+                            if all(entry[field] == value for field, value in filters.items()
+                                   if field in ('status', 'notification_sent'))
+                            and entry['agency_name'].lower().startswith(filters.get('agency', '').lower())
+                            and entry['submitted_at'] >= filters.get('date_from', '')]
+                expected.reverse()
+
+                page, total = index.select(sort=sort, offset=5, limit=10, **filters)
+                assert [entry['id'] for entry in page] == expected[5:15] and total == len(expected)
+                # Only a filtered count is cut short; the total of everything is known anyway
+                capped = min(len(expected), 4) if filters else len(expected)
+                assert index.select(sort=sort, limit=0, max_count=3, **filters)[1] == capped
+
+                walked, after = [], None
+                while True:
+                    page, _ = index.select(sort=sort, after=after, limit=7, max_count=0, **filters)
+                    if not page:
+                        break
+                    walked += [entry['id'] for entry in page]
+                    after = tuple(page[-1][field] for field in SORT_ORDERS[sort]) + (page[-1]['id'],)
+                assert walked == expected
+
+                if len(expected) > 10:
+                    cursor = next(tuple(entry[field] for field in SORT_ORDERS[sort]) + (entry['id'],)
+                                  for entry in entries if entry['id'] == expected[10])
+                    page, _ = index.select(sort=sort, before=cursor, limit=4, **filters)
+                    assert [entry['id'] for entry in page] == expected[6:10]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the stylesheet build step.
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+
+import assets
+
+
+def test_generates_only_used_utilities_in_tailwind_order():
+    css, used = assets.generate_css({'md:flex-row', 'p-4', 'px-6', 'hover:bg-blue-700', 'border-b-2', 'border',
+                                     'space-y-2', 'if', 'endif', 'no-print'})
+
+    assert used == ['border', 'border-b-2', 'hover:bg-blue-700', 'md:flex-row', 'p-4', 'px-6', 'space-y-2']
+    assert '.hover\\:bg-blue-700:hover{background-color:#1d4ed8}' in css
+    assert '@media (min-width:768px){.md\\:flex-row{flex-direction:row}}' in css
+    assert '.space-y-2>:not([hidden])~:not([hidden]){margin-top:0.5rem}' in css
+    # Side-specific utilities come after the all-sides one so they win
+    assert css.index('.border{') < css.index('.border-b-2{')
+    assert css.index('.p-4{') < css.index('.px-6{')
+    assert css.index('.px-6{') < css.index('.hover\\:bg-blue-700') < css.index('@media')
+    assert 'bg-red-500' not in css
+
+
+def test_negative_margins():
+    css, used = assets.generate_css({'-mt-4', '-mx-px', '-m-0', '-m-auto', '-p-4'})
+
+    assert used == ['-m-0', '-mt-4', '-mx-px']
+    assert '.-mt-4{margin-top:-1rem}' in css
+    assert '.-mx-px{margin-left:-1px;margin-right:-1px}' in css
+    assert '.-m-0{margin:0px}' in css
+
+
+def test_minify_css():
+    assert assets.minify_css("/* note */\n.a > .b {\n  color: red;\n  margin: 0 auto;\n}\n") == '.a>.b{color:red;margin:0 auto}'
+
+
+def test_build_writes_hashed_gzipped_stylesheet(tmp_path):
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    (templates / 'page.html').write_text('<div class="flex {% if x %}text-red-600{% endif %}">')
+    site_css = tmp_path / 'site.css'
+    site_css.write_text('.custom { color: blue; }')
+    dist = tmp_path / 'dist'
+
+    manifest = assets.build(str(templates), str(site_css), str(dist))
+
+    name = manifest['app.css']
+    css = (dist / name).read_bytes()
+    assert b'.flex{display:flex}' in css and b'.text-red-600{color:#dc2626}' in css
+    assert css.endswith(b'.custom{color:blue}')
+    assert gzip.decompress((dist / (name + '.gz')).read_bytes()) == css
+    assert json.loads((dist / 'manifest.json').read_text()) == manifest == assets.load_manifest(str(dist))
+
+    # A rebuild with different content replaces the old files
+    (templates / 'page.html').write_text('<div class="grid">')
+    rebuilt = assets.build(str(templates), str(site_css), str(dist))['app.css']
+    assert rebuilt != name
+    assert sorted(os.listdir(dist)) == sorted([rebuilt, rebuilt + '.gz', 'manifest.json'])
+
+
+@pytest.fixture
+def client():
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    from app import app
+    return app.test_client()
+
+
+def test_stylesheet_is_served_immutable_and_gzipped(client):
+    from app import ASSET_MANIFEST
+    url = f"/static/dist/{ASSET_MANIFEST['app.css']}"
+    assert url.encode() in client.get('/').data
+
+    plain = client.get(url)
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+    assert plain.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert plain.headers.get('Content-Encoding') is None
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Content-Type'].startswith('text/css')
+    assert gzip.decompress(compressed.data) == plain.data
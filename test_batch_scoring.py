@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for vectorized batch scoring and the /api/score/batch endpoint.
+"""
+
+import json
+import os
+
+import pytest
+
+import batch_scoring
+import scoring
+from scoring import ENGINE
+
+ANSWERS = {
+    'fault_tolerance': 'high', 'latency': 'low', 'data_volume': 'low', 'security': 'low',
+    'migration': 'low', 'ops_expertise': 'aws', 'budget': 'low', 'compliance': 'no',
+    'scalability': 'yes', 'containerized': 'yes', 'compatible_runtime': 'yes', 'no_hardware_deps': 'no',
+}
+
+
+@pytest.fixture
+def client():
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    from app import app
+    return app.test_client()
+
+
+def test_batch_matches_evaluator_for_every_answer_set():
+    compiled = ENGINE.current()
+    answer_sets = [compiled.table.decode(code) for code in range(compiled.table.size)]
+    answer_sets.append(dict(ANSWERS, budget='unknown', containerized='maybe'))
+
+    results = batch_scoring.score_batch(answer_sets)
+
+    assert results == [compiled.evaluate(answers) for answers in answer_sets]
+
+
+
+def test_batch_handles_more_explanations_than_fit_in_a_word():
+    rules = json.loads(json.dumps(ENGINE.current().rules))
+    features = scoring.FEATURE_OPTIONS.items()
+    rules['explanations']['aws'] = [{"when": {}, "text": f"Always {n}."} for n in range(20)] + [
+        {"when": {key: option}, "text": f"{key} is {option}."} for key, options in features for option in options]
+    compiled = scoring.CompiledRules(rules)
+    answer_sets = [compiled.table.decode(code) for code in range(0, compiled.table.size, 97)]
+
+    results = batch_scoring.BatchScorer(compiled).score(answer_sets)
+
+    assert results == [compiled.evaluate(answers) for answers in answer_sets]
+    assert any(len(explanations) > 32 for _, _, explanations, _ in results)
+
+def test_score_columns():
+    recommendations, scores, explanations, app_ages = batch_scoring.current_scorer().score_columns(
+        [ANSWERS, dict(ANSWERS, latency='high', security='high', migration='high', data_volume='high', budget='high',
+              ops_expertise='minimal', scalability='no', containerized='no', compatible_runtime='no')])
+
+    assert recommendations == ['aws', 'physical']
+    assert scores[0].tolist() == [16, 1, 0]
+    assert explanations[0][0] == "High fault tolerance needs are best met by AWS."
+    assert app_ages == ['modern', 'legacy']
+
+
+def test_batch_endpoint_accepts_json_array(client):
+    response = client.post('/api/score/batch', json=[ANSWERS, {'fault_tolerance': 'high'}])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['rules_version'] == ENGINE.current().version
+    assert body['count'] == 2
+    assert body['results'][0]['recommendation'] == 'aws'
+    assert body['results'][0]['scores'] == {'aws': 16, 'on_prem_cloud': 1, 'physical': 0}
+    assert body['results'][1]['error'].startswith('Missing answers: latency')
+
+
+def test_batch_endpoint_accepts_ndjson(client):
+    body = '\n'.join(json.dumps(dict(ANSWERS, budget=budget)) for budget in ('low', 'high')) + '\n'
+    response = client.post('/api/score/batch', data=body, content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert [r['scores']['aws'] for r in response.get_json()['results']] == [16, 14]
+
+
+def test_batch_endpoint_rejects_malformed_body(client):
+    assert client.post('/api/score/batch', data='{"a": 1}\nnot json', content_type='application/x-ndjson').status_code == 400
+    assert client.post('/api/score/batch', data='[{"fault_tolerance": "high"}', content_type='application/json').status_code == 400
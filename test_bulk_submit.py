@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk assessment submission (/api/assessments/bulk).
+"""
+
+import json
+
+import scoring
+
+ANSWERS = {key: options[0] for key, options in scoring.ANSWER_OPTIONS}
+AGENCY_INFO = {
+    "agency_name": "Department of Revenue",
+    "department": "Tax Systems",
+    "contact_name": "Pat Smith",
+    "contact_email": "pat@example.com",
+}
+
+
+def test_bulk_submission_saves_scores_and_notifies_once():
+    import app as app_module
+    client = app_module.app.test_client()
+    pending_before = app_module.outbox.counts()['pending']
+    rows = [
+        {"agency_info": AGENCY_INFO, "answers": ANSWERS},
+        {"agency_info": dict(AGENCY_INFO, contact_email=''), "answers": ANSWERS},
+        {"agency_info": AGENCY_INFO, "answers": dict(ANSWERS, latency='extreme')},
+        {"agency_info": dict(AGENCY_INFO, department='Bulk Ingest Unit'), "answers": dict(ANSWERS, budget='high')},
+    ]
+    body = '\n'.join(json.dumps(row) for row in rows)
+
+    result = client.post('/api/assessments/bulk', data=body, content_type='application/x-ndjson').get_json()
+
+    assert (result['accepted'], result['rejected']) == (2, 2) and result['notification_queued']
+    assert [row['index'] for row in result['results']] == [0, 1, 2, 3]
+    assert result['results'][1]['error'] == 'Missing agency_info fields: contact_email'
+    assert result['results'][2]['error'] == 'Invalid answers: latency'
+    first, last = result['results'][0], result['results'][3]
+    assert first['ticket_id'] != last['ticket_id']
+
+    record = app_module.store.get(last['id'])
+    recommendation = scoring.recommend(dict(ANSWERS, budget='high'))[0]
+    assert record['ticket_id'] == last['ticket_id'] and record['status'] == 'pending'
+    assert last['recommendation'] == recommendation
+    assert record['assessment_data']['recommendation'] == recommendation
+    assert record['assessment_data']['answers']['budget'] == 2
+    assert record['bulk_batch_id'] == result['batch_id']
+    assert app_module.search_index.search('"bulk ingest"') == ([last['id']], 1)
+    # One consolidated EOTSS email, no per-assessment emails
+    assert app_module.outbox.counts()['pending'] == pending_before + 1
+
+
+def test_bulk_submission_rejects_malformed_bodies():
+    import app as app_module
+    client = app_module.app.test_client()
+
+    assert client.post('/api/assessments/bulk', data='{"agency_info": ').status_code == 400
+    result = client.post('/api/assessments/bulk', data='[{"answers": {}}]').get_json()
+    assert result['accepted'] == 0 and result['batch_id'] is None and not result['notification_queued']
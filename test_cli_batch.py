@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for the CLI's --batch mode.
+"""
+
+import csv
+import json
+
+from eotss_hosting_recommendation_with_app_age import parse_args, run_batch
+from scoring import recommend
+
+ANSWERS = {
+    'fault_tolerance': 'high', 'latency': 'low', 'data_volume': 'low', 'security': 'low',
+    'migration': 'low', 'ops_expertise': 'aws', 'budget': 'low', 'compliance': 'no',
+    'scalability': 'yes', 'containerized': 'yes', 'compatible_runtime': 'yes', 'no_hardware_deps': 'no',
+}
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(ANSWERS) + ['app_name'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_batch_scores_csv_rows_in_order(tmp_path):
+    rows = [dict(ANSWERS, app_name=f'app{i}', budget=budget) for i, budget in enumerate(['Low', 'high', 'moderate'] * 5)]
+    rows[4]['security'] = ''
+    _write_csv(tmp_path / 'portfolio.csv', rows)
+
+    for workers in ('1', '2'):
+        output = tmp_path / f'results{workers}.ndjson'
+        args = parse_args(['--batch', str(tmp_path / 'portfolio.csv'), '-o', str(output), '--id-field', 'app_name',
+                           '--workers', workers, '--chunk-size', '4'])
+        assert run_batch(args) == 1
+
+        results = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [r['row'] for r in results] == list(range(1, 16))
+        assert results[4] == {'row': 5, 'id': 'app4', 'error': 'Invalid answers: security missing'}
+        expected = recommend(dict(ANSWERS, budget='high'))
+        assert (results[1]['recommendation'], results[1]['scores'], results[1]['explanations']) == expected[:3]
+
+
+def test_batch_derives_migration_from_sub_questions(tmp_path):
+    source = tmp_path / 'portfolio.ndjson'
+    source.write_text(json.dumps(dict(ANSWERS, custom_hardware='yes', legacy_software='yes')) + '\n')
+    output = tmp_path / 'results.csv'
+
+    assert run_batch(parse_args(['--batch', str(source), '-o', str(output), '--workers', '1'])) == 0
+
+    with open(output, newline='') as f:
+        [row] = list(csv.DictReader(f))
+    expected = recommend(dict(ANSWERS, migration='high'))
+    assert row['recommendation'] == expected[0]
+    assert int(row['score_physical']) == expected[1]['physical']
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional GET of the dashboard, view and review pages (conditional_page).
+"""
+
+import time
+from datetime import datetime, timezone
+
+
+def respond(app_module, version, headers=None):
+    with app_module.app.test_request_context('/', headers=headers or {}):
+        return app_module.conditional_page(version, lambda: 'page')
+
+
+def test_etag_revalidation():
+    import app as app_module
+    response = respond(app_module, ('v1', time.time() - 60))
+    assert response.status_code == 200 and response.last_modified is not None
+
+    assert respond(app_module, ('v1', time.time() - 60), {'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert respond(app_module, ('v2', time.time() - 60), {'If-None-Match': response.headers['ETag']}).status_code == 200
+
+
+def test_date_revalidation_waits_for_the_second_to_end():
+    import app as app_module
+    # Stands for "written this second"; a second ahead, so it cannot be over before the requests below
+    now = time.time() + 1
+    current_second = datetime.fromtimestamp(int(now), timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+    # Another write could still land in this second with the same date, so none is given or trusted
+    response = respond(app_module, ('v1', now))
+    assert response.status_code == 200 and response.last_modified is None
+    assert respond(app_module, ('v2', now), {'If-Modified-Since': current_second}).status_code == 200
+
+    assert respond(app_module, ('v1', now - 60), {'If-Modified-Since': current_second}).status_code == 304
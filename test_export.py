@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming assessment exports.
+"""
+
+import csv
+import io
+import json
+import os
+
+import answer_format
+import export
+import scoring
+
+
+def _record(assessment_id, notes=''):
+    return {
+        "id": assessment_id,
+        "ticket_id": f"T{assessment_id}",
+        "status": "approved",
+        "submitted_at": "2025-08-01T10:00:00",
+        "agency_info": {"agency_name": "Department of Revenue, Tax Division", "contact_email": "pat@example.com"},
+        "assessment_data": {"recommendation": "aws"},
+        "review_notes": notes,
+        "notification_sent": True,
+    }
+
+
+def test_formats_stream_in_chunks(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_SIZE', 200)
+    records = [_record(str(i), notes='Line one\nline "two"') for i in range(20)]
+
+    chunks = list(export.csv_chunks(iter(records)))
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert len(rows) == 20 and rows[0]['agency_name'] == 'Department of Revenue, Tax Division'
+    assert rows[19]['review_notes'] == 'Line one\nline "two"' and rows[19]['reviewed_at'] == ''
+
+    answers = {key: options[0] for key, options in scoring.ANSWER_OPTIONS}
+    structured = dict(records[0], assessment_data=answer_format.structured_assessment_data(
+        answers, *scoring.recommend(answers)))
+    [row] = csv.DictReader(io.StringIO(''.join(export.csv_chunks([structured]))))
+    assert row['recommendation'] == 'aws' and row['ops_expertise'] == 'aws' and row['compliance'] == 'yes'
+
+    lines = ''.join(export.export_chunks('ndjson', records)).splitlines()
+    assert [json.loads(line) for line in lines] == records
+    header = ''.join(export.csv_chunks([])).strip().split(',')
+    assert header[:len(export.CSV_COLUMNS)] == [column for column, _ in export.CSV_COLUMNS]
+    assert header[-1] == 'no_hardware_deps'
+
+
+def test_export_endpoints(tmp_path):
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    import app as app_module
+    client = app_module.app.test_client()
+    record = dict(_record('export-test-1'), submitted_at='2001-02-03T10:00:00')
+    app_module.store.save(record)
+
+    response = client.get('/export.csv?date_from=2001-02-03&date_to=2001-02-03')
+    assert response.is_streamed and response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['id'] for row in rows] == ['export-test-1']
+
+    response = client.get('/export.ndjson?status=approved&date_from=2001-02-03&date_to=2001-02-03')
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == ['export-test-1']
+    assert client.get('/export.ndjson?status=pending&date_from=2001-02-03&date_to=2001-02-03').get_data() == b''
+    assert client.get('/export.csv?status=bogus').status_code == 400
+    assert client.get('/export.xml').status_code == 404
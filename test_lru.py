@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded LRU cache.
+"""
+
+from lru import LRUCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2, max_bytes=1000)
+    cache.put('a', 'x')
+    cache.put('b', 'y')
+    assert cache.get('a') == 'x'
+    cache.put('c', 'z')
+
+    assert 'b' not in cache
+    assert cache.get('a') == 'x' and cache.get('c') == 'z'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (3, 0, 1, 2)
+
+
+def test_byte_limit():
+    cache = LRUCache(max_entries=100, max_bytes=10)
+    cache.put('a', '1234')
+    cache.put('b', '1234')
+    cache.put('a', '12345')
+    cache.put('c', '1234')
+
+    # Replacing 'a' made it most recent, so 'b' goes first
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.stats()['bytes'] == 9
+    assert cache.put('big', 'x' * 11) is False
+    assert cache.get('big') is None and cache.stats()['misses'] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = LRUCache(max_entries=0)
+    assert cache.put('a', 'x') is False
+    assert len(cache) == 0
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics registry and the /metrics endpoint.
+"""
+
+import os
+
+import pytest
+
+import metrics
+
+
+def _registry(directory=None):
+    registry = metrics.Registry(directory)
+    registry.counter('jobs_total', 'Jobs done', ('kind',))
+    registry.histogram('job_seconds', 'Job duration', buckets=(0.1, 1.0))
+    return registry
+
+
+def test_render_counters_and_cumulative_histogram_buckets():
+    registry = _registry()
+    registry.gauge('queue_length', 'Queued jobs', lambda: 3)
+    registry._metrics['jobs_total'].inc(kind='email')
+    registry._metrics['jobs_total'].inc(2, kind='email')
+    for seconds in (0.05, 0.5, 0.5, 7):
+        registry._metrics['job_seconds'].observe(seconds)
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE jobs_total counter' in lines
+    assert 'jobs_total{kind="email"} 3' in lines
+    assert 'job_seconds_bucket{le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{le="1"} 3' in lines
+    assert 'job_seconds_bucket{le="+Inf"} 4' in lines
+    assert 'job_seconds_sum 8.05' in lines
+    assert 'job_seconds_count 4' in lines
+    assert 'queue_length 3' in lines
+    with pytest.raises(ValueError):
+        registry._metrics['jobs_total'].inc(queue='email')
+
+
+def test_totals_are_summed_across_workers(tmp_path):
+    worker = _registry(str(tmp_path))
+    scraped = _registry(str(tmp_path))
+    worker._metrics['jobs_total'].inc(5, kind='email')
+    worker._metrics['job_seconds'].observe(0.5)
+    worker.flush()
+    scraped._metrics['jobs_total'].inc(kind='email')
+    scraped._metrics['jobs_total'].inc(kind='report')
+    scraped._metrics['job_seconds'].observe(2)
+
+    totals = scraped.collect()
+
+    assert totals['jobs_total'] == {('email',): 6, ('report',): 1}
+    assert totals['job_seconds'][()] == [0, 1, 2.5, 2]
+    metrics.clear_snapshots(str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_metrics_endpoint_counts_requests():
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    from app import app
+    client = app.test_client()
+    client.get('/')
+    client.get('/no-such-page')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    body = response.get_data(as_text=True)
+    assert 'eotss_http_requests_total{endpoint="index",method="GET",status="200"}' in body
+    assert 'eotss_http_requests_total{endpoint="unmatched",method="GET",status="404"}' in body
+    assert 'eotss_http_request_duration_seconds_bucket{endpoint="index",method="GET",le="+Inf"}' in body
+    assert 'eotss_assessments{counter="total"}' in body
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable email outbox.
+"""
+
+import os
+import time
+
+from outbox import Outbox
+
+MESSAGE = {"subject": "Hello", "recipients": ["a@example.com"], "body": "Hi"}
+
+
+def _outbox(tmp_path, deliver, **kwargs):
+    statuses = []
+    outbox = Outbox(str(tmp_path), deliver, on_status=lambda entry, status, error: statuses.append((entry["kind"], status, error)),
+                    **kwargs)
+    return outbox, statuses
+
+
+def test_delivers_queued_email(tmp_path):
+    batches = []
+
+    def deliver(entries):
+        batches.append([entry["message"] for entry in entries])
+        return [None] * len(entries)
+
+    outbox, statuses = _outbox(tmp_path, deliver, batch_size=2)
+    for _ in range(3):
+        outbox.enqueue('agency_confirmation', 'id-1', MESSAGE)
+
+    assert outbox.process_due() == 3
+    assert batches == [[MESSAGE, MESSAGE], [MESSAGE]]
+    assert statuses == [('agency_confirmation', 'sent', None)] * 3
+    assert outbox.counts() == {'pending': 0, 'processing': 0, 'failed': 0}
+
+
+def test_failed_delivery_is_retried_with_backoff_then_given_up(tmp_path):
+    def deliver(entries):
+        raise ConnectionError("relay down")
+
+    outbox, statuses = _outbox(tmp_path, deliver, max_attempts=2, retry_base=60)
+    outbox.enqueue('eotss_notification', 'id-1', MESSAGE)
+
+    assert outbox.process_due() == 0
+    assert statuses[-1] == ('eotss_notification', 'retrying', 'ConnectionError: relay down')
+    assert outbox.due() == []
+    assert len(outbox.due(now=time.time() + 61)) == 1
+
+    for name in os.listdir(tmp_path / 'pending'):
+        os.rename(tmp_path / 'pending' / name, tmp_path / 'pending' / ('0' * 20 + name[20:]))
+    outbox.process_due()
+    assert statuses[-1][1] == 'failed'
+    assert outbox.counts() == {'pending': 0, 'processing': 0, 'failed': 1}
+
+
+def test_abandoned_claims_are_requeued(tmp_path):
+    outbox, _ = _outbox(tmp_path, lambda entries: [None] * len(entries), lease=60)
+    outbox.enqueue('review_notification', 'id-1', MESSAGE)
+    claimed = outbox._claim(outbox.due()[0])
+    assert outbox.process_due() == 0
+
+    os.utime(claimed, (time.time() - 120, time.time() - 120))
+    assert outbox.process_due() == 1
+    assert outbox.counts()['processing'] == 0
+
+
+def test_email_that_cannot_be_queued_can_be_sent_again(monkeypatch):
+    import app as app_module
+    record = {"id": "outbox-test-1", "ticket_id": "OBX00001", "status": "approved",
+              "submitted_at": "2025-08-01T10:00:00",
+              "agency_info": {"agency_name": "Test Agency", "contact_email": "a@example.com"}}
+    app_module.store.save(record)
+
+    def enqueue(*args):
+        raise PermissionError("outbox not writable")
+
+    with app_module.app.test_request_context('/'):
+        monkeypatch.setattr(app_module.outbox, 'enqueue', enqueue)
+        assert not app_module.queue_review_notification(record)
+        assessment = app_module.load_assessment('outbox-test-1')
+        assert assessment['review_notification_delivery']['status'] == 'failed'
+        assert not app_module.delivery_in_progress(assessment, 'review_notification')
+
+        monkeypatch.setattr(app_module.outbox, 'enqueue', lambda *args: None)
+        assert app_module.queue_review_notification(record)
+        assessment = app_module.load_assessment('outbox-test-1')
+        assert app_module.delivery_in_progress(assessment, 'review_notification')
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the request profiling middleware.
+"""
+
+import os
+import pstats
+import time
+
+from profiling import ProfilingMiddleware
+
+
+def _slow_app(environ, start_response):
+    if environ['PATH_INFO'] == '/slow':
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+
+def _request(middleware, path, **headers):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'QUERY_STRING': ''}
+    environ.update({'HTTP_' + name.upper(): value for name, value in headers.items()})
+    body = middleware(environ, lambda status, headers, exc_info=None: None)
+    chunks = list(body)
+    if hasattr(body, 'close'):
+        body.close()
+    return chunks
+
+
+def test_enabled_profiling_keeps_only_slow_requests(tmp_path):
+    middleware = ProfilingMiddleware(_slow_app, str(tmp_path), enabled=True, threshold_ms=20, sample_interval=0.001)
+
+    assert _request(middleware, '/fast') == [b'ok']
+    assert _request(middleware, '/slow') == [b'ok']
+
+    [summary] = middleware.profiles()
+    assert summary['path'] == '/slow' and summary['status'] == 200 and summary['duration_ms'] >= 20
+    base = os.path.join(str(tmp_path), summary['name'])
+    assert any('_slow_app' in func for (_, _, func) in pstats.Stats(base + '.pstats').stats)
+    with open(base + '.collapsed') as f:
+        lines = f.read().splitlines()
+    assert any('_slow_app (test_profiling.py' in line for line in lines)
+
+
+def test_token_header_forces_profiling_and_old_profiles_rotate(tmp_path):
+    middleware = ProfilingMiddleware(_slow_app, str(tmp_path), token='secret', max_files=2)
+
+    _request(middleware, '/fast', x_profile='wrong')
+    assert middleware.profiles() == []
+    for path in ('/one', '/two', '/three'):
+        _request(middleware, path, x_profile='secret')
+    _request(middleware, '/debug/profiles', x_profile='secret')
+
+    assert sorted(summary['path'] for summary in middleware.profiles()) == ['/three', '/two']
+    assert len(os.listdir(tmp_path)) == 6
+    assert not middleware.authorized(None) and not ProfilingMiddleware(_slow_app, str(tmp_path)).authorized('')
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared scoring module.
+"""
+
+import json
+import os
+
+import pytest
+
+import scoring
+from scoring import ANSWER_KEYS, ENGINE, RuleEngine, compile_rules, interpret_rules, load_rules, recommend
+
+ANSWERS = {
+    'fault_tolerance': 'high', 'latency': 'low', 'data_volume': 'low', 'security': 'low',
+    'migration': 'low', 'ops_expertise': 'aws', 'budget': 'low', 'compliance': 'no',
+    'scalability': 'yes', 'containerized': 'yes', 'compatible_runtime': 'yes', 'no_hardware_deps': 'no',
+}
+
+
+def test_table_matches_rules_for_every_answer_set():
+    compiled = ENGINE.current()
+    assert compiled.table.size == 3 ** 7 * 2 ** 5
+    assert compiled.verify() == []
+
+
+def test_encode_decode_round_trip():
+    table = ENGINE.current().table
+    code = table.encode(ANSWERS)
+    assert table.decode(code) == {key: ANSWERS[key] for key in ANSWER_KEYS}
+
+
+def test_recommend():
+    recommendation, scores, explanations, app_age = recommend(dict(ANSWERS))
+    assert recommendation == 'aws'
+    assert scores == {'aws': 16, 'on_prem_cloud': 1, 'physical': 0}
+    assert app_age == 'modern'
+    assert explanations[0] == "High fault tolerance needs are best met by AWS."
+
+
+def test_compiled_evaluator_matches_interpreter_outside_the_table():
+    rules = load_rules(scoring.DEFAULT_RULES_PATH)
+    answers = dict(ANSWERS, budget='unknown')
+    assert recommend(answers) == interpret_rules(rules, answers) == compile_rules(rules)(answers)
+
+
+def test_rules_are_hot_reloaded(tmp_path):
+    rules = load_rules(scoring.DEFAULT_RULES_PATH)
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules))
+    engine = RuleEngine(str(path), reload_interval=0)
+    assert engine.current().table.lookup(dict(ANSWERS))[0] == 'aws'
+
+    rules['version'] = 'test-2'
+    rules['weights']['fault_tolerance']['high'] = {'physical': 50}
+    path.write_text(json.dumps(rules))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert engine.current().version == 'test-2'
+    assert engine.current().table.lookup(dict(ANSWERS))[0] == 'physical'
+
+    path.write_text('{"version": "broken"}')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2))
+    assert engine.current().version == 'test-2'
+
+
+def test_large_weights_fit_the_table():
+    rules = load_rules(scoring.DEFAULT_RULES_PATH)
+    for key, options in scoring.ANSWER_OPTIONS:
+        rules['weights'][key] = {option: {'aws': 15} for option in options}
+    scoring.validate_rules(rules)
+    compiled = scoring.CompiledRules(rules)
+    assert compiled.table.lookup(dict(ANSWERS)) == interpret_rules(rules, dict(ANSWERS))
+    assert compiled.table.lookup(dict(ANSWERS))[1]['aws'] > 127
+
+
+def test_totals_beyond_the_table_range_are_rejected():
+    rules = load_rules(scoring.DEFAULT_RULES_PATH)
+    rules['weights']['budget']['low'] = {'aws': scoring.MAX_SCORE + 1}
+    with pytest.raises(scoring.RulesError, match='aws'):
+        scoring.validate_rules(rules)
+
+
+def test_rules_that_fail_to_compile_are_kept_out_and_not_retried(tmp_path, monkeypatch):
+    rules = load_rules(scoring.DEFAULT_RULES_PATH)
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules))
+    engine = RuleEngine(str(path), reload_interval=0)
+    version = engine.current().version
+
+    rules['version'] = 'test-overflow'
+    path.write_text(json.dumps(rules))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    builds = []
+
+    def failing_build(rules):
+        builds.append(rules['version'])
+        raise OverflowError("signed char is greater than maximum")
+
+    monkeypatch.setattr(scoring, 'CompiledRules', failing_build)
+    assert engine.current().version == version
+    assert engine.current().table.lookup(dict(ANSWERS))[0] == 'aws'
+    assert builds == ['test-overflow']
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the full-text search index.
+"""
+
+import os
+
+from search import SearchIndex, match_expression
+
+
+def _record(assessment_id, agency, contact='Pat Smith', notes=''):
+    return {
+        "id": assessment_id,
+        "ticket_id": f"T{assessment_id}",
+        "agency_info": {"agency_name": agency, "department": "IT Department", "contact_name": contact,
+                        "contact_email": "pat@example.com"},
+        "assessment_data": {"recommendation": "aws", "explanations": "Modern, cloud-ready applications are ideal for AWS."},
+        "review_notes": notes,
+    }
+
+
+def test_terms_match_by_prefix_newest_first(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    index.add_many([_record('1', 'Department of Revenue'), _record('2', 'Registry of Motor Vehicles'),
+                    _record('3', 'Department of Revenue', contact='Lee Jones')])
+
+    assert index.search('revenue') == (['3', '1'], 2)
+    assert index.search('REV smi') == (['1'], 1)
+    assert index.search('pat@example.com cloud-ready', limit=1) == (['3'], 3)
+    assert index.search('revenue', max_results=1) == (['3', '1'], 2)
+    assert index.search('"; DROP TABLE docs') == ([], 0)
+    assert index.search('  ') == ([], 0)
+    assert match_expression('o rev') == '"o" "rev"*'
+
+
+def test_updates_replace_entries_and_persist(tmp_path):
+    path = str(tmp_path / 'search.db')
+    index = SearchIndex(path)
+    index.add(_record('1', 'Department of Revenue'))
+    assert index.update_notes('1', 'Needs the mainframe team')
+    assert not index.update_notes('missing', 'x')
+    index.add(_record('1', 'State Police', notes='Needs the mainframe team'))
+
+    reopened = SearchIndex(path)
+    assert reopened.search('mainframe') == (['1'], 1)
+    assert reopened.search('revenue') == ([], 0)
+    reopened.clear()
+    assert reopened.is_empty() and os.path.exists(path)
+
+
+def test_search_page_and_api(tmp_path):
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    import app as app_module
+    client = app_module.app.test_client()
+    original = app_module.search_index
+    app_module.search_index = SearchIndex(str(tmp_path / 'search.db'))
+    try:
+        record = dict(_record('search-test-1', 'Office of the Comptroller'), status='pending',
+                      submitted_at='2025-08-01T10:00:00')
+        app_module.store.save(record)
+        app_module.search_index.add(record)
+
+        body = client.get('/search?q=comptrol').get_data(as_text=True)
+        assert '#Tsearch-test-1' in body and '1 matching assessments' in body
+        assert client.get('/api/search?q=comptroller').get_json()['results'][0]['id'] == 'search-test-1'
+        assert 'No assessments match' in client.get('/search?q=nomatch').get_data(as_text=True)
+        assert client.get('/search?q=').status_code == 302
+    finally:
+        app_module.search_index = original
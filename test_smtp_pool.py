@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled SMTP connections.
+"""
+
+import smtplib
+
+from smtp_pool import SMTPPool
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def __enter__(self):
+        self.server.sessions += 1
+        self.session = self.server.sessions
+        return self
+
+    def __exit__(self, *exc):
+        self.server.closed += 1
+
+    def send(self, message):
+        if message in self.server.refuse:
+            raise smtplib.SMTPRecipientsRefused({message: (550, b'no such user')})
+        if self.server.drop_session == self.session:
+            self.server.drop_session = None
+            raise smtplib.SMTPServerDisconnected('idle timeout')
+        self.server.sent.append((self.session, message))
+
+
+class FakeMail:
+    def __init__(self):
+        self.sessions = 0
+        self.closed = 0
+        self.sent = []
+        self.refuse = set()
+        self.drop_session = None
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+def test_batches_share_one_warm_session():
+    mail = FakeMail()
+    pool = SMTPPool(mail)
+
+    assert pool.send_batch(['a', 'b']) == [None, None]
+    assert pool.send_batch(['c']) == [None]
+
+    assert mail.sent == [(1, 'a'), (1, 'b'), (1, 'c')]
+    assert pool.stats == {'opened': 1, 'reused': 1, 'discarded': 0}
+
+
+def test_refused_message_does_not_fail_the_batch():
+    mail = FakeMail()
+    mail.refuse = {'b'}
+    results = SMTPPool(mail).send_batch(['a', 'b', 'c'])
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+
+
+def test_dropped_session_is_reopened():
+    mail = FakeMail()
+    pool = SMTPPool(mail)
+    pool.send_batch(['a'])
+    mail.drop_session = 1
+
+    assert pool.send_batch(['b']) == [None]
+    assert mail.sent == [(1, 'a'), (2, 'b')]
+
+
+def test_idle_connections_expire():
+    mail = FakeMail()
+    pool = SMTPPool(mail, idle_timeout=0)
+    pool.send_batch(['a'])
+    pool._idle = [(connection, returned_at - 1) for connection, returned_at in pool._idle]
+    pool.send_batch(['b'])
+
+    assert mail.sessions == 2 and mail.closed == 1
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Tests for the assessment storage backends.
+"""
+
+import os
+import re
+import threading
+
+import pytest
+
+from assessment_index import journal_filename, shard_filename, summarize_record
+from storage import JSONFileStore, RecordCache, SQLiteStore, migrate_json_to_sqlite, page_cursor
+
+
+def _record(assessment_id, ticket_id, status='pending', submitted_at='2025-08-01T10:00:00'):
+    return {
+        "id": assessment_id,
+        "ticket_id": ticket_id,
+        "status": status,
+        "submitted_at": submitted_at,
+        "agency_info": {"agency_name": "Test Agency"},
+        "assessment_data": {"recommendation": "AWS"},
+    }
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        return JSONFileStore(str(tmp_path))
+    return SQLiteStore(str(tmp_path / 'assessments.db'))
+
+
+def test_save_and_lookup(store):
+    store.save(_record('id-1', 'ABC12345'))
+
+    assert store.get('id-1')['ticket_id'] == 'ABC12345'
+    assert store.get_by_ticket('ABC12345')['id'] == 'id-1'
+    assert store.get('missing') is None
+    assert store.count() == 1
+
+
+def test_update_merges_changes(store):
+    store.save(_record('id-1', 'ABC12345'))
+
+    assert store.update('id-1', {"status": "approved", "review_notes": "ok"})
+    assert not store.update('missing', {"status": "approved"})
+
+    record = store.get('id-1')
+    assert record['status'] == 'approved'
+    assert record['review_notes'] == 'ok'
+    assert record['agency_info'] == {"agency_name": "Test Agency"}
+
+
+def test_save_many_writes_one_batch(store):
+    store.save(_record('id-1', 'AAA00001'))
+
+    written = store.save_many([_record('id-1', 'AAA00009'), _record('id-2', 'AAA00002'),
+                               _record('id-3', 'AAA00003', status='approved')])
+    assert written == 2
+    assert store.get('id-1')['ticket_id'] == 'AAA00001'
+    assert store.get_by_ticket('AAA00003')['id'] == 'id-3'
+    assert store.counters()['total'] == 3 and store.query(status='pending')[1] == 2
+    assert store.save_many([]) == 0
+
+
+
+def test_json_batch_cut_short_is_not_indexed_by_the_next_rebuild(tmp_path, monkeypatch):
+    store = JSONFileStore(str(tmp_path))
+    store.save(_record('id-1', 'AAA00001'))
+
+    def crash(entries):
+        raise OSError("worker killed before the index append")
+
+    monkeypatch.setattr(store.index, 'add_many', crash)
+    with pytest.raises(OSError):
+        store.save_many([_record('id-2', 'AAA00002'), _record('id-3', 'AAA00003')])
+    assert (tmp_path / shard_filename('AAA00002', 'id-2')).exists()
+
+    restarted = JSONFileStore(str(tmp_path))
+    assert [record['id'] for record in restarted.iter_records()] == ['id-1']
+    assert restarted.counters()['total'] == 1
+    assert not list(tmp_path.glob('*.batch-pending'))
+
+
+def test_json_batch_in_progress_is_left_to_its_writer(tmp_path):
+    from assessment_index import pending_batch
+
+    store = JSONFileStore(str(tmp_path))
+    record = _record('id-2', 'AAA00002')
+    filename = shard_filename('AAA00002', 'id-2')
+    with pending_batch(str(tmp_path), [('id-2', filename)]):
+        store._write_record(record)
+        # Another worker starting up meanwhile
+        assert JSONFileStore(str(tmp_path)).get('id-2') is None
+        assert (tmp_path / filename).exists()
+        store.index.add_many([('id-2', 'AAA00002', filename, summarize_record(record))])
+    assert JSONFileStore(str(tmp_path)).get('id-2')['ticket_id'] == 'AAA00002'
+    assert not list(tmp_path.glob('*.batch-pending'))
+
+def test_sqlite_uses_wal(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'assessments.db'))
+    assert store._connection().execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_sqlite_reuses_connections_of_finished_threads(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'assessments.db'))
+    store.save(_record('id-1', 'ABC12345'))
+    seen = []
+
+    def read():
+        seen.append(id(store._connection()))
+        assert store.get('id-1')['ticket_id'] == 'ABC12345'
+
+    # Short-lived threads (or greenlets, under gevent) hand their connection back when they end
+    for _ in range(5):
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+    assert len(set(seen)) == 1
+
+
+def test_migrate_json_to_sqlite_is_idempotent(tmp_path):
+    data_dir = str(tmp_path / 'data')
+    json_store = JSONFileStore(data_dir)
+    json_store.save(_record('id-1', 'ABC12345'))
+    json_store.save(_record('id-2', 'DEF67890', status='approved'))
+    db_path = os.path.join(data_dir, 'assessments.db')
+
+    assert migrate_json_to_sqlite(data_dir, db_path) == (2, 2)
+    assert migrate_json_to_sqlite(data_dir, db_path) == (2, 0)
+    assert SQLiteStore(db_path).get_by_ticket('DEF67890')['status'] == 'approved'
+
+
+def test_query_filters_sorts_and_paginates(store):
+    store.save(_record('id-1', 'AAA00001', submitted_at='2025-08-01T09:00:00'))
+    store.save(_record('id-2', 'AAA00002', status='approved', submitted_at='2025-08-02T09:00:00'))
+    store.save(_record('id-3', 'AAA00003', submitted_at='2025-08-03T09:00:00'))
+    store.update('id-3', {"agency_info": {"agency_name": "Department of Revenue"}})
+
+    page, total = store.query(limit=2)
+    assert total == 3
+    assert [r['id'] for r in page] == ['id-3', 'id-2']
+    assert [r['id'] for r in store.query(limit=2, offset=2)[0]] == ['id-1']
+
+    assert [r['id'] for r in store.query(status='pending', descending=False)[0]] == ['id-1', 'id-3']
+    assert [r['id'] for r in store.query(agency='department')[0]] == ['id-3']
+    page, total = store.query(date_from='2025-08-02', date_until='2025-08-03')
+    assert [r['id'] for r in page] == ['id-2'] and total == 1
+    assert store.query(status='approved', notification_sent=False, limit=0) == ([], 1)
+
+
+def test_query_pages_by_cursor_and_caps_counts(store):
+    for i in range(7):
+        store.save(_record(f'id-{i}', f'AAA0000{i}', submitted_at=f'2025-08-0{1 + i // 2}T09:00:00'))
+    store.update('id-4', {"agency_info": {"agency_name": "department of Revenue"}})
+    store.update('id-6', {"agency_info": {"agency_name": "Department of Health"}})
+
+    page, total = store.query(limit=3)
+    assert [r['id'] for r in page] == ['id-6', 'id-5', 'id-4'] and total == 7
+    page, _ = store.query(limit=3, after=page_cursor(page[-1], 'submitted_at'))
+    assert [r['id'] for r in page] == ['id-3', 'id-2', 'id-1']
+    page, _ = store.query(limit=2, before=page_cursor(page[0], 'submitted_at'))
+    assert [r['id'] for r in page] == ['id-5', 'id-4']
+
+    # Agency names sort case-insensitively, ties by submission date and ID
+    page, _ = store.query(sort='agency_name', descending=False, limit=2)
+    assert [r['id'] for r in page] == ['id-6', 'id-4']
+    page, _ = store.query(sort='agency_name', descending=False, limit=2, after=page_cursor(page[-1], 'agency_name'))
+    assert [r['id'] for r in page] == ['id-0', 'id-1']
+
+    assert store.query(status='pending', limit=0, max_count=3)[1] == 4
+    assert store.query(agency='dep', limit=0, max_count=3)[1] == 2
+    assert store.query(limit=0, max_count=3)[1] == 7
+
+
+def test_iter_matching_streams_oldest_first(store):
+    for i in range(5):
+        store.save(_record(f'id-{i}', f'AAA0000{i}', status='approved' if i == 2 else 'pending',
+                           submitted_at=f'2025-08-0{5 - i // 2}T09:00:00'))
+    store.update('id-0', {"review_notes": "journaled"})
+    # Small batches make the SQLite scan page through ties on submitted_at
+    kwargs = {'batch_size': 2} if isinstance(store, SQLiteStore) else {}
+
+    records = list(store.iter_matching(**kwargs))
+    assert [r['id'] for r in records] == ['id-4', 'id-2', 'id-3', 'id-0', 'id-1']
+    assert records[3]['review_notes'] == 'journaled'
+    assert [r['id'] for r in store.iter_matching(status='pending', date_from='2025-08-04', **kwargs)] == \
+        ['id-3', 'id-0', 'id-1']
+    assert list(store.iter_matching(date_until='2025-08-01', **kwargs)) == []
+
+
+def test_counters_follow_the_review_workflow(store):
+    store.save(_record('id-1', 'AAA00001'))
+    store.save(_record('id-2', 'AAA00002'))
+    store.update('id-1', {"status": "approved", "notification_sent": False})
+    store.update('id-2', {"status": "overridden", "notification_sent": False})
+    store.update('id-2', {"notification_sent": True})
+
+    assert store.counters() == {
+        'total': 2,
+        'pending': 0,
+        'reviewed_awaiting': 1,
+        'approved_notified': 0,
+        'overridden_notified': 1,
+    }
+
+
+def test_sqlite_counters_are_seeded_from_existing_rows(tmp_path):
+    db_path = str(tmp_path / 'assessments.db')
+    store = SQLiteStore(db_path)
+    store.save_many([_record('id-1', 'AAA00001'), _record('id-2', 'AAA00002', status='approved')])
+    store._connection().execute("DELETE FROM counters")
+
+    assert SQLiteStore(db_path).counters()['reviewed_awaiting'] == 1
+    assert SQLiteStore(db_path).count() == 2
+
+
+def test_versions_change_on_every_write(store):
+    generation = store.generation()
+    store.save(_record('id-1', 'ABC12345'))
+    assert store.generation() != generation
+    generation = store.generation()
+
+    version = store.record_version('id-1')
+    assert store.record_version_by_ticket('ABC12345') == version
+    assert store.record_version('missing') is None
+
+    assert store.update('id-1', {"review_notes": "ok"})
+    assert store.record_version('id-1') != version
+    assert store.generation() != generation
+
+
+def test_events_are_replayed_and_keep_review_history(store):
+    store.save(_record('id-1', 'ABC12345'))
+    store.append_event('id-1', 'reviewed', {"status": "overridden", "review_notes": "too old", "override_reason": "physical"})
+    store.append_event('id-1', 'edited', {"status": "approved", "review_notes": "fine", "override_reason": ""})
+    store.append_event('id-1', 'notified', {"notification_sent": True})
+    with pytest.raises(ValueError):
+        store.append_event('id-1', 'deleted', {})
+
+    record = store.get('id-1')
+    assert record['status'] == 'approved' and record['notification_sent']
+    assert [(entry['event'], entry['status']) for entry in record['review_history']] == [
+        ('reviewed', 'overridden'), ('edited', 'approved')]
+    assert store.counters()['approved_notified'] == 1
+    version = store.record_version('id-1')
+
+    assert store.compact() == 1
+    assert store.compact() == 0
+    compacted = store.get('id-1')
+    compacted.pop('compacted_through', None)
+    assert compacted == record
+    assert store.query(status='approved')[0] == [store.get('id-1')]
+    assert [r['review_history'] for r in store.iter_records()] == [record['review_history']]
+    if isinstance(store, SQLiteStore):
+        assert store.record_version('id-1') == version  # Compaction does not change the record
+
+
+def test_json_journal_is_compacted_once(tmp_path):
+    store = JSONFileStore(str(tmp_path), compact_after=3)
+    store.save(_record('id-1', 'ABC12345'))
+    journal = tmp_path / journal_filename(shard_filename('ABC12345', 'id-1'))
+    store.append_event('id-1', 'reviewed', {"status": "approved"})
+    store.append_event('id-1', 'edited', {"status": "overridden"})
+    events = journal.read_bytes()
+    assert store.compact() == 1 and not journal.exists()
+
+    # A journal left behind by a crash during compaction is not applied twice
+    journal.write_bytes(events)
+    store.append_event('id-1', 'notified', {"notification_sent": True})
+    assert len(store.get('id-1')['review_history']) == 2
+    assert len(JSONFileStore(str(tmp_path)).get('id-1')['review_history']) == 2
+    # The third event in the journal triggered a compaction
+    assert not journal.exists() and store.get('id-1')['notification_sent']
+
+
+
+def test_json_compaction_scans_without_the_records_lock(tmp_path, monkeypatch):
+    import fcntl
+    import storage
+
+    store = JSONFileStore(str(tmp_path))
+    for n in range(3):
+        store.save(_record(f'id-{n}', f'ABC1234{n}'))
+        store.append_event(f'id-{n}', 'reviewed', {"status": "approved"})
+    scan = storage.iter_data_files
+
+    def unlocked_scan(data_dir):
+        # Another worker must be able to take the lock while the directory is listed
+        with open(store.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return scan(data_dir)
+
+    monkeypatch.setattr(storage, 'iter_data_files', unlocked_scan)
+    assert store.compact() == 3
+    assert all(record['status'] == 'approved' for record in store.iter_matching())
+
+def test_json_records_are_sharded_and_flat_files_migrate_online(tmp_path):
+    flat = JSONFileStore(str(tmp_path), sharded=False)
+    flat.save(_record('id-1', 'ABC12345'))
+    flat.append_event('id-1', 'reviewed', {"status": "approved"})
+    (tmp_path / 'outbox').mkdir()
+    store = JSONFileStore(str(tmp_path))
+    store.save(_record('id-2', 'XYZ99999'))
+    assert (tmp_path / shard_filename('XYZ99999', 'id-2')).exists()
+    assert sorted(r['id'] for r in store.iter_records()) == ['id-1', 'id-2']
+
+    assert store.shard_files() == 1
+    assert store.shard_files() == 0
+    assert sorted(os.listdir(tmp_path / shard_filename('ABC12345', 'id-1').rsplit('/', 1)[0])) == [
+        'ABC12345_id-1.events.jsonl', 'ABC12345_id-1.json']
+    # flat still has the old path in memory, and finds the moved record through the index
+    assert flat.get('id-1')['status'] == 'approved'
+    assert flat.append_event('id-1', 'notified', {"notification_sent": True})
+    assert JSONFileStore(str(tmp_path)).counters()['approved_notified'] == 1
+    assert sorted(r['id'] for r in store.iter_records()) == ['id-1', 'id-2']
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_record_cache_is_invalidated_by_another_workers_writes(backend, tmp_path):
+    events = []
+    cache = RecordCache(max_entries=1, observe=lambda result, count: events.append((result, count)))
+    if backend == 'json':
+        worker, other = JSONFileStore(str(tmp_path), record_cache=cache), JSONFileStore(str(tmp_path))
+    else:
+        path = str(tmp_path / 'assessments.db')
+        worker, other = SQLiteStore(path, record_cache=cache), SQLiteStore(path)
+    worker.save(_record('id-1', 'AAA00001'))
+    other.save(_record('id-2', 'AAA00002'))
+
+    first = worker.get('id-1')
+    assert worker.get('id-1') is first
+    assert other.update('id-1', {"status": "approved"})
+    assert worker.get('id-1')['status'] == 'approved'
+    assert worker.get_by_ticket('AAA00002')['id'] == 'id-2'
+
+    assert events == [('miss', 1), ('hit', 1), ('miss', 1), ('miss', 1), ('eviction', 1)]
+
+
+def test_dashboard_links_page_by_cursor():
+    import app as app_module
+    client = app_module.app.test_client()
+    for i in range(30):
+        app_module.store.save(_record(f'dashboard-test-{i:02d}', f'DSH000{i:02d}',
+                                      submitted_at=f'1999-01-01T09:{i:02d}:00'))
+    filters = 'date_from=1999-01-01&date_to=1999-01-01'
+
+    def links(body):
+        return {label: href.replace('&amp;', '&') for href, label in
+                re.findall(r'href="(/dashboard\?[^"]*)"[^>]*>(← Previous|Next →)', body)}
+
+    body = client.get(f'/dashboard?{filters}').get_data(as_text=True)
+    assert 'Page 1 of 2' in body and '← Previous' not in body
+    body = client.get(links(body)['Next →']).get_data(as_text=True)
+    assert 'Page 2 of 2' in body and '#DSH00004' in body and '#DSH00005' not in body
+    assert 'Next →' not in body
+    body = client.get(links(body)['← Previous']).get_data(as_text=True)
+    assert 'Page 1 of 2' in body and '#DSH00005' in body and '← Previous' not in body
+    assert 'Page 1 of 2' in client.get(f'/dashboard?{filters}&after=bogus').get_data(as_text=True)
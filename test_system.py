@@ -7,11 +7,76 @@ This script tests the email automation and review system functionality.
 import json
 import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
-def create_test_assessment():
-    """Create a test assessment for testing purposes."""
+from assessment_index import shard_filename
+
+# Agencies used for synthetic assessments (see build_test_assessment)
+TEST_AGENCIES = [
+    'Test Agency', 'Department of Revenue', 'Registry of Motor Vehicles', 'Department of Public Health',
+    'Executive Office of Education', 'Department of Transportation', 'Office of the Comptroller',
+    'Department of Environmental Protection', 'Executive Office of Elder Affairs', 'State Police',
+]
+
+def synthetic_ticket_id(index):
+    """Return a ticket ID in the app's format (3 letters + 5 digits) that is unique per index."""
+    letters = ''
+    number = index // 100000
+    for _ in range(3):
+        number, letter = divmod(number, 26)
+        letters = chr(ord('A') + letter) + letters
+    return f"{letters}{index % 100000:05d}"
+
+def build_test_assessment(index=None, rng=None, now=None):
+    """
+    Build a test assessment record.
+    
+    Without an index this is the fixed 'Test Agency' record, whose answers and results are
+    stored as text, as records were before answer_format.py (see migrate-answers in manage.py).
+    With an index and a random.Random, the record is synthetic, for load tests (see
+    benchmarks/bench_web.py): a ticket ID unique to the index, random answers scored with the
+    current rules, a random agency, a submission date within the past year, and a random review state.
+    """
+    if index is None:
+        return _fixed_test_assessment()
+    
+    import answer_format
+    import scoring
+    
+    now = now or datetime.now()
+    answers = {key: rng.choice(options) for key, options in scoring.ANSWER_OPTIONS}
+    recommendation, scores, explanations, app_age = scoring.recommend(answers)
+    submitted_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+    agency_name = rng.choice(TEST_AGENCIES)
+    contact_name = f"Contact {index}"
     
+    record = {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "ticket_id": synthetic_ticket_id(index),
+        "status": "pending",
+        "submitted_at": submitted_at.isoformat(),
+        "scoring_rules_version": scoring.rules_version(),
+        "agency_info": {
+            'agency_name': agency_name,
+            'contact_name': contact_name,
+            'contact_email': f"contact{index}@example.com",
+            'department': 'IT Department'
+        },
+        "assessment_data": answer_format.structured_assessment_data(answers, recommendation, scores, explanations, app_age)
+    }
+    
+    # About half are still pending; reviewed ones are mostly notified already
+    state = rng.random()
+    if state >= 0.5:
+        record["status"] = 'approved' if state < 0.85 else 'overridden'
+        record["reviewed_at"] = (submitted_at + timedelta(days=rng.randint(0, 14))).isoformat()
+        record["review_notes"] = 'Reviewed by EOTSS'
+        record["notification_sent"] = rng.random() < 0.8
+        if record["status"] == 'overridden':
+            record["override_reason"] = rng.choice(['AWS', 'On Prem Cloud', 'Physical'])
+    return record
+
+def _fixed_test_assessment():
     # Test agency info
     agency_info = {
         'agency_name': 'Test Agency',
@@ -30,27 +95,40 @@ def create_test_assessment():
     
     # Create assessment record
     assessment_id = str(uuid.uuid4())
-    assessment_record = {
+    return {
         "id": assessment_id,
         "status": "pending",
         "submitted_at": datetime.now().isoformat(),
         "agency_info": agency_info,
         "assessment_data": assessment_data
     }
+
+def create_test_assessment(data_dir='assessment_data', record=None, verbose=True):
+    """
+    Create a test assessment for testing purposes.
     
-    # Save to file
-    data_dir = 'assessment_data'
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+    Args:
+        data_dir (str): Directory of the JSON storage backend.
+        record (dict): Record to save (default: the fixed test record, see build_test_assessment).
+        verbose (bool): Print where the record was saved.
+    Returns:
+        str: The assessment ID.
+    """
+    if record is None:
+        record = build_test_assessment()
+    assessment_id = record["id"]
     
-    assessment_file = os.path.join(data_dir, f"{assessment_id}.json")
+    # Save to file, in its shard directory
+    assessment_file = os.path.join(data_dir, shard_filename(record.get("ticket_id"), assessment_id))
+    os.makedirs(os.path.dirname(assessment_file), exist_ok=True)
     with open(assessment_file, 'w') as f:
-        json.dump(assessment_record, f, indent=2)
+        json.dump(record, f, indent=2)
     
-    print(f"✅ Test assessment created with ID: {assessment_id}")
-    print(f"📁 Saved to: {assessment_file}")
-    print(f"🔗 Review URL: http://localhost:5000/review/{assessment_id}")
-    print(f"📊 Dashboard URL: http://localhost:5000/dashboard")
+    if verbose:
+        print(f"✅ Test assessment created with ID: {assessment_id}")
+        print(f"📁 Saved to: {assessment_file}")
+        print(f"🔗 Review URL: http://localhost:5000/review/{assessment_id}")
+        print(f"📊 Dashboard URL: http://localhost:5000/dashboard")
     
     return assessment_id
 